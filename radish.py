@@ -19,17 +19,17 @@ import MaxPlus
 # Misc
 import sys
 import os
+from timeit import default_timer as _timer
+
+_start = _timer()
 
 # For 3ds Max - Temporarily add this file's directory to PATH
 sys.path.append(os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__))))
 
-# Force reload of Radish modules
-try:
-    for m in sys.modules.keys():
-        if m not in init_modules:
-            del(sys.modules[m])
-except NameError:
-    init_modules = sys.modules.keys()
+# Force reload of Radish modules - only our own, everything else stays imported between launches
+for m in sys.modules.keys():
+    if m.startswith('radish_'):
+        del(sys.modules[m])
 
 # Local modules
 import radish_logger
@@ -40,6 +40,7 @@ _log.info('Starting Radish...\r')
 import radish_ui
 
 _rt = pymxs.runtime
+_import_time = _timer() - _start
 
 
 # --------------------
@@ -54,3 +55,7 @@ rd_ui = radish_ui.RadishUI(_uif, _rt, _log, _app)
 # Punch it
 rd_ui.show()
 _log.info('GUI created.\r')
+_log.info('Radish started in %.3fs - Imports %.3fs, UI %.3fs, Config %.3fs' % (_timer() - _start,
+                                                                              _import_time,
+                                                                              rd_ui.load_times['ui'],
+                                                                              rd_ui.load_times['config']))
@@ -10,29 +10,238 @@ _log.info('Logger %s Active' % _log.name)
 
 # Misc
 import xml.etree.ElementTree as _ETree
+import xml.parsers.expat as _expat
+import collections
 import datetime
+import json
+import shutil
+import sqlite3
 import sys
 import os
+import threading
+from timeit import default_timer as _timer
 
 # Utilities
 import radish_utilities as util
 _xml_get_bool = util.xml_get_bool
 _xml_tag_cleaner = util.xml_tag_cleaner
-_xml_indent = util.xml_indent
-_get_instances = util.get_instances
+_xml_start_tag = util.xml_start_tag
 _is_ascii = util.is_ascii
 
+# Scene access
+import radish_scene as rsc
+
+# Optional pass state index
+import radish_state as rst
+
+
+def _get_cfg_path(ext='xml'):
+    """
+    Gets the path of a Radish config file, which always lives next to this module.
+    :param ext: String, file extension of the config.
+    :return: String, path to the config file.
+    """
+    return os.path.dirname(__file__) + '\\radishConfig.' + ext
+
+
+# Journal configs are compacted once they grow past this many bytes, and twice their size after the last compaction
+_JOURNAL_COMPACT_SIZE = 4 * 1024 * 1024
+
+
+# Schema of SQLite configs - Every table below passes is keyed by pass, so saving a pass only touches its own rows
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cams (id INTEGER PRIMARY KEY,
+                                 name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS passes (id INTEGER PRIMARY KEY,
+                                   cam_id INTEGER NOT NULL REFERENCES cams (id) ON DELETE CASCADE,
+                                   name TEXT NOT NULL,
+                                   base TEXT,
+                                   UNIQUE (cam_id, name));
+CREATE INDEX IF NOT EXISTS passes_name ON passes (name);
+CREATE TABLE IF NOT EXISTS removed (pass_id INTEGER NOT NULL REFERENCES passes (id) ON DELETE CASCADE,
+                                    category TEXT NOT NULL,
+                                    name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS removed_pass ON removed (pass_id);
+CREATE TABLE IF NOT EXISTS layers (pass_id INTEGER NOT NULL REFERENCES passes (id) ON DELETE CASCADE,
+                                   name TEXT NOT NULL,
+                                   is_on INTEGER,
+                                   misc TEXT);
+CREATE INDEX IF NOT EXISTS layers_pass ON layers (pass_id);
+CREATE TABLE IF NOT EXISTS lights (id INTEGER PRIMARY KEY,
+                                   pass_id INTEGER NOT NULL REFERENCES passes (id) ON DELETE CASCADE,
+                                   name TEXT NOT NULL,
+                                   enabled INTEGER,
+                                   is_on INTEGER,
+                                   misc TEXT);
+CREATE INDEX IF NOT EXISTS lights_pass ON lights (pass_id);
+CREATE TABLE IF NOT EXISTS light_instances (light_id INTEGER NOT NULL REFERENCES lights (id) ON DELETE CASCADE,
+                                            position INTEGER NOT NULL,
+                                            name TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS light_instances_light ON light_instances (light_id);
+CREATE TABLE IF NOT EXISTS effects (pass_id INTEGER NOT NULL REFERENCES passes (id) ON DELETE CASCADE,
+                                    name TEXT NOT NULL,
+                                    is_active INTEGER,
+                                    misc TEXT);
+CREATE INDEX IF NOT EXISTS effects_pass ON effects (pass_id);
+CREATE TABLE IF NOT EXISTS elements (pass_id INTEGER NOT NULL REFERENCES passes (id) ON DELETE CASCADE,
+                                     name TEXT NOT NULL,
+                                     enabled TEXT,
+                                     misc TEXT);
+CREATE INDEX IF NOT EXISTS elements_pass ON elements (pass_id);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY,
+                                     value TEXT);
+"""
+
+
+def _sql_from_bool(value):
+    # SQLite has no boolean type - Store True/False/None as 1/0/NULL
+    if value is None:
+        return None
+    return int(bool(value))
+
+
+def _sql_to_bool(value):
+    if value is None:
+        return None
+    return bool(value)
+
+
+def _sql_from_misc(misc):
+    if not misc:
+        return None
+    return json.dumps(misc)
+
+
+def _sql_to_misc(misc):
+    if misc is None:
+        return {}
+    return json.loads(misc)
+
+
+def _pass_to_record(rad_pass):
+    """
+    Flattens the contents of a RadishPass into a dictionary of lists, for use in a journal record.
+    :param rad_pass: RadishPass
+    :return: Dictionary, with one list per category.  Delta passes also have their base and removed names.
+    """
+    record = {'layers': [[l.name, l.on, l.misc] for l in rad_pass.layers.itervalues()],
+              'lights': [[l.name, l.enabled, l.on, list(l.instances), l.misc] for l in rad_pass.lights.itervalues()],
+              'effects': [[e.name, e.active, e.misc] for e in rad_pass.effects.itervalues()],
+              'elements': [[e.name, e.enabled, e.misc] for e in rad_pass.elements.itervalues()]}
+    if rad_pass.base is not None:
+        record['base'] = rad_pass.base
+        record['removed'] = dict((category, sorted(names)) for category, names in rad_pass.removed.iteritems())
+    return record
+
+
+def _pass_from_record(rad_pass, record, intern_name):
+    """
+    Replaces the contents of a RadishPass with those of a journal record made by _pass_to_record().
+    :param rad_pass: RadishPass
+    :param record: Dictionary, with one list per category.
+    :param intern_name: Callable, takes a name and returns its copy from a symbol table.  See RadishIO._intern_name()
+    :return: None
+    """
+    rad_pass.layers = dict((intern_name(name), RadishLayer(intern_name(name), on, misc))
+                           for name, on, misc in record['layers'])
+    rad_pass.lights = dict((intern_name(name), RadishLight(intern_name(name), enabled, on,
+                                                           tuple(intern_name(i) for i in instances), misc))
+                           for name, enabled, on, instances, misc in record['lights'])
+    rad_pass.effects = dict((intern_name(name), RadishEffect(intern_name(name), active, misc))
+                            for name, active, misc in record['effects'])
+    rad_pass.elements = dict((intern_name(name), RadishElement(intern_name(name), enabled, misc))
+                             for name, enabled, misc in record['elements'])
+    rad_pass.base = intern_name(record['base']) if record.get('base') is not None else None
+    rad_pass.removed = dict((category, set(intern_name(name) for name in names))
+                            for category, names in record.get('removed', {}).iteritems())
+
+
+# --------------------
+#    Delta Passes
+# --------------------
+
+# Every category of objects stored in a RadishPass
+_CATEGORIES = ('layers', 'lights', 'effects', 'elements')
+
+
+def _same_object(a, b):
+    """
+    Checks whether two Layers, Lights, Effects or Elements store the same state.
+    Misc properties aren't restored to the scene, and the XML reader fills them with bookkeeping like instanceCount,
+    so they're left out.
+    :return: Boolean
+    """
+    if b is None or type(a) is not type(b):
+        return False
+    for attr in a.__slots__:
+        if attr in ('name', 'misc'):
+            continue
+        a_value = getattr(a, attr)
+        b_value = getattr(b, attr)
+        if attr == 'instances':
+            a_value = list(a_value)
+            b_value = list(b_value)
+        else:
+            # Element states read from XML are kept as strings
+            a_value = str(a_value)
+            b_value = str(b_value)
+        if a_value != b_value:
+            return False
+    return True
+
+
+def _resolve_delta(delta, base):
+    """
+    Applies a delta pass to its base, see RadishIO.delta_base.
+    :param delta: RadishPass, storing only the objects that differ from the base, and the names it doesn't have.
+    :param base: Fully resolved RadishPass, or None if the base is missing.
+    :return: A new RadishPass, holding everything the delta pass stands for.
+    """
+    resolved = RadishPass(delta.name)
+    resolved.resolution = dict(delta.resolution)
+    for category in _CATEGORIES:
+        objects = dict(getattr(base, category)) if base is not None else {}
+        for name in delta.removed.get(category, ()):
+            objects.pop(name, None)
+        objects.update(getattr(delta, category))
+        setattr(resolved, category, objects)
+    return resolved
+
+
+def _encode_delta(full, base_name, base):
+    """
+    Encodes a pass as a delta against a base pass, the inverse of _resolve_delta().
+    :param full: Fully resolved RadishPass to encode.
+    :param base_name: String, name of the base pass.
+    :param base: Fully resolved RadishPass of the base.
+    :return: A new RadishPass, storing only what differs from the base.
+    """
+    delta = RadishPass(full.name)
+    delta.resolution = dict(full.resolution)
+    delta.base = base_name
+    for category in _CATEGORIES:
+        full_objects = getattr(full, category)
+        base_objects = getattr(base, category)
+        setattr(delta, category, dict((name, obj) for name, obj in full_objects.iteritems()
+                                      if not _same_object(obj, base_objects.get(name))))
+        removed = set(base_objects).difference(full_objects)
+        if removed:
+            delta.removed[category] = removed
+    return delta
+
+
 class RadishIO(object):
     """
     A class to store data on scene states, as well as handle reading and writing those states to disk.
     By default it will initialize empty, but if it's passed a string keyword for a supported filetype it will try
     to load and parse that file.
-    Supported keywords: XML
+    Supported keywords: XML, JOURNAL, SQLITE
     """
-    def __init__(self, runtime, config_type=None):
+    def __init__(self, runtime, config_type=None, lazy=False):
         """
         :param runtime: The pymxs runtime.
         :param config_type: Keyword, determines how to load and save from disk.
+        :param lazy: Bool, only parse a camera from disk the first time it's accessed.  XML only.
         """
 
         # ---------------
@@ -40,11 +249,72 @@ class RadishIO(object):
         # ---------------
         self._rt = runtime
 
+        # Captures scene state for save_state() in a single MAXScript evaluation
+        self._capture = rsc.RadishSceneCapture(runtime)
+
+        # Name lookups for load_state(), rebuilt on every restore unless keep_scene_lookup is set - in which case the
+        # owner must call invalidate_scene_lookup() whenever nodes or layers are added or deleted, or nodes renamed.
+        # Layers are listed again for every restore either way, as Max doesn't notify about renaming them.
+        self._scene_lookup = rsc.RadishSceneLookup(runtime)
+        self.keep_scene_lookup = False
+
+        # Lights found by the last capture, so save_state() only has to read their states while keep_scene_lookup is
+        # set.  Updated per node for the changes passed to invalidate_scene_lookup().  Its hits, updates and misses
+        # count the captures it served.
+        self.scene_inventory = rsc.RadishSceneInventory(self._capture)
+
+        # Works out the minimal set of writes for load_state()
+        self._planner = rsc.RadishRestorePlanner(self._capture)
+
+        # Set while load_state() is applying a batch, with the changes that came in meanwhile, see
+        # invalidate_scene_lookup()
+        self._scene_changes_held = False
+        self._scene_changes_while_held = []
+
         # ---------------
         #   Class Attrs
         # ---------------
         self.cams = {}
 
+        # Offset index of the XML config, only used in lazy mode
+        self._cam_index = None
+
+        # Serialized XML for each camera, reused by write_config_xml() until the camera is marked dirty
+        self._xml_blocks = {}
+
+        # Callables run after every change to memory, with the operation, cam name and pass name as arguments
+        self._change_handlers = []
+
+        # Number of cameras that have each pass name, kept current by set_pass(), the resets and the readers, see
+        # get_all_passes().  Callables registered with watch_pass_names() are run whenever a name comes or goes.
+        self._pass_index = {}
+        self._pass_index_handlers = []
+
+        # Journal records waiting for the next write, and the journal size right after it was last compacted
+        self._journal_pending = []
+        self._journal_base_size = 0
+        self._journal_compact_due = False
+
+        # Connection to the SQLite config, only used by the SQLITE backend
+        self._db = None
+
+        # Runs write_async() jobs on a worker thread, started on first use.  _io_lock guards the config file, the lazy
+        # offset index and _xml_blocks, which that thread touches as well.
+        self._writer = None
+        self._io_lock = threading.Lock()
+
+        # Result of the last write_async() that had to write on the calling thread, see write_status()
+        self._last_write_ok = None
+
+        # Symbol table shared by every camera and pass, see _intern_name()
+        self._symbols = {}
+
+        # Bitset query index over the states stored in every pass, only built on request, see enable_state_matrix()
+        self.state_matrix = None
+
+        # Name of the pass that save_state() stores every other pass of the same camera against, see delta_base
+        self._delta_base = None
+
         # ---------------
         #   Load Config
         # ---------------
@@ -52,11 +322,25 @@ class RadishIO(object):
         # Also immediately load the config.
         if config_type is not None:
             if config_type == 'XML':
-                self.read = self.read_config_xml
+                if lazy:
+                    self.read = self.read_config_xml_lazy
+                else:
+                    self.read = self.read_config_xml
                 self.write = self.write_config_xml
                 self.read()
+            elif config_type == 'JOURNAL':
+                self.read = self.read_config_journal
+                self.write = self.write_config_journal
+                self.read()
+                self._change_handlers.append(self._journal_change_handler)
+            elif config_type == 'SQLITE':
+                self.read = self.read_config_sqlite
+                self.write = self.write_config_sqlite
+                self.read()
+                self._change_handlers.append(self._sqlite_change_handler)
             else:
-                _log.warning('Invalid config type "%s" passed to RadishIO - Supported types are: XML' % config_type)
+                _log.warning('Invalid config type "%s" passed to RadishIO - Supported types are: XML, JOURNAL, SQLITE'
+                             % config_type)
 
         # End of Init
         # ---------------
@@ -82,22 +366,43 @@ class RadishIO(object):
         """
         This finds and loads a XML config into RadishIO's memory.  If the file cannot be read, it will be backed up and
         RadishIO will be set up with a blank memory.
+        The config is streamed with iterparse, so each Cam and Pass is turned into RadishIO objects as soon as it has
+        been read, and finished elements are dropped straight away to keep memory flat regardless of config size.
         :return: None
         """
-        cfg_path = os.path.dirname(__file__) + '\\radishConfig.xml'
+        cfg_path = _get_cfg_path('xml')
+        # Parsing only adds passes, so anything left over from the last read would survive being deleted on disk
+        self.cams = {}
+        with self._io_lock:
+            self._xml_blocks = {}
+        self._delta_base = None
+        self._rebuild_pass_index()
+
         try:
             _log.info('Trying to read config file %s' % cfg_path)
-            cfg = _ETree.parse(cfg_path)
-            cfg_root = cfg.getroot()
+            cfg_file = open(cfg_path, 'rb')
 
         except IOError:
             _log.warning('Config file not found - Starting with a blank slate')
-            # Just to be safe, re-initialize cams as a blank dictionary.
-            self.cams = {}
+            self._rebuild_state_matrix()
             return
 
+        # If we made it here, then we've found our XML config.  Time to parse it into RadishIO's memory.
+        # The file handle has to be closed before a corrupt config can be backed up, hence the nested try.
+        _log.info('Config found - Parsing...')
+        start = _timer()
+        try:
+            try:
+                cams_parsed, passes_parsed = self._parse_config_xml(cfg_file)
+            finally:
+                cfg_file.close()
+
         except _ETree.ParseError:
             _log.error('Config file is corrupt, and cannot be read!')
+            # Passes parsed before the error was found can't be trusted
+            self.cams = {}
+            self._rebuild_pass_index()
+            self._rebuild_state_matrix()
             now = datetime.datetime.now()
             timestamp = now.strftime('%y%m%d-%H%M')
             backup_filepath = '%s.%s.BAK' % (cfg_path, timestamp)
@@ -109,164 +414,419 @@ class RadishIO(object):
             except OSError:
                 _log.warning('Unable to back up config - A file already exists with this timestamp!')
                 os.remove(cfg_path)
-
-            # Again, just to be safe re-initialize cams as a blank dictionary
-            self.cams = {}
             return
 
         except:
-            _log.exception('Unknown error while reading config file - Starting with a blank slate')
-            # Last time, I promise
-            self.cams = {}
-            return
-
-        # If we made it here, then we've successfully loaded our XML config.  Time to parse it into RadishIO's memory.
-        # Get all camera elements, then iterate over them to get their passes
-        _log.info('Config loaded - Parsing...')
-        try:
-            for tgt_cam in cfg_root.findall("./*[@type='CAM']"):
-                cam_name = tgt_cam.attrib['realName']
-                _log.debug('Parsing Camera %s' % cam_name)
-
-                # Get all passes under this camera, then iterate over them to populate pass info
-                for tgt_pass in tgt_cam.findall("./*[@type='PASS']"):
-                    pass_name = tgt_pass.attrib['realName']
-                    rad_pass = self.set_pass(cam_name, pass_name)
-                    _log.debug('Parsing Pass %s for Cam %s' % (pass_name, cam_name))
-
-                    # Get Layers
-                    _log.debug('Parsing Layers...')
-                    for tgt_layer in tgt_pass.findall('./LAYERS/*'):
-                        # Get attributes of this Layer
-                        tgt_name = None
-                        tgt_on = None
-                        tgt_misc = {}
-                        for k, v in tgt_layer.attrib.items():
-                            if k == 'realName':
-                                tgt_name = v
-                            elif k == 'on':
-                                tgt_on = _xml_get_bool(v)
-                            else:
-                                tgt_misc[k] = v
-
-                        # Make a new RadishLayer
-                        rad_pass.layers[tgt_name] = RadishLayer(name=tgt_name,
-                                                                on=tgt_on,
-                                                                misc=tgt_misc)
-
-                    # Get Lights
-                    _log.debug('Parsing Lights...')
-                    for tgt_light in tgt_pass.findall('./LIGHTS/*'):
-                        # Get the attributes of this Light
-                        tgt_name = None
-                        tgt_on = None
-                        tgt_enabled = None
-                        tgt_instances = []
-                        tgt_misc = {}
-                        for k, v in tgt_light.attrib.items():
-                            if k == 'realName':
-                                tgt_name = v
-                            elif k == 'on':
-                                tgt_on = _xml_get_bool(v)
-                            elif k == 'enabled':
-                                tgt_enabled = _xml_get_bool(v)
-                            else:
-                                tgt_misc[k] = v
-                        for child in tgt_light.findall("./*"):
-                            tgt_instances.append(child.attrib['realName'])
-
-                        # Make a new RadishLight
-                        rad_pass.lights[tgt_name] = RadishLight(name=tgt_name,
-                                                                enabled=tgt_enabled,
-                                                                on=tgt_on,
-                                                                instances=tgt_instances,
-                                                                misc=tgt_misc)
-
-                    # Get Effects
-                    _log.debug('Parsing Effects...')
-                    for tgt_effect in tgt_pass.findall('./EFFECTS/*'):
-                        # Get the attributes of this Effect
-                        tgt_name = None
-                        tgt_active = None
-                        tgt_misc = {}
-                        for k, v in tgt_effect.attrib.items():
-                            if k == 'realName':
-                                tgt_name = v
-                            elif k == 'isActive':
-                                tgt_active = _xml_get_bool(v)
-                            else:
-                                tgt_misc[k] = v
-
-                        # Make a new RadishEffect
-                        rad_pass.effects[tgt_name] = RadishEffect(name=tgt_name,
-                                                                  active=tgt_active,
-                                                                  misc=tgt_misc)
-
-                    # Get Elements
-                    _log.debug('Parsing Elements...')
-                    for tgt_element in tgt_pass.findall('./ELEMENTS/*'):
-                        # Get the attributes for this Element
-                        tgt_name = None
-                        tgt_enabled = None
-                        tgt_misc = {}
-                        for k, v in tgt_element.attrib.items():
-                            if k == 'realName':
-                                tgt_name = v
-                            elif k == 'enabled':
-                                tgt_enabled = v
-                            else:
-                                tgt_misc[k] = v
-
-                        # Make a new RadishElement
-                        rad_pass.elements[tgt_name] = RadishElement(name=tgt_name,
-                                                                    enabled=tgt_enabled,
-                                                                    misc=tgt_misc)
-        except:
-            _log.exception('Error parsing config %s!')
+            _log.exception('Error parsing config %s!' % cfg_path)
             # Reset data in case it's corrupt / partially loaded
             self.cams = {}
+            self._rebuild_pass_index()
+            self._rebuild_state_matrix()
+            return
 
-
-        _log.info('Config file successfully parsed')
+        _log.info('Config file successfully parsed - %d Cams, %d Passes in %.3fs' % (cams_parsed,
+                                                                                    passes_parsed,
+                                                                                    _timer() - start))
+        self._rebuild_state_matrix()
         # DEBUG - Dump resulting RadishIO memory to log
         # _log.info(repr(self))
 
+    def _parse_config_xml(self, cfg_file):
+        """
+        Streams a XML config from an open file, populating RadishIO's memory one Pass at a time.
+        Only direct children of the root with type CAM, and direct children of those with type PASS, are parsed.
+        :param cfg_file: File object opened in binary mode.
+        :return: Tuple of Ints, the number of cameras and passes parsed.
+        """
+        depth = 0
+        cfg_root = None
+        cfg_cam = None
+        cam_name = None
+        cams_parsed = 0
+        passes_parsed = 0
+
+        for event, el in _ETree.iterparse(cfg_file, events=('start', 'end')):
+            if event == 'start':
+                if depth == 0:
+                    cfg_root = el
+                    self._delta_base = el.get('deltaBase')
+                elif depth == 1 and el.get('type') == 'CAM':
+                    cfg_cam = el
+                    cam_name = el.attrib['realName']
+                    cams_parsed += 1
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 2 and cfg_cam is not None and el.get('type') == 'PASS':
+                # The pass element is complete - parse it, then drop it from the camera so it can be freed
+                pass_name = el.attrib['realName']
+                self._parse_pass_xml(self.set_pass(cam_name, pass_name), el)
+                cfg_cam.remove(el)
+                passes_parsed += 1
+            elif depth == 1:
+                # Finished a direct child of the root, camera or not - drop the whole subtree
+                cfg_root.remove(el)
+                cfg_cam = None
+                cam_name = None
+
+        return cams_parsed, passes_parsed
+
+    def _parse_pass_xml(self, rad_pass, tgt_pass):
+        """
+        Populates a RadishPass from a complete PASS element.
+        :param rad_pass: The RadishPass to populate.
+        :param tgt_pass: The PASS Element.
+        :return: None
+        """
+        # Every name goes through the symbol table, so each one is only held in memory once
+        intern_name = self._intern_name
+
+        # Delta passes name their base, and list the objects they don't have with a removed attribute
+        if tgt_pass.get('base') is not None:
+            rad_pass.base = intern_name(tgt_pass.get('base'))
+
+        # Get Layers
+        for tgt_layer in tgt_pass.findall('./LAYERS/*'):
+            if tgt_layer.get('removed') is not None:
+                rad_pass.removed.setdefault('layers', set()).add(intern_name(tgt_layer.attrib['realName']))
+                continue
+            # Get attributes of this Layer
+            tgt_name = None
+            tgt_on = None
+            tgt_misc = {}
+            for k, v in tgt_layer.attrib.items():
+                if k == 'realName':
+                    tgt_name = intern_name(v)
+                elif k == 'on':
+                    tgt_on = _xml_get_bool(v)
+                else:
+                    tgt_misc[intern_name(k)] = intern_name(v)
+
+            # Make a new RadishLayer - most objects have no misc properties, so don't keep an empty dict for them
+            rad_pass.layers[tgt_name] = RadishLayer(name=tgt_name,
+                                                    on=tgt_on,
+                                                    misc=tgt_misc or None)
+
+        # Get Lights
+        for tgt_light in tgt_pass.findall('./LIGHTS/*'):
+            if tgt_light.get('removed') is not None:
+                rad_pass.removed.setdefault('lights', set()).add(intern_name(tgt_light.attrib['realName']))
+                continue
+            # Get the attributes of this Light
+            tgt_name = None
+            tgt_on = None
+            tgt_enabled = None
+            tgt_instances = []
+            tgt_misc = {}
+            for k, v in tgt_light.attrib.items():
+                if k == 'realName':
+                    tgt_name = intern_name(v)
+                elif k == 'on':
+                    tgt_on = _xml_get_bool(v)
+                elif k == 'enabled':
+                    tgt_enabled = _xml_get_bool(v)
+                else:
+                    tgt_misc[intern_name(k)] = intern_name(v)
+            for child in tgt_light.findall("./*"):
+                tgt_instances.append(intern_name(child.attrib['realName']))
+
+            # Make a new RadishLight
+            rad_pass.lights[tgt_name] = RadishLight(name=tgt_name,
+                                                    enabled=tgt_enabled,
+                                                    on=tgt_on,
+                                                    instances=tuple(tgt_instances),
+                                                    misc=tgt_misc or None)
+
+        # Get Effects
+        for tgt_effect in tgt_pass.findall('./EFFECTS/*'):
+            if tgt_effect.get('removed') is not None:
+                rad_pass.removed.setdefault('effects', set()).add(intern_name(tgt_effect.attrib['realName']))
+                continue
+            # Get the attributes of this Effect
+            tgt_name = None
+            tgt_active = None
+            tgt_misc = {}
+            for k, v in tgt_effect.attrib.items():
+                if k == 'realName':
+                    tgt_name = intern_name(v)
+                elif k == 'isActive':
+                    tgt_active = _xml_get_bool(v)
+                else:
+                    tgt_misc[intern_name(k)] = intern_name(v)
+
+            # Make a new RadishEffect
+            rad_pass.effects[tgt_name] = RadishEffect(name=tgt_name,
+                                                      active=tgt_active,
+                                                      misc=tgt_misc or None)
+
+        # Get Elements
+        for tgt_element in tgt_pass.findall('./ELEMENTS/*'):
+            if tgt_element.get('removed') is not None:
+                rad_pass.removed.setdefault('elements', set()).add(intern_name(tgt_element.attrib['realName']))
+                continue
+            # Get the attributes for this Element
+            tgt_name = None
+            tgt_enabled = None
+            tgt_misc = {}
+            for k, v in tgt_element.attrib.items():
+                if k == 'realName':
+                    tgt_name = intern_name(v)
+                elif k == 'enabled':
+                    tgt_enabled = intern_name(v)
+                else:
+                    tgt_misc[intern_name(k)] = intern_name(v)
+
+            # Make a new RadishElement
+            rad_pass.elements[tgt_name] = RadishElement(name=tgt_name,
+                                                        enabled=tgt_enabled,
+                                                        misc=tgt_misc or None)
+
+
+    def read_config_xml_lazy(self):
+        """
+        Sets RadishIO up to load cameras from the XML config on demand, instead of parsing the whole file.
+        Uses an index of camera names to byte ranges in the config, cached next to it and rebuilt whenever the config
+        changes.  If the config is missing or can't be indexed, falls back to read_config_xml().
+        :return: None
+        """
+        cfg_path = _get_cfg_path('xml')
+        if not os.path.isfile(cfg_path):
+            self.read_config_xml()
+            return
+
+        index = RadishCamIndex(cfg_path, _get_cfg_path('idx'))
+        try:
+            if not index.load():
+                _log.info('Indexing config file %s' % cfg_path)
+                index.build()
+                index.save()
+            # Settings are kept on the root element, so only its start tag has to be parsed
+            with open(cfg_path, 'rb') as cfg_file:
+                for event, el in _ETree.iterparse(cfg_file, events=('start',)):
+                    self._delta_base = el.get('deltaBase')
+                    break
+        except (_expat.ExpatError, _ETree.ParseError, KeyError, IOError, OSError):
+            _log.warning('Unable to index config - Falling back to a full read')
+            self.read_config_xml()
+            return
+
+        self._cam_index = index
+        with self._io_lock:
+            self._xml_blocks = {}
+        self.cams = RadishLazyCams(index.cams.keys(), self._load_cam_xml, index.get_pass_names,
+                                   self._lazy_cam_missing)
+        self._rebuild_pass_index()
+        self._rebuild_state_matrix()
+        _log.info('Config file indexed - %d Cams available' % len(self.cams))
+
+    def _load_cam_xml(self, cam_name):
+        """
+        Used by RadishLazyCams to parse a single camera from the XML config, using the offset index.
+        :param cam_name: String, name of camera.
+        :return: RadishCam.  Raises KeyError if the camera has been removed from the config since it was indexed.
+        """
+        start = _timer()
+        cam = RadishCam(cam_name)
+
+        # A camera can be split over several elements, in which case their passes are merged, same as set_pass()
+        with self._io_lock:
+            blocks = self._cam_index.read_blocks(cam_name)
+        for block in blocks:
+            cfg_cam = _ETree.fromstring(block)
+            for tgt_pass in cfg_cam.findall("./*[@type='PASS']"):
+                pass_name = tgt_pass.attrib['realName']
+                if pass_name not in cam.passes:
+                    cam.passes[pass_name] = RadishPass(pass_name)
+                self._parse_pass_xml(cam.passes[pass_name], tgt_pass)
+
+        # A camera read from a single element is unchanged, so that element can be written back out as-is
+        if len(blocks) == 1:
+            with self._io_lock:
+                self._xml_blocks[cam_name] = blocks[0]
+            cam.set_clean()
+
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug('Lazy loaded Camera %s - %d Passes in %.3fs' % (cam_name, len(cam.passes), _timer() - start))
+
+        return cam
+
+    def _lazy_cam_missing(self, cam_name):
+        """
+        Used by RadishLazyCams when a camera that hasn't been loaded yet is no longer in the config on disk.  It's
+        been dropped from memory, so the pass index is counted again from the current offset index.
+        :param cam_name: String, name of camera.
+        :return: None
+        """
+        _log.warning('Cam %s has been removed from the config on disk - Dropping it' % cam_name)
+        self._rebuild_pass_index()
 
     def write_config_xml(self):
         # TODO: Implement writing of .misc{} attributes
         """
-        This will parse RadishIO's memory into an XML ETree object and then write it to disk.
-        :return: None
+        This will write RadishIO's memory to disk as XML.
+        Each camera is serialized to its own block, which is cached until the camera or one of its passes is marked
+        dirty - unchanged cameras are spliced through from that cache, and cameras that were never loaded in lazy mode
+        are copied straight from the current config.
+        :return: Bool, True if the config was written.
+        """
+        self.flush_writes()
+        return self._run_write_job(self._prepare_write_xml())
+
+    def _prepare_write_xml(self):
+        """
+        Snapshots what write_config_xml() needs from memory, so the write itself can run on another thread.
+        Dirty cameras are copied and marked clean, and their copy stands in for the serialized block until a write
+        replaces it.
+        :return: Write job, see _run_write_job()
+        """
+        cfg_blocks = []
+        for cam_name in self.cams:
+            if isinstance(self.cams, RadishLazyCams) and not self.cams.is_loaded(cam_name):
+                source = None
+            else:
+                src_cam = self.cams[cam_name]
+                if src_cam.is_dirty() or cam_name not in self._xml_blocks:
+                    snapshot = RadishCam(cam_name)
+                    snapshot.passes = dict(src_cam.passes)
+                    src_cam.set_clean()
+                    with self._io_lock:
+                        self._xml_blocks[cam_name] = snapshot
+                source = self._xml_blocks[cam_name]
+            cfg_blocks.append((cam_name, source, list(self._get_pass_names(cam_name))))
+
+        return 'XML', (cfg_blocks, self._delta_base)
+
+    def _write_xml(self, cfg_blocks, delta_base):
+        """
+        Writes a snapshot taken by _prepare_write_xml() to disk.
+        :param cfg_blocks: List of (cam_name, source, pass_names) tuples, where source is a serialized block, a
+        RadishCam still to be serialized, or None to copy the camera from the current config.
+        :param delta_base: String, see delta_base.  Saved as an attribute of the root element.
+        :return: Bool, True if the config was written.
         """
         _log.info('Writing XML Config')
-        # Set up empty XML ETree
-        cfg_tree = _ETree.ElementTree(_ETree.Element('ROOT'))
-        cfg_root = cfg_tree.getroot()
-
-        # Iterate over cameras
-        for src_cam in self.cams.itervalues():
-            _log.debug('Parsing Camera %s' % src_cam.name)
-            cfg_cam = _ETree.SubElement(cfg_root, _xml_tag_cleaner(src_cam.name.upper()), {'realName':src_cam.name,
-                                                                                           'type':src_cam.type})
-            # Iterate over this camera's passes
-            for src_pass in src_cam.passes.itervalues():
-                _log.debug('Parsing Pass %s for Cam %s' % (src_pass.name, src_cam.name))
-                cfg_pass = _ETree.SubElement(cfg_cam, _xml_tag_cleaner(src_pass.name.upper()), {'realName':src_pass.name,
-                                                                                                'type':src_pass.type})
-                # Iterate over this passes' settings, adding them to the XML Tree if they contain data
+        start = _timer()
+        cams_serialized = 0
+
+        # Save to disk, keeping track of where each camera ends up for the lazy offset index
+        cfg_path = _get_cfg_path('xml')
+        cfg_tmp = cfg_path.replace('radishConfig.xml', 'radishConfig.tmp')
+        index_cams = {}
+        root_attrs = {}
+        if delta_base is not None:
+            root_attrs['deltaBase'] = delta_base
+        try:
+            _log.debug('Writing to temp file %s...' % cfg_tmp)
+            with open(cfg_tmp, 'wb') as cfg_file:
+                if not cfg_blocks:
+                    cfg_file.write(_xml_start_tag('ROOT', root_attrs, empty=True) + '\n')
+                else:
+                    root_tag = _xml_start_tag('ROOT', root_attrs)
+                    cfg_file.write(root_tag)
+                    offset = len(root_tag)
+                    for cam_name, source, pass_names in cfg_blocks:
+                        if source is None:
+                            # The index is rebuilt if the config was changed by something else, which can drop cameras
+                            try:
+                                with self._io_lock:
+                                    cam_blocks = self._cam_index.read_blocks(cam_name)
+                                    pass_names = self._cam_index.get_pass_names(cam_name)
+                            except KeyError:
+                                _log.warning('Cam %s is no longer in the config on disk - Skipping' % cam_name)
+                                continue
+                        elif isinstance(source, RadishCam):
+                            cam_blocks = [self._serialize_cam_xml(source)]
+                            cams_serialized += 1
+                            # Cache the block, unless the camera has changed again since it was snapshot
+                            with self._io_lock:
+                                if self._xml_blocks.get(cam_name) is source:
+                                    self._xml_blocks[cam_name] = cam_blocks[0]
+                        else:
+                            cam_blocks = [source]
+
+                        entry = index_cams.setdefault(cam_name, {'ranges': [], 'passes': pass_names})
+                        for block in cam_blocks:
+                            cfg_file.write('\n\t')
+                            cfg_file.write(block)
+                            entry['ranges'].append([offset + 2, offset + 2 + len(block)])
+                            offset += 2 + len(block)
+                    cfg_file.write('\n</ROOT>\n')
+        except IOError:
+            _log.exception('Unable to write config to disk!')
+            return False
+        except:
+            _log.exception('Unknown error while saving config to disk!')
+            return False
+
+        # Replace .xml file with the new .tmp, and point the lazy offset index at it.  Lazy loads read through the
+        # index, so they wait until both are done.
+        with self._io_lock:
+            try:
+                _log.debug('Replacing working config %s...' % cfg_path)
+                if os.path.isfile(cfg_path):
+                    os.remove(cfg_path)
+                os.rename(cfg_tmp, cfg_path)
+            except (IOError, OSError):
+                _log.exception('Unable to copy temp config file from %s to %s' % (cfg_tmp, cfg_path))
+                return False
+            except:
+                _log.exception('Unknown error while copying temp config file from %s to %s!' % (cfg_tmp, cfg_path))
+                return False
+
+            if self._cam_index is not None:
+                self._cam_index.update(index_cams)
+
+        _log.info('XML Config saved to %s - %d of %d Cams serialized in %.3fs' % (cfg_path,
+                                                                                cams_serialized,
+                                                                                len(cfg_blocks),
+                                                                                _timer() - start))
+        return True
+
+    def _serialize_cam_xml(self, src_cam):
+        """
+        Serializes a camera and all of its passes to an indented XML block, as it appears under the config root.
+        The XML is written straight from memory, laid out exactly as ElementTree and xml_indent() would lay it out.
+        :param src_cam: RadishCam
+        :return: String, the XML for this camera without any leading or trailing whitespace.
+        """
+        cam_tag = _xml_tag_cleaner(src_cam.name.upper()).encode('us-ascii')
+        cam_attrs = {'realName':src_cam.name,
+                     'type':src_cam.type}
+        if not src_cam.passes:
+            return _xml_start_tag(cam_tag, cam_attrs, empty=True)
+
+        output = [_xml_start_tag(cam_tag, cam_attrs)]
+        write = output.append
+
+        # Iterate over this camera's passes
+        for src_pass in src_cam.passes.itervalues():
+            pass_tag = _xml_tag_cleaner(src_pass.name.upper()).encode('us-ascii')
+            pass_attrs = {'realName':src_pass.name,
+                          'type':src_pass.type}
+            if src_pass.base is not None:
+                pass_attrs['base'] = src_pass.base
+
+            # Iterate over this passes' settings, adding them to the XML if they contain data
+            # Each category is a list of (tag, attributes, instance names) for its objects.
+            # Objects that a delta pass doesn't have are written with a removed attribute, and no state.
+            categories = []
+            for category_tag, category in (('LAYERS', 'layers'),
+                                           ('LIGHTS', 'lights'),
+                                           ('EFFECTS', 'effects'),
+                                           ('ELEMENTS', 'elements')):
+                entries = [(removed_name, {'realName':removed_name,
+                                           'removed':'True'}, ())
+                           for removed_name in sorted(src_pass.removed.get(category, ()))]
 
                 # Layers
-                _log.debug('Layers...')
-                if len(src_pass.layers) > 0:
-                    cfg_layers = _ETree.SubElement(cfg_pass, 'LAYERS')
+                if category == 'layers':
                     for src_layer in src_pass.layers.itervalues():
-                        _ETree.SubElement(cfg_layers, _xml_tag_cleaner(src_layer.name), {'realName':src_layer.name,
-                                                                                         'on':str(src_layer.on)})
+                        entries.append((src_layer.name, {'realName':src_layer.name,
+                                                         'on':str(src_layer.on)}, ()))
 
                 # Lights
-                _log.debug('Lights...')
-                if len(src_pass.lights) > 0:
-                    cfg_lights = _ETree.SubElement(cfg_pass, 'LIGHTS')
+                elif category == 'lights':
                     for src_light in src_pass.lights.itervalues():
                         # Lights have variable attributes, so go over them one-by-one and build a dict of valid ones
                         light_attrs = {'realName':src_light.name,
@@ -275,59 +835,529 @@ class RadishIO(object):
                             light_attrs['enabled'] = str(src_light.enabled)
                         if src_light.on is not None:
                             light_attrs['on'] = str(src_light.on)
-                        cfg_light = _ETree.SubElement(cfg_lights, _xml_tag_cleaner(src_light.name), light_attrs)
-
-                        # If there are instances of this light, also add them as children
-                        for instance in src_light.instances:
-                            _ETree.SubElement(cfg_light, _xml_tag_cleaner(instance), {'realName':instance})
+                        # If there are instances of this light, they're added as children
+                        entries.append((src_light.name, light_attrs, src_light.instances))
 
                 # Effects
-                _log.debug('Effects...')
-                if len(src_pass.effects) > 0:
-                    cfg_effects = _ETree.SubElement(cfg_pass, 'EFFECTS')
+                elif category == 'effects':
                     for src_effect in src_pass.effects.itervalues():
-                        _ETree.SubElement(cfg_effects, _xml_tag_cleaner(src_effect.name), {'realName':src_effect.name,
-                                                                                           'isActive':str(src_effect.active)})
+                        entries.append((src_effect.name, {'realName':src_effect.name,
+                                                          'isActive':str(src_effect.active)}, ()))
 
                 # Elements
-                _log.debug('Elements...')
-                if len(src_pass.elements) > 0:
-                    cfg_elements = _ETree.SubElement(cfg_pass, 'ELEMENTS')
+                else:
                     for src_element in src_pass.elements.itervalues():
-                        _ETree.SubElement(cfg_elements, _xml_tag_cleaner(src_element.name), {'realName':src_element.name,
-                                                                                             'enabled':str(src_element.enabled)})
-
-
-        # XML Cleanup
-        _xml_indent(cfg_root)
+                        entries.append((src_element.name, {'realName':src_element.name,
+                                                           'enabled':str(src_element.enabled)}, ()))
+
+                if entries:
+                    categories.append((category_tag, entries))
+
+            write('\n\t\t')
+            if not categories:
+                write(_xml_start_tag(pass_tag, pass_attrs, empty=True))
+                continue
+
+            write(_xml_start_tag(pass_tag, pass_attrs))
+            for category_tag, entries in categories:
+                write('\n\t\t\t<%s>' % category_tag)
+                for name, attrs, instances in entries:
+                    tag = _xml_tag_cleaner(name).encode('us-ascii')
+                    write('\n\t\t\t\t')
+                    if not instances:
+                        write(_xml_start_tag(tag, attrs, empty=True))
+                        continue
+                    write(_xml_start_tag(tag, attrs))
+                    for instance in instances:
+                        write('\n\t\t\t\t\t')
+                        write(_xml_start_tag(_xml_tag_cleaner(instance), {'realName':instance}, empty=True))
+                    write('\n\t\t\t\t</%s>' % tag)
+                write('\n\t\t\t</%s>' % category_tag)
+            write('\n\t\t</%s>' % pass_tag)
+
+        write('\n\t</%s>' % cam_tag)
+
+        return ''.join(output)
+
+    def read_config_journal(self):
+        """
+        Rebuilds RadishIO's memory by replaying every record in the journal config.  If a record can't be read, the
+        journal is backed up, everything before that record is kept, and the journal is compacted so that later
+        appends start from a clean file.
+        :return: None
+        """
+        cfg_path = _get_cfg_path('journal')
+        self.cams = {}
+        self._delta_base = None
+        self._rebuild_pass_index()
+        self._rebuild_state_matrix()
+        self._journal_pending = []
+        self._journal_compact_due = False
 
-        # Save to disk
-        cfg_path = os.path.dirname(__file__) + '\\radishConfig.xml'
-        cfg_tmp = cfg_path.replace('radishConfig.xml', 'radishConfig.tmp')
         try:
-            _log.debug('Writing to temp file %s...' % cfg_tmp)
-            cfg_tree.write(cfg_tmp)
+            _log.info('Trying to read journal config %s' % cfg_path)
+            cfg_file = open(cfg_path, 'rb')
         except IOError:
-            _log.exception('Unable to write config to disk!')
-            return
-        except:
-            _log.exception('Unknown error while saving config to disk!')
+            _log.warning('Journal config not found - Starting with a blank slate')
+            self._journal_base_size = 0
             return
 
-        # Replace .xml file with the new .tmp
+        records = 0
+        corrupt = False
+        with cfg_file:
+            for line in cfg_file:
+                try:
+                    if not line.endswith('\n'):
+                        raise ValueError('Unterminated journal record')
+                    record = json.loads(line)
+                    self._replay_journal_record(record)
+                except (ValueError, KeyError, TypeError):
+                    # A torn record at the end of the journal is expected after a crash, anything else is not
+                    _log.error('Journal record %d is corrupt, and cannot be read!' % (records + 1))
+                    corrupt = True
+                    break
+                records += 1
+
+        # Replaying goes through the public methods, so discard the changes they queued
+        self._journal_pending = []
+        self._rebuild_state_matrix()
+        _log.info('Journal config successfully replayed - %d records' % records)
+
+        if corrupt:
+            timestamp = datetime.datetime.now().strftime('%y%m%d-%H%M')
+            backup_filepath = '%s.%s.BAK' % (cfg_path, timestamp)
+            try:
+                shutil.copyfile(cfg_path, backup_filepath)
+                _log.info('Journal backed up to %s' % backup_filepath)
+            except (IOError, OSError):
+                _log.warning('Unable to back up journal to %s!' % backup_filepath)
+            self.compact_journal()
+        else:
+            self._journal_base_size = os.path.getsize(cfg_path)
+
+    def _replay_journal_record(self, record):
+        """
+        Applies a single journal record to RadishIO's memory.
+        :param record: Dictionary, as written by _journal_change_handler()
+        :return: None
+        """
+        op = record['op']
+        if op == 'SAVE':
+            _pass_from_record(self.set_pass(record['cam'], record['pass']), record, self._intern_name)
+        elif op == 'RESET_PASS':
+            if record['cam'] in self.cams and record['pass'] in self.cams[record['cam']].passes:
+                self.reset_pass(record['cam'], record['pass'])
+        elif op == 'RESET_CAM':
+            if record['cam'] in self.cams:
+                self.reset_cam(record['cam'])
+        elif op == 'RESET_ALL':
+            self.reset_all()
+        elif op == 'SETTINGS':
+            self._delta_base = record.get('deltaBase')
+        else:
+            raise ValueError('Unknown journal operation %s' % op)
+
+    def _journal_change_handler(self, op, cam_name, pass_name):
+        """
+        Queues a journal record for a change to RadishIO's memory.  Saved passes are recorded in full.
+        """
+        record = {'op': op}
+        if cam_name is not None:
+            record['cam'] = cam_name
+        if pass_name is not None:
+            record['pass'] = pass_name
+        if op == 'SAVE':
+            record.update(_pass_to_record(self.cams[cam_name].passes[pass_name]))
+        elif op == 'SETTINGS':
+            record['deltaBase'] = self._delta_base
+
+        self._journal_pending.append(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def write_config_journal(self):
+        """
+        Appends every change made since the last write to the journal config, one record per line.
+        Compacts the journal afterwards if it has grown too large.
+        :return: Bool, True if the config was written.
+        """
+        self.flush_writes()
+        job = self._prepare_write_journal()
+        if job is None:
+            _log.debug('No changes to write to journal')
+            return True
+
+        written = self._run_write_job(job)
+        if written and self._journal_compact_due:
+            written = self._run_write_job(self._prepare_write_journal())
+        return written
+
+    def _prepare_write_journal(self):
+        """
+        Takes the journal records waiting to be written.  If the last append left the journal too large, snapshots
+        every pass for a compaction instead, which covers the waiting records as well.
+        :return: Write job, see _run_write_job(), or None if there's nothing to write.
+        """
+        if self._journal_compact_due:
+            self._journal_compact_due = False
+            self._journal_pending = []
+            return 'COMPACT', (self._snapshot_passes(), self._snapshot_settings())
+
+        if not self._journal_pending:
+            return None
+        lines = self._journal_pending
+        self._journal_pending = []
+        return 'APPEND', lines
+
+    def _append_journal(self, lines):
+        """
+        Appends records to the journal config.
+        :param lines: List of strings, journal records as queued by _journal_change_handler()
+        :return: Bool, True if the records were written.
+        """
+        cfg_path = _get_cfg_path('journal')
         try:
-            _log.debug('Replacing working config %s...' % cfg_path)
-            os.remove(cfg_path)
-            os.rename(cfg_tmp,cfg_path)
-        except IOError:
-            _log.exception('Unable to copy temp config file from %s to %s' % (cfg_tmp, cfg_path))
+            _log.debug('Appending %d records to journal %s...' % (len(lines), cfg_path))
+            with open(cfg_path, 'ab') as cfg_file:
+                for line in lines:
+                    cfg_file.write(line)
+                cfg_file.flush()
+                os.fsync(cfg_file.fileno())
+        except (IOError, OSError):
+            _log.exception('Unable to write journal to disk!')
+            return False
+
+        _log.info('Journal config saved to %s' % cfg_path)
+
+        # Compacting needs every pass in memory, so it's left to the next write
+        if os.path.getsize(cfg_path) > max(_JOURNAL_COMPACT_SIZE, 2 * self._journal_base_size):
+            self._journal_compact_due = True
+        return True
+
+    def compact_journal(self):
+        """
+        Rewrites the journal config with a single record per pass, replacing all of the history that led up to it.
+        Any changes that haven't been written yet are included.
+        :return: Bool, True if the journal was compacted.
+        """
+        self.flush_writes()
+        self._journal_pending = []
+        self._journal_compact_due = False
+        return self._run_write_job(('COMPACT', (self._snapshot_passes(), self._snapshot_settings())))
+
+    def _compact_journal(self, passes, lines):
+        """
+        Writes a snapshot taken by _snapshot_passes() to a new journal, then replaces the journal config with it.
+        :param passes: List of (cam_name, [RadishPass]) tuples.
+        :param lines: List of strings, records to append after the snapshot.
+        :return: Bool, True if the journal was compacted.
+        """
+        cfg_path = _get_cfg_path('journal')
+        cfg_tmp = cfg_path.replace('radishConfig.journal', 'radishConfig.tmp')
+        _log.info('Compacting journal config %s' % cfg_path)
+
+        try:
+            with open(cfg_tmp, 'wb') as cfg_file:
+                for cam_name, cam_passes in passes:
+                    for rad_pass in cam_passes:
+                        record = {'op': 'SAVE', 'cam': cam_name, 'pass': rad_pass.name}
+                        record.update(_pass_to_record(rad_pass))
+                        cfg_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+                for line in lines:
+                    cfg_file.write(line)
+                cfg_file.flush()
+                os.fsync(cfg_file.fileno())
+
+            if os.path.isfile(cfg_path):
+                os.remove(cfg_path)
+            os.rename(cfg_tmp, cfg_path)
+        except (IOError, OSError):
+            _log.exception('Unable to compact journal config!')
+            return False
+
+        self._journal_base_size = os.path.getsize(cfg_path)
+        _log.info('Journal config compacted to %d bytes' % self._journal_base_size)
+        return True
+
+    def _snapshot_passes(self):
+        """
+        Stored passes are replaced rather than changed, so a copy of each camera's pass list is a consistent snapshot.
+        :return: List of (cam_name, [RadishPass]) tuples.
+        """
+        return [(cam.name, cam.passes.values()) for cam in self.cams.itervalues()]
+
+    def _snapshot_settings(self):
+        """
+        :return: List of journal records for the settings that differ from the defaults, to follow a snapshot of the
+        passes in a compacted journal.
+        """
+        if self._delta_base is None:
+            return []
+        return [json.dumps({'op': 'SETTINGS', 'deltaBase': self._delta_base}, separators=(',', ':')) + '\n']
+
+    def read_config_sqlite(self):
+        """
+        Opens the SQLite config, creating it if necessary, and sets RadishIO up to load cameras from it on demand.
+        Changes to memory are applied to the database as they happen, and committed by write_config_sqlite().
+        :return: None
+        """
+        cfg_path = _get_cfg_path('sqlite')
+        _log.info('Trying to open SQLite config %s' % cfg_path)
+        if self._db is not None:
+            self._db.close()
+
+        self._db = sqlite3.connect(cfg_path)
+        self._db.execute('PRAGMA foreign_keys = ON')
+        self._db.executescript(_SQLITE_SCHEMA)
+
+        row = self._db.execute("SELECT value FROM settings WHERE key = 'deltaBase'").fetchone()
+        self._delta_base = row[0] if row is not None else None
+
+        cam_names = [row[0] for row in self._db.execute('SELECT name FROM cams')]
+        self.cams = RadishLazyCams(cam_names, self._load_cam_sqlite, self._get_pass_names_sqlite)
+        self._rebuild_pass_index()
+        self._rebuild_state_matrix()
+        _log.info('SQLite config opened - %d Cams available' % len(self.cams))
+
+    def _load_cam_sqlite(self, cam_name):
+        """
+        Used by RadishLazyCams to load a single camera and its passes from the SQLite config.
+        :param cam_name: String, name of camera.
+        :return: RadishCam
+        """
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug('Lazy loading Camera %s' % cam_name)
+        cam = RadishCam(cam_name)
+        db = self._db
+        intern_name = self._intern_name
+
+        pass_rows = db.execute('SELECT passes.id, passes.name, passes.base FROM passes JOIN cams '
+                               'ON passes.cam_id = cams.id WHERE cams.name = ?', (cam_name,)).fetchall()
+        for pass_id, pass_name, base in pass_rows:
+            rad_pass = RadishPass(pass_name)
+            rad_pass.base = intern_name(base) if base is not None else None
+            cam.passes[pass_name] = rad_pass
+
+            for category, name in db.execute('SELECT category, name FROM removed WHERE pass_id = ?', (pass_id,)):
+                rad_pass.removed.setdefault(category, set()).add(intern_name(name))
+
+            for name, on, misc in db.execute('SELECT name, is_on, misc FROM layers WHERE pass_id = ?', (pass_id,)):
+                name = intern_name(name)
+                rad_pass.layers[name] = RadishLayer(name, _sql_to_bool(on), _sql_to_misc(misc))
+
+            instances = {}
+            for light_id, name in db.execute('SELECT light_instances.light_id, light_instances.name '
+                                             'FROM light_instances JOIN lights ON light_instances.light_id = lights.id '
+                                             'WHERE lights.pass_id = ? ORDER BY light_instances.position',
+                                             (pass_id,)):
+                instances.setdefault(light_id, []).append(intern_name(name))
+            for light_id, name, enabled, on, misc in db.execute('SELECT id, name, enabled, is_on, misc FROM lights '
+                                                                'WHERE pass_id = ?', (pass_id,)):
+                name = intern_name(name)
+                rad_pass.lights[name] = RadishLight(name, _sql_to_bool(enabled), _sql_to_bool(on),
+                                                    tuple(instances.get(light_id, ())), _sql_to_misc(misc))
+
+            for name, active, misc in db.execute('SELECT name, is_active, misc FROM effects WHERE pass_id = ?',
+                                                 (pass_id,)):
+                name = intern_name(name)
+                rad_pass.effects[name] = RadishEffect(name, _sql_to_bool(active), _sql_to_misc(misc))
+
+            for name, enabled, misc in db.execute('SELECT name, enabled, misc FROM elements WHERE pass_id = ?',
+                                                  (pass_id,)):
+                name = intern_name(name)
+                rad_pass.elements[name] = RadishElement(name, enabled, _sql_to_misc(misc))
+
+        cam.set_clean()
+        return cam
+
+    def _get_pass_names_sqlite(self, cam_name):
+        """
+        Used by RadishLazyCams to list the passes of a camera that hasn't been loaded yet.
+        """
+        return [row[0] for row in self._db.execute('SELECT passes.name FROM passes JOIN cams '
+                                                   'ON passes.cam_id = cams.id WHERE cams.name = ?', (cam_name,))]
+
+    def _sqlite_change_handler(self, op, cam_name, pass_name):
+        """
+        Applies a change to RadishIO's memory to the SQLite config, inside the transaction that the next write
+        will commit.  Saving a pass only replaces the rows belonging to that pass.
+        """
+        db = self._db
+        if op == 'SAVE':
+            rad_pass = self.cams[cam_name].passes[pass_name]
+            db.execute('INSERT OR IGNORE INTO cams (name) VALUES (?)', (cam_name,))
+            cam_id = db.execute('SELECT id FROM cams WHERE name = ?', (cam_name,)).fetchone()[0]
+            db.execute('INSERT OR IGNORE INTO passes (cam_id, name) VALUES (?, ?)', (cam_id, pass_name))
+            pass_id = db.execute('SELECT id FROM passes WHERE cam_id = ? AND name = ?',
+                                 (cam_id, pass_name)).fetchone()[0]
+            db.execute('UPDATE passes SET base = ? WHERE id = ?', (rad_pass.base, pass_id))
+
+            for table in ('layers', 'lights', 'effects', 'elements', 'removed'):
+                db.execute('DELETE FROM %s WHERE pass_id = ?' % table, (pass_id,))
+
+            db.executemany('INSERT INTO removed (pass_id, category, name) VALUES (?, ?, ?)',
+                           [(pass_id, category, name) for category, names in rad_pass.removed.iteritems()
+                            for name in names])
+
+            db.executemany('INSERT INTO layers (pass_id, name, is_on, misc) VALUES (?, ?, ?, ?)',
+                           [(pass_id, l.name, _sql_from_bool(l.on), _sql_from_misc(l.misc))
+                            for l in rad_pass.layers.itervalues()])
+            for l in rad_pass.lights.itervalues():
+                light_id = db.execute('INSERT INTO lights (pass_id, name, enabled, is_on, misc) VALUES (?, ?, ?, ?, ?)',
+                                      (pass_id, l.name, _sql_from_bool(l.enabled), _sql_from_bool(l.on),
+                                       _sql_from_misc(l.misc))).lastrowid
+                db.executemany('INSERT INTO light_instances (light_id, position, name) VALUES (?, ?, ?)',
+                               [(light_id, i, name) for i, name in enumerate(l.instances)])
+            db.executemany('INSERT INTO effects (pass_id, name, is_active, misc) VALUES (?, ?, ?, ?)',
+                           [(pass_id, e.name, _sql_from_bool(e.active), _sql_from_misc(e.misc))
+                            for e in rad_pass.effects.itervalues()])
+            # Element state is kept as-is, the XML reader doesn't convert it to a bool either
+            db.executemany('INSERT INTO elements (pass_id, name, enabled, misc) VALUES (?, ?, ?, ?)',
+                           [(pass_id, e.name, None if e.enabled is None else str(e.enabled), _sql_from_misc(e.misc))
+                            for e in rad_pass.elements.itervalues()])
+
+        elif op == 'RESET_PASS':
+            db.execute('DELETE FROM passes WHERE name = ? AND cam_id IN (SELECT id FROM cams WHERE name = ?)',
+                       (pass_name, cam_name))
+        elif op == 'RESET_CAM':
+            db.execute('DELETE FROM cams WHERE name = ?', (cam_name,))
+        elif op == 'RESET_ALL':
+            db.execute('DELETE FROM cams')
+        elif op == 'SETTINGS':
+            if self._delta_base is None:
+                db.execute("DELETE FROM settings WHERE key = 'deltaBase'")
+            else:
+                db.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('deltaBase', ?)", (self._delta_base,))
+
+    def write_config_sqlite(self):
+        """
+        Commits every change made since the last write to the SQLite config, as a single transaction.
+        :return: Bool, True if the config was written.
+        """
+        try:
+            self._db.commit()
+        except sqlite3.Error:
+            _log.exception('Unable to write SQLite config to disk!')
+            return False
+
+        _log.info('SQLite config saved to %s' % _get_cfg_path('sqlite'))
+        return True
+
+    # -------------------
+    #  Background Writes
+    # -------------------
+    def write_async(self):
+        """
+        Hands the changes made since the last write to a worker thread, and returns straight away.
+        What's needed from memory is snapshot first, so RadishIO can keep changing while the write runs.  A write
+        queued while another is still waiting to start is merged into it, so back-to-back saves end in a single write.
+        The SQLite connection can't leave the thread that opened it, so SQLite configs are committed right here.
+        :return: None
+        """
+        if self.write == self.write_config_xml:
+            job = self._prepare_write_xml()
+        elif self.write == self.write_config_journal:
+            job = self._prepare_write_journal()
+        else:
+            self._last_write_ok = bool(self.write())
             return
-        except:
-            _log.exception('Unknown error while copying temp config file from %s to %s!' % (cfg_tmp, cfg_path))
+
+        if job is None:
             return
+        if self._writer is None:
+            self._writer = RadishConfigWriter(self._run_write_job, self._merge_write_jobs)
+        self._writer.submit(job)
+
+    def write_status(self):
+        """
+        :return: The state of the background writes - IDLE if none were made, WRITING while one is queued or running,
+        otherwise SAVED or FAILED depending on how the last one went.  For SQLite configs, which write_async() commits
+        straight away, SAVED or FAILED depending on that commit.
+        """
+        if self._writer is None:
+            if self._last_write_ok is None:
+                return 'IDLE'
+            return 'SAVED' if self._last_write_ok else 'FAILED'
+        return self._writer.status()
+
+    def flush_writes(self, timeout=None):
+        """
+        Blocks until every background write has finished.
+        :param timeout: Float, seconds to wait at most.  None waits as long as it takes.
+        :return: Bool, False if the timeout ran out first.
+        """
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def close(self):
+        """
+        Flushes background writes and stops the worker thread.  Another write_async() will start a new one.
+        The SQLite connection is closed as well, discarding any changes that haven't been written - read() opens it
+        again.
+        :return: None
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _run_write_job(self, job):
+        """
+        Carries out a write job, on whichever thread calls it.
+        :param job: (kind, data) tuple, made by _prepare_write_xml() or _prepare_write_journal()
+        :return: Bool, True if the config was written.
+        """
+        kind, data = job
+        if kind == 'XML':
+            return self._write_xml(*data)
+        elif kind == 'APPEND':
+            return self._append_journal(data)
+        elif kind == 'COMPACT':
+            return self._compact_journal(*data)
+        raise ValueError('Unknown write job %s' % kind)
+
+    @staticmethod
+    def _merge_write_jobs(queued, job):
+        """
+        Merges a new write job into one that hasn't started yet.  XML jobs and journal compactions snapshot the whole
+        config, so they replace whatever was queued - journal appends have to be kept, in order.
+        :param queued: Write job waiting to run.
+        :param job: Write job just submitted.
+        :return: Write job to run instead of both.
+        """
+        if job[0] == 'APPEND':
+            if queued[0] == 'APPEND':
+                return 'APPEND', queued[1] + job[1]
+            if queued[0] == 'COMPACT':
+                return 'COMPACT', (queued[1][0], queued[1][1] + job[1])
+        return job
+
+    def _changed(self, op, cam_name=None, pass_name=None):
+        """
+        Runs every registered change handler.
+        :param op: String, one of SAVE, RESET_PASS, RESET_CAM, RESET_ALL, or SETTINGS when delta_base changes.
+        :param cam_name: String, name of the camera that changed, if any.
+        :param pass_name: String, name of the pass that changed, if any.
+        :return: None
+        """
+        for handler in self._change_handlers:
+            handler(op, cam_name, pass_name)
 
-        _log.info('XML Config saved to %s' % cfg_path)
+    @property
+    def delta_base(self):
+        """
+        Name of the pass that save_state() stores every other pass of the same camera against, as a delta that only
+        holds what differs.  None stores every pass in full.  Deltas are resolved by get_pass().
+        Saved with the config.  Changing it doesn't touch passes already in memory, only the ones saved after.
+        """
+        return self._delta_base
 
+    @delta_base.setter
+    def delta_base(self, pass_name):
+        if pass_name != self._delta_base:
+            self._delta_base = pass_name
+            self._changed('SETTINGS')
 
     def save_state(self, cam_name, pass_name, options):
         """
@@ -341,8 +1371,20 @@ class RadishIO(object):
 
         # Set up indicated pass, or get the pass if it's already in memory.
         # Note that the pass will not be cleared, so any data that is not overwritten will remain.
-        tgt_pass = self.set_pass(cam_name, pass_name)
+        # The scene is captured into a resolved copy, which replaces the stored pass once it's complete.
+        stored_pass = self.set_pass(cam_name, pass_name)
+        if stored_pass.base is not None:
+            tgt_pass = self.get_pass(cam_name, pass_name)
+        else:
+            tgt_pass = _resolve_delta(stored_pass, None)
         _log.info('Saving Cam: %s  Pass: %s...' % (cam_name, pass_name))
+        start = _timer()
+
+        # Grab everything we need from the scene in one go, see RadishSceneCapture
+        if self.keep_scene_lookup:
+            capture = self.scene_inventory.capture(options)
+        else:
+            capture = self._capture.capture(options)
 
         # -----------------------
         # Populate pass with data
@@ -356,23 +1398,17 @@ class RadishIO(object):
             layers = {}
             layers_skipped = 0
 
-            for i in range(self._rt.layerManager.count):
-                layer = self._rt.layerManager.getLayer(i)
-
-                layer_name = layer.name
-                layer_on = layer.on
-
+            for layer_name, layer_on in capture['layers']:
                 # Validate name, skip and print error if it's not
                 if _is_ascii(layer_name) is False:
                     _log.warning('Skipping %s  -  It contains non-ASCII characters' % _xml_tag_cleaner(layer_name))
                     layers_skipped += 1
                     continue
 
+                layer_name = self._intern_name(layer_name)
                 layers[layer_name] = RadishLayer(layer_name,
                                                  layer_on)
 
-                _log.debug('Recorded layer %s' % layer_name)
-
             if layers_skipped > 0:
                 _log.warning('Skipped %d layers' % layers_skipped)
 
@@ -388,16 +1424,12 @@ class RadishIO(object):
         # Skip if their name is invalid, or if they've already been recorded (as an instance)
         if options['lights']:
             lights = {}
-            lights_ignored = []
+            lights_ignored = set()
             lights_skipped = 0
 
             # Iterate over all lights
-            for light in self._rt.lights:
-
-                light_name = light.name
-                # Set blank properties, to be set later if found
-                light_on = None
-                light_enabled = None
+            # Properties the light doesn't have are captured as None, and the instance list includes the light itself
+            for light_handle, light_name, light_on, light_enabled, light_instances_names in capture['lights']:
                 light_instances = []
 
                 # Skip if it's in the ignore list
@@ -410,38 +1442,30 @@ class RadishIO(object):
                     lights_skipped += 1
                     continue
 
-                # Try to get instances, log error and skip if we can't.
-                try:
-                    light_instances_objs = _get_instances(light)
-                    for i in light_instances_objs:
-                        i_name = i.name
-                        if not _is_ascii(i_name):
-                            _log.warning('Skipping instance %s  -  It contains non-ASCII characters' % _xml_tag_cleaner(i_name))
-                            lights_skipped += 1
-                            continue
-                        if i_name == light_name:  # The instance list includes the current light - skip it
-                            continue
-                        # Valid instance, add its name to our instance list and ignore list
-                        light_instances.append(i_name)
-                        lights_ignored.append(i_name)
-                except ValueError:
+                # Skip lights with quotation marks in their name, log error.
+                if '"' in light_name or "'" in light_name:
                     _log.warning('Skipping %s  -  It contains Quotation or Apostrophe chars!' % light_name)
                     lights_skipped += 1
                     continue
 
-                # Check if this light has an "on" or "enabled" property - save their state if they do
-                if self._rt.isProperty(light, 'on'):
-                    light_on = light.on
-                if self._rt.isProperty(light, 'enabled'):
-                    light_enabled = light.enabled
+                for i_name in light_instances_names:
+                    if not _is_ascii(i_name):
+                        _log.warning('Skipping instance %s  -  It contains non-ASCII characters'
+                                     % _xml_tag_cleaner(i_name))
+                        lights_skipped += 1
+                        continue
+                    if i_name == light_name:  # The instance list includes the current light - skip it
+                        continue
+                    # Valid instance, add its name to our instance list and ignore list
+                    light_instances.append(self._intern_name(i_name))
+                    lights_ignored.add(i_name)
 
                 # Save this light
+                light_name = self._intern_name(light_name)
                 lights[light_name] = RadishLight(light_name,
                                                  light_enabled,
                                                  light_on,
-                                                 light_instances)
-
-                _log.debug('Recorded light %s' % light_name)
+                                                 tuple(light_instances))
 
             if lights_skipped > 0:
                 _log.warning('Skipped %d lights' % lights_skipped)
@@ -459,13 +1483,7 @@ class RadishIO(object):
             effects_list = []
             effects_skipped = 0
 
-            # Note that index starts at 1, not 0!  Thanks, Autodesk!
-            for i in range(1, (self._rt.numAtmospherics + 1)):
-                effect = self._rt.getAtmospheric(i)
-
-                effect_name = effect.name
-                effect_active = self._rt.isActive(effect)
-
+            for effect_name, effect_active in capture['effects']:
                 # Validate name, skip and print error if it's not
                 if not _is_ascii(effect_name):
                     _log.warning('Skipping %s  -  It contains non-ASCII characters' % _xml_tag_cleaner(effect_name))
@@ -473,10 +1491,9 @@ class RadishIO(object):
                     continue
 
                 # Save this effect
+                effect_name = self._intern_name(effect_name)
                 effects[effect_name] = RadishEffect(effect_name,
                                                     effect_active)
-                _log.debug('Recorded Effect %s' % effect_name)
-
                 # Check for duplicate effect names
                 if effect_name in effects_list:
                     _log.warning('There are multiple Atmospheric Effects named %s!  '
@@ -500,30 +1517,22 @@ class RadishIO(object):
             elements = {}
             elements_list = []
             elements_skipped = 0
-            reMgr = self._rt.maxOps.getCurRenderElementMgr()
-
-            # Note that index starts at 0 this time.  Thanks, Autodesk!
-            for i in range(reMgr.NumRenderElements()):
-                element = reMgr.GetRenderElement(i)
-
-                element_name = element.elementName
-                element_enabled = element.enabled
 
+            for element_name, element_enabled in capture['elements']:
                 # Validate name, skip and print error if it's not
-                if not _is_ascii(element.elementName):
+                if not _is_ascii(element_name):
                     _log.warning('Skipping %s  -  It contains non-ASCII characters' % _xml_tag_cleaner(element_name))
                     elements_skipped += 1
                     continue
 
                 # Save this element
+                element_name = self._intern_name(element_name)
                 elements[element_name] = RadishElement(element_name,
                                                        element_enabled)
-                _log.debug('Recorded Element %s' % element_name)
-
                 # Check for duplicate element names
                 if element_name in elements_list:
                     _log.warning('There are multiple Render Elements named %s!  '
-                                 'They will behave unpredictably when loaded!' % element.elementName)
+                                 'They will behave unpredictably when loaded!' % element_name)
                 else:
                     elements_list.append(element_name)
 
@@ -533,38 +1542,89 @@ class RadishIO(object):
             tgt_pass.elements = elements
             _log.info('Saved Elements...')
 
-        _log.info('Saved Cam: %s  Pass: %s' % (cam_name, pass_name))
+        rebased = self._replace_pass(cam_name, pass_name, tgt_pass)
+        self._changed('SAVE', cam_name, pass_name)
+        for dependent_name in rebased:
+            self._changed('SAVE', cam_name, dependent_name)
+
+        _log.info('Saved Cam: %s  Pass: %s - %d Layers, %d Lights, %d Effects, %d Elements in %.3fs' %
+                  (cam_name, pass_name, len(tgt_pass.layers), len(tgt_pass.lights), len(tgt_pass.effects),
+                   len(tgt_pass.elements), _timer() - start))
 
 
-    def load_state(self, cam_name, pass_name, options):
+    def load_state(self, cam_name, pass_name, options, undo='SINGLE'):
         """
         Load the requested state from RadishIO's memory.
+        Only properties that differ from the current scene are written, see RadishRestorePlanner.
+        If options['fast_apply'] is set, every change is applied as one batch - see RadishBulkApply.
         :param cam_name: String, name of camera.
         :param pass_name: String, name of pass.
         :param options: Dict, options from RadishUI.
-        :return: None.
+        :param undo: Keyword, how undo is handled in fast apply mode.  SINGLE for one undo entry, OFF for none.
+        :return: RadishRestorePlan that was applied, or None if the pass couldn't be found.
         """
         _log.debug('load_state')
 
         _log.info('Loading Cam:%s  Pass:%s' % (cam_name, pass_name))
+        start = _timer()
         try:
             tgt_pass = self.get_pass(cam_name, pass_name)
         except ValueError:
             _log.exception('Unable to load state!')
             return
 
+        # Every node and layer is looked up through the same tables for this restore.  Kept tables still get their
+        # layers listed again, since renaming a layer doesn't send any of the notifications that invalidate them.
+        if not self.keep_scene_lookup:
+            self._scene_lookup.invalidate()
+        elif options['layers'] and tgt_pass.layers:
+            self._scene_lookup.refresh_layers()
+        lookup = self._scene_lookup
+
+        # Work out which writes are actually needed
+        plan = self._planner.plan(tgt_pass, options)
+
+        if options.get('fast_apply'):
+            # Hold scene change callbacks, so they can't drop the scene lookups halfway through the batch
+            self._scene_changes_held = True
+            try:
+                with rsc.RadishBulkApply(self._rt, undo):
+                    self._apply_plan(tgt_pass, plan, options, lookup)
+            finally:
+                self._scene_changes_held = False
+                changes, self._scene_changes_while_held = self._scene_changes_while_held, []
+                for change in changes:
+                    self.invalidate_scene_lookup(change)
+        else:
+            self._apply_plan(tgt_pass, plan, options, lookup)
+
+        _log.info('Skipped %d writes that already matched the scene' % plan.skipped)
+        _log.info('Loaded Cam:%s  Pass:%s - %d Layer and %d Light writes in %.3fs' % (cam_name,
+                                                                                   pass_name,
+                                                                                   len(plan.layers),
+                                                                                   len(plan.lights),
+                                                                                   _timer() - start))
+
+        return plan
+
+    def _apply_plan(self, tgt_pass, plan, options, lookup):
+        """
+        Applies a RadishRestorePlan to the scene.
+        :param tgt_pass: RadishPass being restored.
+        :param plan: RadishRestorePlan for that pass.
+        :param options: Dict, options from RadishUI.
+        :param lookup: RadishSceneLookup to find nodes and layers with.
+        :return: None
+        """
         # ----------
         #   LAYERS
         # ----------
         if options['layers'] and tgt_pass.layers:
             layers_skipped = 0
 
-            for layer in tgt_pass.layers.itervalues():
-                layer_name = layer.name
-                layer_on = layer.on
-
+            for layer_name, layer_on in plan.layers:
                 # Check if this layer is in the current scene
-                tgt_layer = self._rt.layerManager.getLayerFromName(layer_name)
+                tgt_layer = lookup.get_layer(layer_name)
                 if tgt_layer is None:
                     _log.warning('Layer %s not found in scene - Skipping' % layer_name)
                     layers_skipped += 1
@@ -572,9 +1632,6 @@ class RadishIO(object):
 
                 tgt_layer.on = layer_on
 
-                _log.debug('Layer %s is Visible: %s' % (layer_name,
-                                                        layer_on))
-
             _log.info('%d Layers restored' % (len(tgt_pass.layers) - layers_skipped))
             if layers_skipped > 0:
                 _log.warning('%d Layers skipped' % layers_skipped)
@@ -586,21 +1643,16 @@ class RadishIO(object):
         if options['lights'] and tgt_pass.lights:
             lights_skipped = 0
 
-            for light in tgt_pass.lights.itervalues():
-                light_name = light.name
-                light_on = light.on
-                light_enabled = light.enabled
-                light_instances = light.instances
-
+            for light_name, light_on, light_enabled in plan.lights:
                 # Check if this light is in the current scene
-                tgt_light = self._rt.getNodeByName(light_name)
+                tgt_light = lookup.get_node(light_name)
                 if tgt_light is None:
                     _log.warning('Light %s not found in scene - Skipping' % light_name)
                     lights_skipped += 1
                     continue
 
                 # Lights have a few possible controls - VRay Lights have both.
-                # Make sure we only try to apply settings that this light should have.
+                # The plan only holds settings that this light should have, and that need to change.
                 if light_on is not None:
                     tgt_light.on = light_on
                 if light_enabled is not None:
@@ -610,13 +1662,107 @@ class RadishIO(object):
             if lights_skipped > 0:
                 _log.warning('%d Lights skipped' % lights_skipped)
 
+    def _intern_name(self, name):
+        """
+        Gets the copy of a name held in the symbol table, adding it if it's new.  The same light and layer names show
+        up in every pass of every camera, so they should all share one string.
+        :param name: String
+        :return: String, equal to name.
+        """
+        return self._symbols.setdefault(name, name)
+
+    def enable_state_matrix(self):
+        """
+        Moves every pass in memory into a RadishStateMatrix, which stores their states as bitsets and answers questions
+        across passes.  From then on passes are stored in the matrix as they're saved, and whenever a config is read.
+        Stored passes become RadishPackedPass, which rebuild their objects on every access, so get_pass() and set_pass()
+        hand out a RadishPass instead.
+        In lazy mode this loads every camera, and so does every read while the matrix is enabled.
+        :return: RadishStateMatrix
+        """
+        if self.state_matrix is not None:
+            return self.state_matrix
+
+        self.state_matrix = rst.RadishStateMatrix()
+        self._change_handlers.append(self._state_matrix_change_handler)
+        self._rebuild_state_matrix()
+
+        return self.state_matrix
+
+    def _rebuild_state_matrix(self):
+        """
+        Stores every pass in memory in the state matrix, if it's enabled, after a reader has replaced RadishIO's
+        memory.  Readers fill in passes directly, so the change handlers never see them.
+        :return: None
+        """
+        if self.state_matrix is None:
+            return
+
+        start = _timer()
+        self.state_matrix.clear()
+        for cam_name in self.cams:
+            cam = self.cams.get(cam_name)
+            if cam is None:
+                continue
+            for pass_name in cam.passes.keys():
+                self._pack_pass(cam_name, pass_name)
+        _log.info('State matrix built - %d Passes in %.3fs' % (len(self.state_matrix), _timer() - start))
+
+    def _pack_pass(self, cam_name, pass_name):
+        """
+        Stores a pass in the state matrix, and replaces it in memory with a RadishPackedPass.
+        :return: None
+        """
+        cam = self.cams[cam_name]
+        rad_pass = cam.passes[pass_name]
+        row = self.state_matrix.set_pass(cam_name, pass_name, rad_pass)
+        cam.passes[pass_name] = RadishPackedPass(rad_pass, self.state_matrix, row)
+
+    def _state_matrix_change_handler(self, op, cam_name, pass_name):
+        """
+        Change handler that stores every saved pass in the state matrix.
+        """
+        if op == 'SAVE':
+            self._pack_pass(cam_name, pass_name)
+        elif op == 'RESET_PASS':
+            self.state_matrix.remove_pass(cam_name, pass_name)
+        elif op == 'RESET_CAM':
+            self.state_matrix.remove_cam(cam_name)
+        elif op == 'RESET_ALL':
+            self.state_matrix.clear()
+
+    def invalidate_scene_lookup(self, change='SCENE'):
+        """
+        Drops the name lookups used by load_state(), and updates or drops the scene inventory used by save_state(), see
+        keep_scene_lookup.
+        While a fast apply is running this is held, and done once the batch is finished.
+        :param change: String, what changed in the scene:
+                       NODES - Nodes were added or deleted.  The inventory is updated on the next save.
+                       RENAMED - Nodes were renamed.  The inventory reads the names again on the next save.
+                       LAYERS - Layers were added or deleted.  The inventory is kept.
+                       SCENE - Anything else, such as a new scene being opened.  The inventory is dropped.
+        :return: None
+        """
+        if self._scene_changes_held:
+            if change not in self._scene_changes_while_held:
+                self._scene_changes_while_held.append(change)
+            return
+
+        self._scene_lookup.invalidate()
+        if change in ('NODES', 'RENAMED'):
+            self.scene_inventory.changed(change)
+        elif change != 'LAYERS':
+            self.scene_inventory.invalidate()
 
     def set_cam(self, cam_name):
-        if cam_name not in self.cams:
-            _log.debug('Cam %s not found, creating new entry...' % cam_name)
-            self.cams[cam_name] = RadishCam(cam_name)
+        # Lazy cams can turn out to be missing once they're loaded, so look the camera up rather than checking for it
+        cam = self.cams.get(cam_name)
+        if cam is None:
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug('Cam %s not found, creating new entry...' % cam_name)
+            cam = self.cams[cam_name] = RadishCam(cam_name)
 
-        return self.cams[cam_name]
+        return cam
 
     def set_pass(self, cam_name, pass_name):
         """
@@ -624,37 +1770,182 @@ class RadishIO(object):
         """
         cam = self.set_cam(cam_name)
         if pass_name not in cam.passes:
-            _log.debug('Pass %s in Cam %s not found, creating new entry...' % (pass_name, cam_name))
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug('Pass %s in Cam %s not found, creating new entry...' % (pass_name, cam_name))
             cam.passes[pass_name] = RadishPass(pass_name)
+            self._index_pass(pass_name)
+        elif isinstance(cam.passes[pass_name], RadishPackedPass):
+            # Packed passes can't be changed - it's packed again when it's saved
+            cam.passes[pass_name] = cam.passes[pass_name].unpack()
 
         return cam.passes[pass_name]
 
     def get_pass(self, cam_name, pass_name):
         """
         Shorthand to return the given pass for the given camera.  Raises a ValueError if it's not found.
+        Delta passes and passes stored in the state matrix are turned into a new RadishPass, so changes made to it
+        aren't kept.
         """
-        if cam_name in self.cams:
-            if pass_name in self.cams[cam_name].passes:
+        cam = self.cams.get(cam_name)
+        if cam is not None and pass_name in cam.passes:
+            if _log.isEnabledFor(logging.DEBUG):
                 _log.debug('Got Pass %s in Cam %s' % (pass_name, cam_name))
-                return self.cams[cam_name].passes[pass_name]
+            rad_pass = cam.passes[pass_name]
+            if rad_pass.base is not None:
+                return self._resolve_pass(cam, rad_pass, set())
+            if isinstance(rad_pass, RadishPackedPass):
+                return rad_pass.unpack()
+            return rad_pass
 
         raise ValueError('Could not find Cam %s  Pass %s' % (cam_name, pass_name))
 
+    def _resolve_pass(self, cam, rad_pass, seen):
+        """
+        Resolves a delta pass, along with any chain of delta passes it's based on.
+        :param cam: RadishCam the pass belongs to.
+        :param rad_pass: RadishPass stored as a delta.
+        :param seen: Set of the names of passes already on this chain.
+        :return: New RadishPass
+        """
+        seen.add(rad_pass.name)
+        base = cam.passes.get(rad_pass.base)
+        if base is None or base.name in seen:
+            _log.warning('Base Pass %s of Pass %s in Cam %s is missing - Resolving without it' % (rad_pass.base,
+                                                                                                 rad_pass.name,
+                                                                                                 cam.name))
+            base = None
+        elif base.base is not None:
+            base = self._resolve_pass(cam, base, seen)
+
+        return _resolve_delta(rad_pass, base)
+
+    def _depends_on(self, cam, pass_name, base_name):
+        """
+        Checks whether a pass resolves through another pass, directly or further down its chain of bases.
+        :return: Boolean
+        """
+        seen = set()
+        while pass_name is not None and pass_name not in seen:
+            if pass_name == base_name:
+                return True
+            seen.add(pass_name)
+            rad_pass = cam.passes.get(pass_name)
+            pass_name = rad_pass.base if rad_pass is not None else None
+
+        return False
+
+    def _store_pass(self, cam_name, rad_pass):
+        """
+        Puts a fully resolved pass in memory, as a delta of delta_base if the camera has that pass.
+        :param cam_name: String, name of camera.
+        :param rad_pass: Fully resolved RadishPass.
+        :return: None
+        """
+        cam = self.cams[cam_name]
+        base_name = self._delta_base
+        if (base_name is not None and base_name in cam.passes and
+                not self._depends_on(cam, base_name, rad_pass.name)):
+            rad_pass = _encode_delta(rad_pass, base_name, self.get_pass(cam_name, base_name))
+
+        cam.passes[rad_pass.name] = rad_pass
+
+    def _replace_pass(self, cam_name, pass_name, rad_pass):
+        """
+        Replaces or removes a pass without changing what any other pass resolves to.  Passes stored as deltas of it
+        are resolved against the old pass first, and stored again once it has been replaced.
+        :param cam_name: String, name of camera.
+        :param pass_name: String, name of pass.
+        :param rad_pass: Fully resolved RadishPass to store, or None to remove the pass.
+        :return: List of the names of the other passes that were stored again.
+        """
+        cam = self.cams[cam_name]
+        dependents = [self.get_pass(cam_name, name) for name, p in cam.passes.items()
+                      if p.base == pass_name and name != pass_name]
+
+        if rad_pass is None:
+            del cam.passes[pass_name]
+        else:
+            self._store_pass(cam_name, rad_pass)
+        for dependent in dependents:
+            self._store_pass(cam_name, dependent)
+
+        return [dependent.name for dependent in dependents]
+
     def get_all_passes(self):
         """
         Gets all passes from RadishIO's memory and return them as a list, with no duplicates.
         :return: List containing one of every pass in memory.
         """
-        passes = []
-        for c in self.cams.itervalues():
-            for p in c.passes.itervalues():
-                if p.name in passes:
-                    continue
-                else:
-                    passes.append(p.name)
-                    _log.debug('Found Pass %s' % p.name)
+        return self._pass_index.keys()
 
-        return passes
+    def watch_pass_names(self, handler):
+        """
+        Registers a callable to run with ADD and a pass name when the first camera gets a pass of that name, and with
+        REMOVE and a pass name when the last one loses it.
+        :param handler: Callable, takes the operation and the pass name.
+        :return: List containing one of every pass in memory, as of registering.
+        """
+        self._pass_index_handlers.append(handler)
+        return self.get_all_passes()
+
+    def _index_pass(self, pass_name):
+        """
+        Counts another camera with the given pass in the pass index.
+        """
+        count = self._pass_index.get(pass_name, 0)
+        self._pass_index[pass_name] = count + 1
+        if not count:
+            for handler in self._pass_index_handlers:
+                handler('ADD', pass_name)
+
+    def _unindex_pass(self, pass_name):
+        """
+        Counts one camera less with the given pass in the pass index.
+        """
+        count = self._pass_index[pass_name] - 1
+        if count:
+            self._pass_index[pass_name] = count
+        else:
+            del self._pass_index[pass_name]
+            for handler in self._pass_index_handlers:
+                handler('REMOVE', pass_name)
+
+    def _rebuild_pass_index(self):
+        """
+        Recounts the pass index from scratch, after a reader has replaced RadishIO's memory.
+        Watchers are told about every name that came or went.
+        :return: None
+        """
+        index = {}
+        if self._db is not None:
+            # Pass names are indexed in the SQLite config, so cameras don't have to be listed one by one
+            for pass_name, count in self._db.execute('SELECT name, COUNT(*) FROM passes GROUP BY name'):
+                index[pass_name] = count
+        else:
+            for cam_name in self.cams:
+                for pass_name in self._get_pass_names(cam_name):
+                    index[pass_name] = index.get(pass_name, 0) + 1
+
+        old_index = self._pass_index
+        self._pass_index = index
+        for handler in self._pass_index_handlers:
+            for pass_name in old_index:
+                if pass_name not in index:
+                    handler('REMOVE', pass_name)
+            for pass_name in index:
+                if pass_name not in old_index:
+                    handler('ADD', pass_name)
+
+        _log.debug('Indexed %d Passes' % len(index))
+
+    def _get_pass_names(self, cam_name):
+        """
+        Gets the names of all passes in a camera, without loading the camera if it's lazy.
+        """
+        if isinstance(self.cams, RadishLazyCams):
+            return self.cams.get_pass_names(cam_name)
+
+        return self.cams[cam_name].passes.keys()
 
     def reset_pass(self, cam_name, pass_name):
         """
@@ -663,7 +1954,12 @@ class RadishIO(object):
         # Run get_pass to check if pass exists
         self.get_pass(cam_name, pass_name)
 
-        del self.cams[cam_name].passes[pass_name]
+        rebased = self._replace_pass(cam_name, pass_name, None)
+        self._unindex_pass(pass_name)
+        self.cams[cam_name].dirty = True
+        self._changed('RESET_PASS', cam_name, pass_name)
+        for dependent_name in rebased:
+            self._changed('SAVE', cam_name, dependent_name)
         _log.info('Reset Cam: %s  Pass: %s' % (cam_name, pass_name))
 
     def reset_cam(self, cam_name):
@@ -672,7 +1968,13 @@ class RadishIO(object):
         """
         # Check if camera is in memory, raise ValueError if it's not
         if cam_name in self.cams:
+            pass_names = list(self._get_pass_names(cam_name))
             del self.cams[cam_name]
+            for pass_name in pass_names:
+                self._unindex_pass(pass_name)
+            with self._io_lock:
+                self._xml_blocks.pop(cam_name, None)
+            self._changed('RESET_CAM', cam_name)
             _log.info('Reset Cam: %s' % cam_name)
         else:
             raise ValueError('Could not find Cam %s' % cam_name)
@@ -682,9 +1984,369 @@ class RadishIO(object):
         Shorthand to clear Radish's memory.  Nuclear option.
         """
         self.cams = {}
+        with self._io_lock:
+            self._xml_blocks = {}
+        self._symbols = {}
+        pass_names = self._pass_index.keys()
+        self._pass_index = {}
+        for handler in self._pass_index_handlers:
+            for pass_name in pass_names:
+                handler('REMOVE', pass_name)
+        self._changed('RESET_ALL')
         _log.info('Reset RadishIO Memory')
 
 
+def convert_config(src_type, dst_type):
+    """
+    Converts the config stored by one backend into another, replacing whatever the destination config contained.
+    eg. convert_config('XML', 'SQLITE') to move to a SQLite config, and convert_config('SQLITE', 'XML') to go back.
+    :param src_type: Keyword of the backend to read from.
+    :param dst_type: Keyword of the backend to write to.
+    :return: None
+    """
+    _log.info('Converting %s config to %s' % (src_type, dst_type))
+    src = RadishIO(runtime=None, config_type=src_type)
+    dst = RadishIO(runtime=None, config_type=dst_type)
+    dst.reset_all()
+    dst.delta_base = src.delta_base
+
+    for cam_name in src.cams:
+        for src_pass in src.cams[cam_name].passes.itervalues():
+            dst_pass = dst.set_pass(cam_name, src_pass.name)
+            dst_pass.layers = dict(src_pass.layers)
+            dst_pass.lights = dict(src_pass.lights)
+            dst_pass.effects = dict(src_pass.effects)
+            dst_pass.elements = dict(src_pass.elements)
+            dst_pass.base = src_pass.base
+            dst_pass.removed = dict(src_pass.removed)
+            dst_pass.dirty = True
+            dst._changed('SAVE', cam_name, src_pass.name)
+
+    dst.write()
+    _log.info('Converted %s config to %s' % (src_type, dst_type))
+
+
+class RadishConfigWriter(object):
+    """
+    Runs config writes for RadishIO on a daemon thread, one at a time.
+    Only one job waits at a time - submitting while one is waiting merges the two, so the thread never falls further
+    behind than the write it's on.
+    """
+    def __init__(self, run_job, merge_jobs):
+        """
+        :param run_job: Callable taking a job, returns True if it was written.
+        :param merge_jobs: Callable taking the waiting job and the new one, returns the job to run instead.
+        """
+        self._run_job = run_job
+        self._merge_jobs = merge_jobs
+
+        self._cond = threading.Condition()
+        self._queued = None
+        self._running = False
+        self._closed = False
+        self._last_ok = None
+
+        # Submitted jobs, and how many of them were merged into another instead of running on their own
+        self.submitted = 0
+        self.merged = 0
+
+        self._thread = threading.Thread(target=self._run, name='RadishConfigWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, job):
+        with self._cond:
+            self.submitted += 1
+            if self._queued is not None:
+                job = self._merge_jobs(self._queued, job)
+                self.merged += 1
+            self._queued = job
+            self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            if self._queued is not None or self._running:
+                return 'WRITING'
+            if self._last_ok is None:
+                return 'IDLE'
+            return 'SAVED' if self._last_ok else 'FAILED'
+
+    def flush(self, timeout=None):
+        """
+        Blocks until the queue is empty and nothing is running.
+        :param timeout: Float, seconds to wait at most.  None waits as long as it takes.
+        :return: Bool, False if the timeout ran out first.
+        """
+        deadline = None if timeout is None else _timer() + timeout
+        with self._cond:
+            while self._queued is not None or self._running:
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - _timer()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """
+        Flushes, then stops the thread.
+        """
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        _log.debug('Config writer closed - %d writes submitted, %d merged' % (self.submitted, self.merged))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._queued is None and not self._closed:
+                    self._cond.wait()
+                if self._queued is None:
+                    return
+                job = self._queued
+                self._queued = None
+                self._running = True
+
+            # noinspection PyBroadException
+            try:
+                ok = self._run_job(job)
+            except:
+                _log.exception('Unknown error in background config write!')
+                ok = False
+
+            with self._cond:
+                self._running = False
+                self._last_ok = bool(ok)
+                self._cond.notify_all()
+
+
+class RadishLazyCams(collections.MutableMapping):
+    """
+    Stand-in for RadishIO.cams that only materializes a RadishCam the first time it's accessed.
+    Cameras that haven't been loaded yet are pending, and can still be listed or deleted without loading them.
+    A pending camera that the loader can't find anymore is dropped, and treated as if it had never been there.
+    """
+    def __init__(self, cam_names, loader, pass_lister, on_missing=None):
+        """
+        :param cam_names: Iterable of the names of every camera in the config.
+        :param loader: Callable, takes a camera name and returns a fully populated RadishCam.  Raises KeyError if the
+        camera isn't in the config anymore.
+        :param pass_lister: Callable, takes a camera name and returns the names of its passes.
+        :param on_missing: Callable, takes the name of a camera that was dropped because the loader couldn't find it.
+        """
+        self._loaded = {}
+        self._pending = set(cam_names)
+        self._loader = loader
+        self._pass_lister = pass_lister
+        self._on_missing = on_missing
+
+    def __getitem__(self, cam_name):
+        if cam_name in self._loaded:
+            return self._loaded[cam_name]
+        if cam_name in self._pending:
+            try:
+                cam = self._loader(cam_name)
+            except KeyError:
+                self._pending.discard(cam_name)
+                if self._on_missing is not None:
+                    self._on_missing(cam_name)
+                raise KeyError(cam_name)
+            self._pending.discard(cam_name)
+            self._loaded[cam_name] = cam
+            return cam
+
+        raise KeyError(cam_name)
+
+    def __setitem__(self, cam_name, cam):
+        self._pending.discard(cam_name)
+        self._loaded[cam_name] = cam
+
+    def __delitem__(self, cam_name):
+        if cam_name in self._loaded:
+            del self._loaded[cam_name]
+        elif cam_name in self._pending:
+            self._pending.remove(cam_name)
+        else:
+            raise KeyError(cam_name)
+
+    def __contains__(self, cam_name):
+        return cam_name in self._loaded or cam_name in self._pending
+
+    def __iter__(self):
+        # Iterate over a copy, since loading cameras while iterating moves them from pending to loaded
+        return iter(self._loaded.keys() + list(self._pending))
+
+    def __len__(self):
+        return len(self._loaded) + len(self._pending)
+
+    def is_loaded(self, cam_name):
+        """
+        Checks if a camera has been materialized yet.
+        """
+        return cam_name in self._loaded
+
+    def get_pass_names(self, cam_name):
+        """
+        Gets the names of all passes in a camera, without loading it.
+        """
+        if cam_name in self._loaded:
+            return self._loaded[cam_name].passes.keys()
+        if cam_name in self._pending:
+            return self._pass_lister(cam_name)
+
+        raise KeyError(cam_name)
+
+
+class RadishCamIndex(object):
+    """
+    Index of the cameras in a XML config, mapping each camera name to the byte ranges of its elements and the names of
+    its passes.  The index is cached to disk, and is only valid for a config of the same size and modification time.
+    """
+    def __init__(self, cfg_path, idx_path):
+        """
+        :param cfg_path: String, path to the XML config.
+        :param idx_path: String, path to cache the index at.
+        """
+        self.cfg_path = cfg_path
+        self.idx_path = idx_path
+        self.cams = {}
+
+        # Size and modification time of the config this index describes
+        self._stamp = None
+
+        # Parser state, only used by build()
+        self._parser = None
+        self._depth = 0
+        self._cam = None
+
+    def _get_stamp(self):
+        stat = os.stat(self.cfg_path)
+        return [stat.st_size, stat.st_mtime]
+
+    def load(self):
+        """
+        Loads the cached index from disk.
+        :return: Bool, True if a valid index for the current config was loaded.
+        """
+        try:
+            with open(self.idx_path, 'rb') as idx_file:
+                cached = json.load(idx_file)
+        except (IOError, ValueError):
+            return False
+
+        if cached.get('stamp') != self._get_stamp():
+            _log.debug('Cached config index %s is out of date' % self.idx_path)
+            return False
+
+        self._stamp = cached['stamp']
+        self.cams = cached['cams']
+        return True
+
+    def save(self):
+        """
+        Caches the index to disk.  Failing to do so isn't fatal, the index will just be rebuilt next time.
+        :return: None
+        """
+        try:
+            with open(self.idx_path, 'wb') as idx_file:
+                json.dump({'stamp': self._stamp, 'cams': self.cams}, idx_file)
+        except IOError:
+            _log.warning('Unable to cache config index to %s' % self.idx_path)
+
+    def build(self):
+        """
+        Scans the XML config and builds the index.  Only the direct children of the root with type CAM that contain at
+        least one direct child with type PASS are indexed, same as read_config_xml().
+        :return: None
+        """
+        self.cams = {}
+        self._stamp = self._get_stamp()
+        self._depth = 0
+        self._cam = None
+
+        # Expat reports the byte offset of the start of each tag
+        self._parser = _expat.ParserCreate()
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        with open(self.cfg_path, 'rb') as cfg_file:
+            self._parser.ParseFile(cfg_file)
+
+            # End offsets point at the start of the closing tag, move them past it
+            for entry in self.cams.itervalues():
+                for cam_range in entry['ranges']:
+                    cfg_file.seek(cam_range[1])
+                    tail = ''
+                    while '>' not in tail:
+                        chunk = cfg_file.read(256)
+                        if not chunk:
+                            raise _expat.ExpatError('Unterminated camera element in %s' % self.cfg_path)
+                        tail += chunk
+                    cam_range[1] += tail.index('>') + 1
+
+        self._parser = None
+
+    def _start_element(self, tag, attrs):
+        self._depth += 1
+        if self._depth == 2 and attrs.get('type') == 'CAM':
+            self._cam = {'name': attrs['realName'],
+                         'start': self._parser.CurrentByteIndex,
+                         'passes': []}
+        elif self._depth == 3 and self._cam is not None and attrs.get('type') == 'PASS':
+            self._cam['passes'].append(attrs['realName'])
+
+    def _end_element(self, tag):
+        if self._depth == 2 and self._cam is not None:
+            # Cameras without passes are never created by read_config_xml(), so skip them here too
+            if self._cam['passes']:
+                entry = self.cams.setdefault(self._cam['name'], {'ranges': [], 'passes': []})
+                entry['ranges'].append([self._cam['start'], self._parser.CurrentByteIndex])
+                for pass_name in self._cam['passes']:
+                    if pass_name not in entry['passes']:
+                        entry['passes'].append(pass_name)
+            self._cam = None
+        self._depth -= 1
+
+    def update(self, cams):
+        """
+        Replaces the index after RadishIO has rewritten the config, and caches it to disk.
+        :param cams: Dict of camera names to their byte ranges and pass names, in the same format as .cams
+        :return: None
+        """
+        self.cams = cams
+        self._stamp = self._get_stamp()
+        self.save()
+
+    def get_pass_names(self, cam_name):
+        """
+        Gets the names of all passes indexed for a camera.
+        """
+        return list(self.cams[cam_name]['passes'])
+
+    def read_blocks(self, cam_name):
+        """
+        Reads the raw XML of every element belonging to a camera.  If the config has changed on disk since it was
+        indexed, it's indexed again first.
+        :param cam_name: String, name of camera.
+        :return: List of strings, each one a complete camera element.  Raises KeyError if the config doesn't have it.
+        """
+        if self._get_stamp() != self._stamp:
+            _log.warning('Config %s has changed on disk since it was indexed - Indexing it again' % self.cfg_path)
+            self.build()
+            self.save()
+
+        blocks = []
+        with open(self.cfg_path, 'rb') as cfg_file:
+            for start, end in self.cams[cam_name]['ranges']:
+                cfg_file.seek(start)
+                blocks.append(cfg_file.read(end - start))
+
+        return blocks
+
+
 class RadishCam(object):
     """
     RadishIO Cam data
@@ -694,7 +2356,8 @@ class RadishCam(object):
         self.name = name
         self.passes = {}
 
-        _log.debug('RadishCam %s Initialized' % self.name)
+        # Dirty until it's been written to disk - passes track their own state, see is_dirty()
+        self.dirty = True
 
     def __repr__(self):
         indent = ('\r' + (1 * '|\t'))
@@ -708,6 +2371,25 @@ class RadishCam(object):
 
         return output
 
+    def is_dirty(self):
+        """
+        Checks if this camera or any of its passes have changed since they were last written.
+        """
+        if self.dirty:
+            return True
+        for p in self.passes.itervalues():
+            if p.dirty:
+                return True
+        return False
+
+    def set_clean(self):
+        """
+        Marks this camera and all of its passes as written.
+        """
+        self.dirty = False
+        for p in self.passes.itervalues():
+            p.dirty = False
+
 
 class RadishPass(object):
     """
@@ -722,7 +2404,13 @@ class RadishPass(object):
         self.elements = {}
         self.resolution = {'x': None, 'y': None}
 
-        _log.debug('RadishPass %s Initialized' % self.name)
+        # Name of the pass this one is a delta of, if any, and the names of objects the base has that this pass
+        # doesn't, by category.  Only RadishIO.get_pass() resolves delta passes.
+        self.base = None
+        self.removed = {}
+
+        # Dirty until it's been written to disk
+        self.dirty = True
 
     def __repr__(self):
         indent = ('\r' + (2 * '|\t'))
@@ -755,18 +2443,86 @@ class RadishPass(object):
         return output
 
 
+class RadishPackedPass(object):
+    """
+    RadishIO Pass data, stored in a RadishStateMatrix.  Takes the place of a RadishPass in RadishCam.passes once the
+    state matrix is enabled, see RadishIO.enable_state_matrix().
+    Layers, lights, effects, elements and removed names are rebuilt from the matrix every time they're read, so changes
+    made to them aren't kept - RadishIO.set_pass() swaps in a RadishPass to change.
+    """
+    __slots__ = ('name', 'resolution', 'dirty', '_matrix', '_row')
+    type = 'PASS'
+
+    def __init__(self, rad_pass, matrix, row):
+        """
+        :param rad_pass: The RadishPass that was stored.
+        :param matrix: RadishStateMatrix it was stored in.
+        :param row: Row it was stored as, see RadishStateMatrix.set_pass()
+        """
+        self.name = rad_pass.name
+        self.resolution = rad_pass.resolution
+        self.dirty = rad_pass.dirty
+        self._matrix = matrix
+        self._row = row
+
+    def __repr__(self):
+        return repr(self.unpack())
+
+    @property
+    def base(self):
+        return self._row[0]
+
+    @property
+    def removed(self):
+        return self._matrix.removed_names(self._row)
+
+    @property
+    def layers(self):
+        return dict((name, RadishLayer(name, values[0], misc))
+                    for name, values, misc, _ in self._matrix.unpack(self._row, 'layers'))
+
+    @property
+    def lights(self):
+        return dict((name, RadishLight(name, values[1], values[0], instances, misc))
+                    for name, values, misc, instances in self._matrix.unpack(self._row, 'lights'))
+
+    @property
+    def effects(self):
+        return dict((name, RadishEffect(name, values[0], misc))
+                    for name, values, misc, _ in self._matrix.unpack(self._row, 'effects'))
+
+    @property
+    def elements(self):
+        return dict((name, RadishElement(name, values[0], misc))
+                    for name, values, misc, _ in self._matrix.unpack(self._row, 'elements'))
+
+    def unpack(self):
+        """
+        :return: A new RadishPass, holding the same data.
+        """
+        rad_pass = RadishPass(self.name)
+        rad_pass.resolution = dict(self.resolution)
+        for category in _CATEGORIES:
+            setattr(rad_pass, category, getattr(self, category))
+        rad_pass.base = self.base
+        rad_pass.removed = self.removed
+        rad_pass.dirty = self.dirty
+        return rad_pass
+
+
 class RadishLayer(object):
     """
     RadishIO Layer data.  If provided, misc should be a dictionary of additional properties.
     """
+    # Configs can hold millions of these, so they have no __dict__
+    __slots__ = ('name', 'on', 'misc')
+    type = 'LAYER'
+
     def __init__(self, name, on=None, misc=None):
-        self.type = 'LAYER'
         self.name = name
         self.on = on
         self.misc = misc
 
-        _log.debug('RadishLayer %s Initialized' % self.name)
-
     def __repr__(self):
         indent = ('\r' + (3 * '|\t'))
         output = '%s .type: %s' % (indent, self.type)
@@ -779,16 +2535,16 @@ class RadishLight(object):
     """
     RadishIO Light data.  If provided, misc should be a dictionary of additional properties.
     """
-    def __init__(self, name, enabled=None, on=None, instances=[], misc=None):
-        self.type = 'LIGHT'
+    __slots__ = ('name', 'enabled', 'on', 'instances', 'misc')
+    type = 'LIGHT'
+
+    def __init__(self, name, enabled=None, on=None, instances=(), misc=None):
         self.name = name
         self.enabled = enabled
         self.on = on
         self.instances = instances
         self.misc = misc
 
-        _log.debug('RadishLight %s Initialized' % self.name)
-
     def __repr__(self):
         indent = ('\r' + (3 * '|\t'))
         output = '%s .type: %s' % (indent, self.type)
@@ -803,14 +2559,14 @@ class RadishEffect(object):
     """
     RadishIO Effect data.  If provided, misc should be a dictionary of additional properties.
     """
+    __slots__ = ('name', 'active', 'misc')
+    type = 'EFFECT'
+
     def __init__(self, name, active=None, misc=None):
-        self.type = 'EFFECT'
         self.name = name
         self.active = active
         self.misc = misc
 
-        _log.debug('RadishEffect %s Initialized' % self.name)
-
     def __repr__(self):
         indent = ('\r' + (3 * '|\t'))
         output = '%s .type: %s' % (indent, self.type)
@@ -823,14 +2579,14 @@ class RadishElement(object):
     """
     RadishIO Render Element data.  If provided, misc should be a dictionary of additional properties.
     """
+    __slots__ = ('name', 'enabled', 'misc')
+    type = 'ELEMENT'
+
     def __init__(self, name, enabled=None, misc=None):
-        self.type = 'ELEMENT'
         self.name = name
         self.enabled = enabled
         self.misc = misc
 
-        _log.debug('RadishElement %s Initialized' % self.name)
-
     def __repr__(self):
         indent = ('\r' + (3 * '|\t'))
         output = '%s .type: %s' % (indent, self.type)
@@ -3,6 +3,13 @@ import pymxs
 import MaxPlus
 import logging
 
+# PySide 2
+from PySide2.QtCore import QTimer
+
+# Misc
+import collections
+import threading
+
 # PyMXS variable setup
 rt = pymxs.runtime
 
@@ -20,21 +27,99 @@ class LogToMaxListener(logging.Handler):
         self.setFormatter(logging.Formatter('%(name)s - %(levelname)s - %(message)s'))
 
     def emit(self, record):
-        output = self.format(record)
+        maxScript(self.to_maxscript(self.format(record)))
+
+    @staticmethod
+    def to_maxscript(output):
+        """
+        :param output: String, a formatted log record.
+        :return: String, MAXScript that prints it to the Listener.
+        """
         # Always strip out quotations to be safe.  @ will force it to print literally.
-        output = 'print @"' + output.replace('"', "'") + '"'
-        maxScript(output)
+        return 'print @"' + output.replace('"', "'") + '"'
+
+
+class LogToMaxListenerQueued(LogToMaxListener):
+    """
+    Buffers records and prints them to the Listener in one MAXScript evaluation per batch.
+    Batches are flushed by a timer on the main thread, or straight away once batch_size records are waiting.
+    The queue holds at most max_queue records - if it fills up the oldest are dropped, and a note of how many were
+    lost is printed with the next batch.
+    """
+    def __init__(self, interval=100, batch_size=200, max_queue=5000):
+        """
+        :param interval: Int, milliseconds between timed flushes.
+        :param batch_size: Int, number of waiting records that triggers a flush.
+        :param max_queue: Int, maximum number of waiting records.
+        """
+        super(LogToMaxListenerQueued, self).__init__()
+        self.batch_size = batch_size
+        self._queue = collections.deque(maxlen=max_queue)
+        self._dropped = 0
+        # Only the thread the handler was made on is allowed to talk to Max
+        self._main_thread = threading.current_thread()
+
+        self._timer = QTimer()
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def emit(self, record):
+        try:
+            output = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        self.acquire()
+        try:
+            if len(self._queue) == self._queue.maxlen:
+                self._dropped += 1
+            self._queue.append(output)
+            full = len(self._queue) >= self.batch_size
+        finally:
+            self.release()
+
+        if full and threading.current_thread() is self._main_thread:
+            self.flush()
+
+    def flush(self):
+        """
+        Prints every waiting record to the Listener in one evaluation.  Does nothing off the main thread.
+        """
+        if threading.current_thread() is not self._main_thread:
+            return
+
+        self.acquire()
+        try:
+            batch = list(self._queue)
+            self._queue.clear()
+            dropped = self._dropped
+            self._dropped = 0
+        finally:
+            self.release()
+
+        if dropped > 0:
+            batch.append('%s - WARNING - %d log records dropped, the Listener could not keep up' %
+                         (self.__class__.__name__, dropped))
+        if batch:
+            maxScript('\n'.join(self.to_maxscript(output) for output in batch))
+
+    def close(self):
+        self._timer.stop()
+        self.flush()
+        super(LogToMaxListenerQueued, self).close()
 
 
 # --------------------
 #    Logging Setup
 # --------------------
-def setup(log_name=None, log_level=logging.DEBUG, log_handler=LogToMaxListener):
+def setup(log_name=None, log_level=logging.DEBUG, log_handler=LogToMaxListenerQueued):
     """
     Sets up the program's logger.
     :param log_name: String. Name to give this logger, typically __name__ of calling program.
     :param log_level: A logging parameter, logging.DEBUG .INFO .WARNING etc.
-    :param log_handler: A Handler class, defaults to SimpleHandler.
+    :param log_handler: A Handler class, defaults to LogToMaxListenerQueued.
     :return: Logger object.
     """
     if log_name is not None:
@@ -47,6 +132,7 @@ def setup(log_name=None, log_level=logging.DEBUG, log_handler=LogToMaxListener):
     _log.debug('Cleaning up old handlers on logger %s...' % log_name)
     for handler in list(_log.handlers):
         _log.removeHandler(handler)
+        handler.close()
 
     _log.setLevel(log_level)
     _log.addHandler(log_handler())
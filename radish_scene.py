@@ -0,0 +1,740 @@
+# --------------------
+#       Modules
+# --------------------
+
+# Logging
+import logging
+
+_log = logging.getLogger('Radish.Scene')
+_log.info('Logger %s Active' % _log.name)
+
+# Misc
+import re
+
+# This module only talks to Max through the runtime it's given, so it can be driven by a stand-in runtime outside Max.
+
+
+# --------------------
+#   Capture Payload
+# --------------------
+
+# Separators used in capture payloads - ASCII unit and record separators.  Max lets them into object names, so every
+# name is escaped in MAXScript with rd_esc, and unescaped with _unescape.
+_FS = chr(31)
+_RS = chr(30)
+_ESC = chr(27)
+_ESCAPES = {'e': _ESC, 'f': _FS, 'r': _RS}
+_ESCAPED = re.compile(_ESC + '(.)')
+
+# Declarations shared by every script that returns a delimited payload
+_SCRIPT_LOCALS = '''
+    local fs = bit.intAsChar 31
+    local rs = bit.intAsChar 30
+    local esc = bit.intAsChar 27
+    fn rd_esc s = substituteString (substituteString (substituteString s esc (esc + "e")) fs (esc + "f")) rs (esc + "r")
+'''
+
+# MAXScript snippets used to build a capture script, one per category.  Each one appends records to stringStream ss,
+# starting with a one-letter category code and using fs / rs to separate fields and records.
+_CAPTURE_LAYERS = '''
+    for i = 0 to layerManager.count - 1 do (
+        local l = layerManager.getLayer i
+        format "L%%%%%" fs (rd_esc l.name) fs l.on rs to:ss
+    )
+'''
+
+_CAPTURE_LIGHTS = '''
+    for l in lights do (
+        local l_on = if isProperty l "on" then (l.on as string) else ""
+        local l_enabled = if isProperty l "enabled" then (l.enabled as string) else ""
+        format "G%%%%%%%%" fs l.inode.handle fs (rd_esc l.name) fs l_on fs l_enabled to:ss
+        <INSTANCES>
+        format "%" rs to:ss
+    )
+'''
+
+_CAPTURE_INSTANCES = '''if not grouped[l.inode.handle] do (
+            local l_instances = #()
+            InstanceMgr.GetInstances l &l_instances
+            for i in l_instances do (
+                grouped[i.inode.handle] = true
+                format "%%%%" fs i.inode.handle fs (rd_esc i.name) to:ss
+            )
+        )'''
+
+# Light states only, for captures that already know every light's name and instances from RadishSceneInventory
+_CAPTURE_LIGHT_STATES = '''
+    for l in lights do (
+        local l_on = if isProperty l "on" then (l.on as string) else ""
+        local l_enabled = if isProperty l "enabled" then (l.enabled as string) else ""
+        format "S%%%%%%" fs l.inode.handle fs l_on fs l_enabled rs to:ss
+    )
+'''
+
+# Names and instance groups of the nodes with the given handles, for updating RadishSceneInventory after nodes are added
+_CAPTURE_NODES = '''
+    for h in #(<HANDLES>) do (
+        local n = maxOps.getNodeByHandle h
+        if n != undefined do (
+            local n_instances = #()
+            InstanceMgr.GetInstances n &n_instances
+            format "N%%%%" fs h fs (rd_esc n.name) to:ss
+            for i in n_instances do format "%%" fs i.inode.handle to:ss
+            format "%" rs to:ss
+        )
+    )
+'''
+
+_CAPTURE_EFFECTS = '''
+    for i = 1 to numAtmospherics do (
+        local e = getAtmospheric i
+        format "E%%%%%" fs (rd_esc e.name) fs (isActive e) rs to:ss
+    )
+'''
+
+_CAPTURE_ELEMENTS = '''
+    local re_mgr = maxOps.GetCurRenderElementMgr()
+    for i = 0 to re_mgr.NumRenderElements() - 1 do (
+        local el = re_mgr.GetRenderElement i
+        format "R%%%%%" fs (rd_esc el.elementName) fs el.enabled rs to:ss
+    )
+'''
+
+
+def _payload_bool(value):
+    """
+    Converts a MAXScript boolean from a capture payload.  Empty fields are properties the object doesn't have.
+    :param value: String
+    :return: True, False, or None
+    """
+    if value == '':
+        return None
+    return value.upper() == 'TRUE'
+
+
+def _unescape(name):
+    """
+    Reverses rd_esc on a name from a payload.
+    :param name: String
+    :return: String
+    """
+    if _ESC not in name:
+        return name
+    return _ESCAPED.sub(lambda match: _ESCAPES[match.group(1)], name)
+
+
+# --------------------
+#   Capture Engine
+# --------------------
+class RadishSceneCapture(object):
+    """
+    Captures the state of the scene for RadishIO.save_state in a single MAXScript evaluation.
+    Instead of crossing from Python into Max for every property of every object, one script walks the layers, lights,
+    effects and render elements, and returns everything as one delimited string that is unpacked in Python.
+    """
+    def __init__(self, runtime):
+        """
+        :param runtime: The pymxs runtime, or anything else with an execute() method that evaluates MAXScript.
+        """
+        self._rt = runtime
+
+    def build_script(self, options, instances=True, light_states=False):
+        """
+        Builds the capture script for the requested categories.
+        :param options: Dict, options from RadishUI.
+        :param instances: Bool, also capture the instances of each light.
+        :param light_states: Bool, only capture the handle and state of each light, see RadishSceneInventory.
+        :return: String, MAXScript that evaluates to the capture payload.
+        """
+        script = ['(',
+                  _SCRIPT_LOCALS,
+                  'local ss = stringStream ""']
+        if options['layers']:
+            script.append(_CAPTURE_LAYERS)
+        if options['lights'] and light_states:
+            script.append(_CAPTURE_LIGHT_STATES)
+        elif options['lights']:
+            if instances:
+                # Handles of lights whose instance group has already been written
+                script.append('local grouped = #{}')
+            script.append(_CAPTURE_LIGHTS.replace('<INSTANCES>', _CAPTURE_INSTANCES if instances else ''))
+        if options['effects']:
+            script.append(_CAPTURE_EFFECTS)
+        if options['elements']:
+            script.append(_CAPTURE_ELEMENTS)
+        script.append('ss as string')
+        script.append(')')
+
+        return '\n'.join(script)
+
+    def parse_payload(self, payload):
+        """
+        Unpacks a capture payload.
+        :param payload: String, as returned by the capture script.
+        :return: Dict of lists, in scene order:
+                 layers: (name, on)
+                 lights: (handle, name, on, enabled, [instance names])
+                 effects: (name, active)
+                 elements: (name, enabled)
+                 light_states: (handle, on, enabled), instead of lights when capturing light states only.
+                 nodes: (handle, name), from capture_nodes()
+                 Light properties that the light doesn't have are None.
+                 Also groups, a dict of [instance handles] by handle for every captured instance group.  The members of
+                 a group share one list, as they do in lights.
+        """
+        capture = {'layers': [],
+                   'lights': [],
+                   'light_states': [],
+                   'nodes': [],
+                   'groups': {},
+                   'effects': [],
+                   'elements': []}
+        # Instance names by light handle.  Each group is only written once, so the members share one list.
+        groups = {}
+        handle_groups = capture['groups']
+
+        for record in payload.split(_RS):
+            if not record:
+                continue
+            fields = record.split(_FS)
+            code = fields[0]
+            if code == 'L':
+                capture['layers'].append((_unescape(fields[1]), _payload_bool(fields[2])))
+            elif code == 'G':
+                handle = int(fields[1])
+                if len(fields) > 5:
+                    # First light of an instance group, followed by handle/name pairs for the whole group
+                    group = [_unescape(i_name) for i_name in fields[6::2]]
+                    handle_group = [int(i_handle) for i_handle in fields[5::2]]
+                    for i_handle in handle_group:
+                        groups[i_handle] = group
+                        handle_groups[i_handle] = handle_group
+                capture['lights'].append((handle, _unescape(fields[2]), _payload_bool(fields[3]),
+                                          _payload_bool(fields[4]), groups.get(handle, [])))
+            elif code == 'S':
+                capture['light_states'].append((int(fields[1]), _payload_bool(fields[2]), _payload_bool(fields[3])))
+            elif code == 'N':
+                handle = int(fields[1])
+                capture['nodes'].append((handle, _unescape(fields[2])))
+                if handle not in handle_groups:
+                    # Every new member of a group lists the whole group, the first one is enough
+                    handle_group = [int(i_handle) for i_handle in fields[3:]]
+                    for i_handle in handle_group:
+                        handle_groups[i_handle] = handle_group
+            elif code == 'E':
+                capture['effects'].append((_unescape(fields[1]), _payload_bool(fields[2])))
+            elif code == 'R':
+                capture['elements'].append((_unescape(fields[1]), _payload_bool(fields[2])))
+            else:
+                raise ValueError('Unknown record type %s in capture payload' % code)
+
+        return capture
+
+    def capture(self, options, instances=True, light_states=False):
+        """
+        Captures the requested categories from the scene.
+        :param options: Dict, options from RadishUI.
+        :param instances: Bool, also capture the instances of each light.  If not, instance lists are empty.
+        :param light_states: Bool, only capture the handle and state of each light, see RadishSceneInventory.
+        :return: Dict of lists, see parse_payload()
+        """
+        payload = self._rt.execute(self.build_script(options, instances, light_states))
+        if payload is None:
+            raise RuntimeError('Scene capture script returned nothing')
+
+        return self.parse_payload(payload)
+
+    def capture_nodes(self, handles):
+        """
+        Captures the name and instances of the given nodes.  Nodes that aren't in the scene anymore are left out.
+        :param handles: List of node handles.
+        :return: Dict of lists, see parse_payload().  Only nodes and groups are filled in.
+        """
+        script = '\n'.join(['(',
+                            _SCRIPT_LOCALS,
+                            'local ss = stringStream ""',
+                            _CAPTURE_NODES.replace('<HANDLES>', ', '.join(str(handle) for handle in handles)),
+                            'ss as string',
+                            ')'])
+        payload = self._rt.execute(script)
+        if payload is None:
+            raise RuntimeError('Node capture script returned nothing')
+
+        return self.parse_payload(payload)
+
+
+
+# --------------------
+#   Scene Inventory
+# --------------------
+class RadishSceneInventory(object):
+    """
+    Caches the parts of a capture that only change when nodes are added, deleted or renamed - the handle, name and
+    instances of every light.  While it's built, captures only read the state of each light, which skips formatting
+    every name and walking InstanceMgr for every instance group.
+    States can change without any notification, so they're always captured.  So are layers, effects and render
+    elements, which Max doesn't reliably notify about renaming, and which are cheap to read in full.
+    The owner passes node notifications on to changed(), and the inventory is updated on the next capture, per node:
+    deleted lights are dropped, only new lights have their names and instances read, and names are read again after a
+    rename.  The handles read with the states are checked against the inventory, so a scene that changed without a
+    notification costs one extra capture rather than a stale one.  Making an instance unique doesn't change any
+    handles, and isn't caught - call invalidate() for anything but adding, deleting and renaming nodes.
+    """
+    def __init__(self, capture):
+        """
+        :param capture: RadishSceneCapture used to read the scene.
+        """
+        self._capture = capture
+
+        # Light handles in scene order, names by handle, and instance groups by handle - the members of a group share
+        # one list of handles.  None while the inventory isn't built.
+        self._handles = None
+        self._names = None
+        self._groups = None
+
+        # [(handle, name, [instance names])] in scene order, built from the above
+        self._lights = None
+
+        # Set by changed(), until the next capture updates the inventory
+        self._nodes_changed = False
+        self._renamed = False
+
+        # Captures served from the inventory as it was, after updating it, and by reading the lights in full
+        self.hits = 0
+        self.updates = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return 'RadishSceneInventory - %s Lights, %d hits, %d updates, %d misses' % (
+            'No' if self._lights is None else len(self._lights), self.hits, self.updates, self.misses)
+
+    def is_built(self):
+        """
+        Checks if the inventory is currently built.
+        """
+        return self._lights is not None
+
+    def invalidate(self):
+        """
+        Drops the inventory, so the next capture reads every light in full.
+        """
+        self._handles = None
+        self._names = None
+        self._groups = None
+        self._lights = None
+        self._nodes_changed = False
+        self._renamed = False
+
+    def changed(self, change):
+        """
+        Marks the inventory for an update on the next capture.
+        :param change: String, NODES when nodes were added or deleted, RENAMED when nodes were renamed.
+        :return: None
+        """
+        if change == 'NODES':
+            self._nodes_changed = True
+        elif change == 'RENAMED':
+            self._renamed = True
+        else:
+            raise ValueError('Unknown scene change %s' % change)
+
+    def _index(self):
+        # Instance name lists are shared by the members of a group, the same as in a capture
+        group_names = {}
+        self._lights = []
+        for handle in self._handles:
+            group = self._groups.get(handle)
+            if group is None:
+                instances = []
+            else:
+                instances = group_names.get(id(group))
+                if instances is None:
+                    instances = group_names[id(group)] = [self._names[i_handle] for i_handle in group]
+            self._lights.append((handle, self._names[handle], instances))
+
+    def _update(self, handles, names):
+        """
+        Brings the inventory up to date with the lights in the scene.
+        :param handles: List, handles of every light in scene order.
+        :param names: Dict of names by handle if they were read again, or None.
+        :return: Bool, False if a light couldn't be read.
+        """
+        current = set(handles)
+        for handle in self._handles:
+            if handle not in current:
+                del self._names[handle]
+                group = self._groups.pop(handle, None)
+                if group is not None:
+                    group.remove(handle)
+
+        new = [handle for handle in handles if handle not in self._names]
+        if new:
+            capture = self._capture.capture_nodes(new)
+            self._names.update(capture['nodes'])
+            # A group with a new member replaces the group of every member
+            self._groups.update(capture['groups'])
+            if len(capture['nodes']) != len(new):
+                return False
+        if names is not None:
+            self._names.update(names)
+
+        self._handles = handles
+        self._index()
+        _log.debug('Scene inventory updated - %d new Lights, %d Lights total' % (len(new), len(handles)))
+        return True
+
+    def capture(self, options):
+        """
+        Captures the requested categories from the scene, with instances, using the inventory for lights if it's built.
+        :param options: Dict, options from RadishUI.
+        :return: Dict of lists, see RadishSceneCapture.parse_payload()
+        """
+        if not options['lights']:
+            return self._capture.capture(options)
+
+        if self._lights is not None:
+            updated = self._nodes_changed or self._renamed
+            if self._renamed:
+                # Names are read with the states, instances are still known
+                capture = self._capture.capture(options, instances=False)
+                states = [(handle, on, enabled) for handle, name, on, enabled, _ in capture['lights']]
+                names = dict((light[0], light[1]) for light in capture['lights'])
+            else:
+                capture = self._capture.capture(options, light_states=True)
+                states = capture['light_states']
+                names = None
+            handles = [state[0] for state in states]
+            self._nodes_changed = False
+            self._renamed = False
+
+            if handles != self._handles and not updated:
+                _log.debug('Scene inventory is out of date - Lights changed without a notification')
+            elif not updated or self._update(handles, names):
+                if updated:
+                    self.updates += 1
+                else:
+                    self.hits += 1
+                capture['lights'] = [(handle, name, on, enabled, instances)
+                                     for (handle, name, instances), (_, on, enabled) in zip(self._lights, states)]
+                return capture
+            else:
+                _log.debug('Scene inventory is out of date - New lights couldn\'t be read')
+
+        self.misses += 1
+        self._nodes_changed = False
+        self._renamed = False
+        capture = self._capture.capture(options)
+        self._handles = [light[0] for light in capture['lights']]
+        self._names = dict((light[0], light[1]) for light in capture['lights'])
+        self._groups = dict(capture['groups'])
+        self._lights = [(handle, name, instances) for handle, name, on, enabled, instances in capture['lights']]
+        return capture
+
+
+# --------------------
+#    Scene Lookup
+# --------------------
+
+# MAXScript that lists every node and layer in the scene, returning their names as one delimited string each along
+# with arrays of the objects themselves, in the same order.
+_LOOKUP_SCRIPT = '''(''' + _SCRIPT_LOCALS + '''
+    local node_ss = stringStream ""
+    local layer_ss = stringStream ""
+    local scene_nodes = objects as array
+    local scene_layers = for i = 0 to layerManager.count - 1 collect (layerManager.getLayer i)
+    for n in scene_nodes do format "%%" (rd_esc n.name) rs to:node_ss
+    for l in scene_layers do format "%%" (rd_esc l.name) rs to:layer_ss
+    #(node_ss as string, scene_nodes, layer_ss as string, scene_layers)
+)'''
+
+# MAXScript that lists just the layers, in the same format as _LOOKUP_SCRIPT
+_LAYER_LOOKUP_SCRIPT = '''(''' + _SCRIPT_LOCALS + '''
+    local layer_ss = stringStream ""
+    local scene_layers = for i = 0 to layerManager.count - 1 collect (layerManager.getLayer i)
+    for l in scene_layers do format "%%" (rd_esc l.name) rs to:layer_ss
+    #(layer_ss as string, scene_layers)
+)'''
+
+
+class RadishSceneLookup(object):
+    """
+    Name to node and name to layer lookup tables for restoring passes, built with a single scene traversal.
+    Replaces a getNodeByName / getLayerFromName search per object, which makes restoring a pass quadratic.
+    Lookups are case insensitive and return the first match in scene order, the same as those MAXScript functions.
+    Only the names cross into Python up front - a node or layer is only fetched from Max when it's looked up.
+    The tables are built on first use, and kept until invalidate() is called.
+    """
+    def __init__(self, runtime):
+        """
+        :param runtime: The pymxs runtime.
+        """
+        self._rt = runtime
+        self._nodes = None
+        self._node_index = None
+        self._layers = None
+        self._layer_index = None
+
+    def _build(self):
+        _log.debug('Building scene lookup tables')
+        node_names, self._nodes, layer_names, self._layers = self._rt.execute(_LOOKUP_SCRIPT)
+        self._node_index = self._index_names(node_names)
+        self._layer_index = self._index_names(layer_names)
+        _log.debug('Scene lookup tables built - %d Nodes, %d Layers' % (len(self._node_index),
+                                                                         len(self._layer_index)))
+
+    @staticmethod
+    def _index_names(names):
+        index = {}
+        for i, name in enumerate(names.split(_RS)[:-1]):
+            index.setdefault(_unescape(name).lower(), i)
+        return index
+
+    def is_built(self):
+        """
+        Checks if the lookup tables are currently built.
+        """
+        return self._node_index is not None
+
+    def refresh_layers(self):
+        """
+        Lists the layers again, if the tables are built.  Max doesn't notify when a layer is renamed, so a restore that
+        keeps the tables refreshes the layer table first - there are few layers, so this is cheap.
+        """
+        if self._layer_index is None:
+            return
+        layer_names, self._layers = self._rt.execute(_LAYER_LOOKUP_SCRIPT)
+        self._layer_index = self._index_names(layer_names)
+
+    def invalidate(self):
+        """
+        Drops the lookup tables, so they're rebuilt on the next lookup.  Call whenever nodes or layers are added,
+        deleted or renamed.
+        """
+        self._nodes = None
+        self._node_index = None
+        self._layers = None
+        self._layer_index = None
+
+    def get_node(self, name):
+        """
+        Gets a scene node by name.
+        :param name: String, name of node.
+        :return: The node, or None if it's not in the scene.
+        """
+        if self._node_index is None:
+            self._build()
+        i = self._node_index.get(name.lower())
+        if i is None:
+            return None
+        return self._nodes[i]
+
+    def get_layer(self, name):
+        """
+        Gets a layer by name.
+        :param name: String, name of layer.
+        :return: The layer, or None if it's not in the scene.
+        """
+        if self._layer_index is None:
+            self._build()
+        i = self._layer_index.get(name.lower())
+        if i is None:
+            return None
+        return self._layers[i]
+
+
+
+# --------------------
+#   Camera Registry
+# --------------------
+
+# MAXScript that lists the handle and name of every camera in the scene, leaving out camera targets
+_CAMERAS_SCRIPT = '''(''' + _SCRIPT_LOCALS + '''
+    local ss = stringStream ""
+    for c in cameras where classOf c != Targetobject do format "%%%%" c.inode.handle fs (rd_esc c.name) rs to:ss
+    ss as string
+)'''
+
+
+class RadishCameraRegistry(object):
+    """
+    The cameras in the scene, listed with a single MAXScript evaluation and kept until invalidate() is called.
+    Camera targets are filtered out by class in the same script, instead of enumerating the properties of every camera.
+    """
+    def __init__(self, runtime):
+        """
+        :param runtime: The pymxs runtime.
+        """
+        self._rt = runtime
+        self._cameras = None
+
+    def is_built(self):
+        """
+        Checks if the camera list is currently built.
+        """
+        return self._cameras is not None
+
+    def invalidate(self):
+        """
+        Drops the camera list, so it's read again on next use.  Call whenever nodes are added, deleted or renamed.
+        """
+        self._cameras = None
+
+    def get_cameras(self):
+        """
+        :return: List of (handle, name) for every camera in the scene, in scene order.
+        """
+        if self._cameras is None:
+            payload = self._rt.execute(_CAMERAS_SCRIPT)
+            if payload is None:
+                raise RuntimeError('Camera script returned nothing')
+            self._cameras = []
+            for record in payload.split(_RS)[:-1]:
+                handle, name = record.split(_FS, 1)
+                self._cameras.append((int(handle), _unescape(name)))
+            _log.debug('Camera registry built - %d Cameras' % len(self._cameras))
+
+        return self._cameras
+
+
+# --------------------
+#   Restore Planning
+# --------------------
+
+# Stands in for the current value of something that isn't in the scene, so it never matches a stored value
+_MISSING = object()
+
+
+class RadishRestorePlan(object):
+    """
+    The changes needed to restore a pass, as worked out by RadishRestorePlanner.
+    .layers - List of (name, on) for layers that need to change.
+    .lights - List of (name, on, enabled) for lights that need to change.  Properties that already match are None.
+    .skipped - Number of property writes left out because the scene already had that value.
+    """
+    def __init__(self):
+        self.layers = []
+        self.lights = []
+        self.skipped = 0
+
+    def __repr__(self):
+        return 'RadishRestorePlan - %d Layer writes, %d Light writes, %d skipped' % (len(self.layers),
+                                                                                      len(self.lights),
+                                                                                      self.skipped)
+
+
+class RadishRestorePlanner(object):
+    """
+    Works out the minimal set of changes needed to restore a pass, so that load_state doesn't assign values the scene
+    already has.  Every assignment triggers invalidation and viewport work in Max, even when nothing changes.
+    The current state of the scene is snapshotted with a single capture.
+    """
+    def __init__(self, capture):
+        """
+        :param capture: RadishSceneCapture used to snapshot the scene.
+        """
+        self._capture = capture
+
+    def plan(self, tgt_pass, options):
+        """
+        Compares a stored pass with the current scene.
+        Objects are matched by name, case insensitively and first in scene order, like the scene lookups.
+        Anything that can't be found in the snapshot is always planned, so that load_state can report it as missing.
+        :param tgt_pass: RadishPass to restore.
+        :param options: Dict, options from RadishUI.
+        :return: RadishRestorePlan
+        """
+        plan = RadishRestorePlan()
+        do_layers = bool(options['layers'] and tgt_pass.layers)
+        do_lights = bool(options['lights'] and tgt_pass.lights)
+        if not (do_layers or do_lights):
+            return plan
+
+        snapshot = self._capture.capture({'layers': do_layers,
+                                          'lights': do_lights,
+                                          'effects': False,
+                                          'elements': False},
+                                         instances=False)
+
+        if do_layers:
+            current = {}
+            for name, on in snapshot['layers']:
+                current.setdefault(name.lower(), on)
+
+            for layer in tgt_pass.layers.itervalues():
+                if current.get(layer.name.lower(), _MISSING) == layer.on:
+                    plan.skipped += 1
+                else:
+                    plan.layers.append((layer.name, layer.on))
+
+        if do_lights:
+            current = {}
+            for handle, name, on, enabled, instances in snapshot['lights']:
+                current.setdefault(name.lower(), (on, enabled))
+
+            for light in tgt_pass.lights.itervalues():
+                current_on, current_enabled = current.get(light.name.lower(), (_MISSING, _MISSING))
+                on = light.on
+                enabled = light.enabled
+                if on is not None and on == current_on:
+                    on = None
+                    plan.skipped += 1
+                if enabled is not None and enabled == current_enabled:
+                    enabled = None
+                    plan.skipped += 1
+
+                # Lights missing from the scene are planned even if there's nothing to set, so they're reported
+                if on is not None or enabled is not None or light.name.lower() not in current:
+                    plan.lights.append((light.name, on, enabled))
+
+        return plan
+
+
+
+# --------------------
+#     Bulk Apply
+# --------------------
+class RadishBulkApply(object):
+    """
+    Context manager that groups every scene change made inside it into one batch.
+    Scene redraws are disabled until the batch is done, then the viewports are redrawn once.  Undo is either folded
+    into a single undo entry, or turned off entirely.
+    """
+    def __init__(self, runtime, undo='SINGLE', label='Radish Restore'):
+        """
+        :param runtime: The pymxs runtime.
+        :param undo: Keyword, SINGLE to record the whole batch as one undo entry, or OFF to not record it at all.
+        :param label: String, name of the undo entry.
+        """
+        if undo not in ('SINGLE', 'OFF'):
+            raise ValueError('Invalid undo mode %s - Supported modes are: SINGLE, OFF' % undo)
+
+        self._rt = runtime
+        self._undo = undo
+        self._label = label
+
+    def __enter__(self):
+        _log.debug('Starting bulk apply, undo %s' % self._undo)
+        self._rt.disableSceneRedraw()
+        if self._undo == 'SINGLE':
+            self._rt.theHold.Begin()
+        else:
+            self._rt.theHold.Suspend()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Whatever was applied before an error is still kept, and can still be undone
+        try:
+            if self._undo == 'SINGLE':
+                self._rt.theHold.Accept(self._label)
+            else:
+                self._rt.theHold.Resume()
+        finally:
+            self._rt.enableSceneRedraw()
+            self._rt.redrawViews()
+            _log.debug('Finished bulk apply')
+
+        return False
+
+
+_log.debug('module loaded')
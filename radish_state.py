@@ -0,0 +1,284 @@
+# --------------------
+#       Modules
+# --------------------
+
+# Logging
+import logging
+
+_log = logging.getLogger('Radish.State')
+_log.info('Logger %s Active' % _log.name)
+
+# Utilities
+import radish_utilities as util
+_xml_get_bool = util.xml_get_bool
+
+
+# --------------------
+#    State Matrix
+# --------------------
+
+# The boolean properties tracked for each category of a RadishPass
+_FIELDS = {'layers': ('on',),
+           'lights': ('on', 'enabled'),
+           'effects': ('active',),
+           'elements': ('enabled',)}
+
+
+def _state_bool(value):
+    """
+    Normalizes a stored state.  Element states read from XML are kept as strings.
+    :param value: Boolean, String, or None.
+    :return: True, False, or None
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if value == 'None':
+        return None
+    return _xml_get_bool(value)
+
+
+def _bit_indices(bits):
+    """
+    :param bits: Int bitset.
+    :return: List of the indices of every set bit, lowest first.
+    """
+    indices = []
+    while bits:
+        low = bits & -bits
+        indices.append(low.bit_length() - 1)
+        bits ^= low
+    return indices
+
+
+def _freeze_misc(misc):
+    """
+    :param misc: Dictionary of misc properties.
+    :return: Hashable key for a misc dictionary, so that equal ones can be shared.
+    """
+    return tuple(sorted(misc.iteritems()))
+
+
+class RadishStateMatrix(object):
+    """
+    Storage engine for the on/off states of every pass in a config, see RadishIO.enable_state_matrix().
+    Object names are interned once per category, and each pass is stored as a row of Python Int bitsets over those name
+    tables - one bitset for the objects the pass has, one for the objects a delta pass removes from its base, and for
+    each property, one for the objects that have it set and one for the objects where it's True.  A pass of thousands
+    of lights takes a few hundred bytes, rather than an object per light.
+    The rest of a pass is kept sparse in its row - light instances only for the lights that have them, and misc
+    properties as one bitset for each distinct misc dictionary, which is shared between every pass that uses it.
+    Questions across passes become bitwise operations on whole passes, with delta passes resolved against their base
+    the same way.
+    Pass keys are (cam_name, pass_name) tuples, and a pass's base is looked up in the same camera.  Rows are replaced
+    rather than changed, so a row handed out by set_pass() always holds the states it was stored with.
+    """
+    def __init__(self):
+        self._names = dict((category, []) for category in _FIELDS)
+        self._ids = dict((category, {}) for category in _FIELDS)
+        self._miscs = {}
+        # {(cam_name, pass_name): (base, {category: (stored_bits, removed_bits, {field: (set_bits, true_bits)},
+        #                                            ((misc, bits), ...))}, {light_name: instances})}
+        self._passes = {}
+
+    def __len__(self):
+        return len(self._passes)
+
+    def __contains__(self, key):
+        return key in self._passes
+
+    def _intern(self, category, name):
+        ids = self._ids[category]
+        if name not in ids:
+            ids[name] = len(self._names[category])
+            self._names[category].append(name)
+        return ids[name]
+
+    def _decode(self, category, bits):
+        names = self._names[category]
+        return [names[i] for i in _bit_indices(bits)]
+
+    def set_pass(self, cam_name, pass_name, rad_pass):
+        """
+        Stores a pass, replacing whatever was stored for it before.  Delta passes are stored as deltas.
+        :param cam_name: String, name of camera.
+        :param pass_name: String, name of pass.
+        :param rad_pass: RadishPass, or anything with the same attributes.
+        :return: The row the pass was stored as, see unpack().
+        """
+        columns = {}
+        for category, fields in _FIELDS.iteritems():
+            stored_bits = 0
+            field_bits = dict((field, [0, 0]) for field in fields)
+            misc_bits = {}
+            for name, rad_obj in getattr(rad_pass, category).iteritems():
+                bit = 1 << self._intern(category, name)
+                stored_bits |= bit
+                for field in fields:
+                    value = _state_bool(getattr(rad_obj, field))
+                    if value is not None:
+                        field_bits[field][0] |= bit
+                        if value:
+                            field_bits[field][1] |= bit
+                if rad_obj.misc:
+                    misc_key = _freeze_misc(rad_obj.misc)
+                    misc_bits[misc_key] = misc_bits.get(misc_key, 0) | bit
+
+            removed_bits = 0
+            for name in rad_pass.removed.get(category, ()):
+                removed_bits |= 1 << self._intern(category, name)
+
+            miscs = tuple((self._miscs.setdefault(misc_key, dict(misc_key)), bits)
+                          for misc_key, bits in misc_bits.iteritems())
+            columns[category] = (stored_bits, removed_bits,
+                                 dict((field, tuple(bits)) for field, bits in field_bits.iteritems()), miscs)
+
+        instances = dict((name, tuple(light.instances)) for name, light in rad_pass.lights.iteritems()
+                         if light.instances)
+        row = (rad_pass.base, columns, instances)
+        self._passes[(cam_name, pass_name)] = row
+        return row
+
+    def remove_pass(self, cam_name, pass_name):
+        self._passes.pop((cam_name, pass_name), None)
+
+    def remove_cam(self, cam_name):
+        for key in [key for key in self._passes if key[0] == cam_name]:
+            del self._passes[key]
+
+    def clear(self):
+        """
+        Drops every pass.  Name tables are kept, as the same objects tend to come back.
+        """
+        self._passes = {}
+
+    def unpack(self, row, category):
+        """
+        Lists the objects a stored pass has in one category.  Delta passes only have the objects they store.
+        :param row: Row returned by set_pass().
+        :param category: String, one of layers, lights, effects, elements.
+        :return: List of (name, values, misc, instances) tuples, with values in the order of _FIELDS, misc None if the
+        object has none, and instances an empty tuple for anything that isn't an instanced light.
+        """
+        stored_bits, removed_bits, fields, miscs = row[1][category]
+        names = self._names[category]
+        misc_by_id = {}
+        for misc, bits in miscs:
+            for i in _bit_indices(bits):
+                misc_by_id[i] = misc
+        columns = [fields[field] for field in _FIELDS[category]]
+        instances = row[2] if category == 'lights' else {}
+
+        objects = []
+        for i in _bit_indices(stored_bits):
+            bit = 1 << i
+            values = tuple(bool(true_bits & bit) if set_bits & bit else None for set_bits, true_bits in columns)
+            misc = misc_by_id.get(i)
+            objects.append((names[i], values, dict(misc) if misc is not None else None,
+                            instances.get(names[i], ())))
+        return objects
+
+    def removed_names(self, row):
+        """
+        :param row: Row returned by set_pass().
+        :return: Dictionary of the names a delta pass removes from its base, by category.
+        """
+        return dict((category, set(self._decode(category, column[1])))
+                    for category, column in row[1].iteritems() if column[1])
+
+    def _resolve(self, key, cache, seen=None):
+        """
+        Resolves the states of a stored pass against its chain of bases, same as RadishIO.get_pass().
+        :param key: (cam_name, pass_name) of a stored pass.
+        :param cache: Dictionary of passes already resolved, shared between calls.
+        :param seen: Set of the keys already on this chain.
+        :return: {category: (stored_bits, {field: (set_bits, true_bits)})}
+        """
+        if key in cache:
+            return cache[key]
+
+        base_name, columns, _ = self._passes[key]
+        seen = seen or set()
+        seen.add(key)
+        base_key = (key[0], base_name)
+        if base_name is None or base_key not in self._passes or base_key in seen:
+            base = None
+        else:
+            base = self._resolve(base_key, cache, seen)
+
+        resolved = {}
+        for category, (stored_bits, removed_bits, fields, _) in columns.iteritems():
+            if base is None:
+                resolved[category] = (stored_bits, fields)
+                continue
+            base_stored, base_fields = base[category]
+            kept = base_stored & ~removed_bits & ~stored_bits
+            resolved[category] = (kept | stored_bits,
+                                  dict((field, ((base_fields[field][0] & kept) | set_bits,
+                                                (base_fields[field][1] & kept) | true_bits))
+                                       for field, (set_bits, true_bits) in fields.iteritems()))
+        cache[key] = resolved
+        return resolved
+
+    def get(self, cam_name, pass_name, category, name, field):
+        """
+        :return: The state of one property - True, False, or None if the pass doesn't set it.
+        """
+        obj_id = self._ids[category].get(name)
+        if obj_id is None:
+            return None
+        set_bits, true_bits = self._resolve((cam_name, pass_name), {})[category][1][field]
+        bit = 1 << obj_id
+        if not set_bits & bit:
+            return None
+        return bool(true_bits & bit)
+
+    def passes_with(self, category, name, field, value=True):
+        """
+        Finds every pass where a property is set to the given state.
+        eg. passes_with('lights', 'Sun', 'on') for every pass with light Sun switched on.
+        :param category: String, one of layers, lights, effects, elements.
+        :param name: String, name of the object.
+        :param field: String, name of the property, see _FIELDS.
+        :param value: Boolean, state to look for.
+        :return: List of (cam_name, pass_name) keys.
+        """
+        obj_id = self._ids[category].get(name)
+        if obj_id is None:
+            return []
+        bit = 1 << obj_id
+        cache = {}
+        keys = []
+        for key in self._passes:
+            set_bits, true_bits = self._resolve(key, cache)[category][1][field]
+            if (true_bits if value else set_bits & ~true_bits) & bit:
+                keys.append(key)
+        return keys
+
+    def names_with(self, cam_name, pass_name, category, field, value=True):
+        """
+        :return: List of the names of every object in a pass whose property is set to the given state.
+        """
+        set_bits, true_bits = self._resolve((cam_name, pass_name), {})[category][1][field]
+        return self._decode(category, true_bits if value else set_bits & ~true_bits)
+
+    def diff(self, key_a, key_b, category):
+        """
+        Finds the objects whose state differs between two passes, including objects only one of them has.
+        eg. diff(('Cam01', 'Beauty'), ('Cam01', 'Pre-Pass'), 'lights')
+        :param key_a: (cam_name, pass_name) of the first pass.
+        :param key_b: (cam_name, pass_name) of the second pass.
+        :param category: String, one of layers, lights, effects, elements.
+        :return: List of object names.
+        """
+        cache = {}
+        stored_a, fields_a = self._resolve(key_a, cache)[category]
+        stored_b, fields_b = self._resolve(key_b, cache)[category]
+        bits = stored_a ^ stored_b
+        for field in _FIELDS[category]:
+            set_a, true_a = fields_a[field]
+            set_b, true_b = fields_b[field]
+            bits |= (set_a ^ set_b) | (true_a ^ true_b)
+        return self._decode(category, bits)
+
+
+_log.debug('module loaded')
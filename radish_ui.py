@@ -5,7 +5,8 @@
 # PySide 2
 from PySide2.QtUiTools import QUiLoader
 import PySide2.QtWidgets as QtW
-from PySide2.QtCore import QFile
+from PySide2.QtCore import QFile, QTimer, Qt
+from PySide2.QtGui import QStandardItemModel, QStandardItem
 
 # 3ds Max
 import MaxPlus
@@ -13,12 +14,21 @@ import MaxPlus
 # Misc
 import xml.etree.ElementTree as _ETree
 import datetime
+import imp
 import sys
 import os
+from timeit import default_timer as _timer
+
+# Optional - Compiles the .ui file to a Python class, see _load_ui_class()
+try:
+    import pyside2uic
+except ImportError:
+    pyside2uic = None
 
 # Local modules
 import radish_utilities as util
 import radish_io as rio
+import radish_scene as rsc
 
 # Logging
 import logging
@@ -32,6 +42,77 @@ _xml_tag_cleaner = util.xml_tag_cleaner
 _xml_get_bool = util.xml_get_bool
 _xml_indent = util.xml_indent
 
+# Notifications that add, delete or rename nodes and layers, or replace the scene entirely, with the change each one
+# is passed on to RadishIO.invalidate_scene_lookup() as
+_SCENE_CHANGE_CODES = (('SceneAddedNode', 'NODES'),
+                       ('ScenePreDeletedNode', 'NODES'),
+                       ('FilePostMerge', 'NODES'),
+                       ('NodeRenamed', 'RENAMED'),
+                       ('LayerCreated', 'LAYERS'),
+                       ('LayerDeleted', 'LAYERS'),
+                       ('FilePostOpen', 'SCENE'),
+                       ('SystemPostNew', 'SCENE'),
+                       ('SystemPostReset', 'SCENE'))
+
+
+# --------------------
+#   UI Compilation
+# --------------------
+
+# First line of a compiled UI module, recording the modification time of the .ui file it was compiled from
+_UI_CACHE_HEADER = '# Radish UI cache - Compiled from %s, modified %r\n'
+
+
+def _load_ui_class(ui_path):
+    """
+    Gets the class pyside2uic compiles a .ui file to, so the UI can be built without parsing the .ui file and searching
+    it for every widget.  The compiled module is cached next to the .ui file as <name>_ui.py, and only compiled again
+    when the .ui file's modification time changes.
+    :param ui_path: String, path to the .ui file.
+    :return: The compiled Ui_ class, or None if it isn't available - in which case use QUiLoader.
+    """
+    cache_path = os.path.splitext(ui_path)[0] + '_ui.py'
+    header = _UI_CACHE_HEADER % (os.path.basename(ui_path), os.path.getmtime(ui_path))
+
+    try:
+        with open(cache_path, 'r') as cache_file:
+            cached = cache_file.readline() == header
+    except IOError:
+        cached = False
+
+    if not cached:
+        if pyside2uic is None:
+            _log.info('pyside2uic not found - Loading UI with QUiLoader')
+            return None
+
+        _log.info('Compiling UI %s to %s' % (ui_path, cache_path))
+        cache_tmp = cache_path + '.tmp'
+        # noinspection PyBroadException
+        try:
+            with open(cache_tmp, 'w') as cache_file:
+                cache_file.write(header)
+                pyside2uic.compileUi(ui_path, cache_file)
+            if os.path.isfile(cache_path):
+                os.remove(cache_path)
+            os.rename(cache_tmp, cache_path)
+        except:
+            _log.exception('Unable to compile UI %s - Loading it with QUiLoader' % ui_path)
+            return None
+
+    # noinspection PyBroadException
+    try:
+        module = imp.load_source(os.path.splitext(os.path.basename(cache_path))[0], cache_path)
+    except:
+        _log.exception('Unable to import compiled UI %s - Loading it with QUiLoader' % cache_path)
+        return None
+
+    for name, value in vars(module).iteritems():
+        if name.startswith('Ui_'):
+            return value
+
+    _log.warning('No UI class found in %s - Loading UI with QUiLoader' % cache_path)
+    return None
+
 
 # --------------------
 #      UI Class
@@ -50,7 +131,12 @@ class RadishUI(QtW.QDialog):
         """
         # Init QtW.QDialog
         super(RadishUI, self).__init__(parent)
-        # Set up callback for camera detection
+        # Set up callback for camera detection.  ViewportChange fires continuously while orbiting or scrubbing, so it
+        # only restarts a timer, and the active camera is checked once the viewport settles.
+        self._active_camera_timer = QTimer(self)
+        self._active_camera_timer.setSingleShot(True)
+        self._active_camera_timer.setInterval(200)
+        self._active_camera_timer.timeout.connect(self._active_camera_update)
         self._active_camera_callback = MaxPlus.NotificationManager.Register(MaxPlus.NotificationCodes.ViewportChange,
                                                                             self._active_camera_handler)
 
@@ -67,15 +153,28 @@ class RadishUI(QtW.QDialog):
         #                     Main Init
         # ---------------------------------------------------
 
-        # UI Loader
+        # Seconds spent building the UI and loading the config, logged by radish.py
+        self.load_times = {'ui': 0.0, 'config': 0.0}
+        start = _timer()
 
-        ui_file = QFile(self._ui_file_string)
-        ui_file.open(QFile.ReadOnly)
+        # UI Loader
+        # Build the UI from its compiled class if we can, otherwise parse the .ui file.  Widgets are found through
+        # _rd_find_widget(), which reads them straight off the compiled class.
+
+        ui_class = _load_ui_class(self._ui_file_string)
+        if ui_class is not None:
+            self._ui = ui_class()
+            self._widget = QtW.QWidget()
+            self._ui.setupUi(self._widget)
+        else:
+            self._ui = None
+            ui_file = QFile(self._ui_file_string)
+            ui_file.open(QFile.ReadOnly)
 
-        loader = QUiLoader()
-        self._widget = loader.load(ui_file)
+            loader = QUiLoader()
+            self._widget = loader.load(ui_file)
 
-        ui_file.close()
+            ui_file.close()
 
         # Attaches loaded UI to the dialog box
 
@@ -94,36 +193,40 @@ class RadishUI(QtW.QDialog):
         # ---------------------------------------------------
 
         # Cams
-        self._rd_cam_le = self.findChild(QtW.QLineEdit, 'rd_cam_le')
-        self._rd_cam_chk = self.findChild(QtW.QCheckBox, 'rd_cam_override_chk')
-        self._rd_cam_cb = self.findChild(QtW.QComboBox, 'rd_cam_override_cb')
+        self._rd_cam_le = self._rd_find_widget(QtW.QLineEdit, 'rd_cam_le')
+        self._rd_cam_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_cam_override_chk')
+        self._rd_cam_cb = self._rd_find_widget(QtW.QComboBox, 'rd_cam_override_cb')
 
         # Passes
-        self._rd_pass_cb = self.findChild(QtW.QComboBox, 'rd_selpass_cb')
-        self._rd_pass_le = self.findChild(QtW.QLineEdit, 'rd_selpass_cust_le')
+        self._rd_pass_cb = self._rd_find_widget(QtW.QComboBox, 'rd_selpass_cb')
+        self._rd_pass_le = self._rd_find_widget(QtW.QLineEdit, 'rd_selpass_cust_le')
+        self._rd_pass_model = QStandardItemModel(self)
+        self._rd_pass_cb.setModel(self._rd_pass_model)
 
         # Options
-        self._rd_opt_lights_chk = self.findChild(QtW.QCheckBox, 'rd_opt_lights_chk')
-        self._rd_opt_layers_chk = self.findChild(QtW.QCheckBox, 'rd_opt_layers_chk')
-        self._rd_opt_resolution_chk = self.findChild(QtW.QCheckBox, 'rd_opt_resolution_chk')
-        self._rd_opt_effects_chk = self.findChild(QtW.QCheckBox, 'rd_opt_effects_chk')
-        self._rd_opt_elements_chk = self.findChild(QtW.QCheckBox, 'rd_opt_elements_chk')
+        self._rd_opt_lights_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_lights_chk')
+        self._rd_opt_layers_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_layers_chk')
+        self._rd_opt_resolution_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_resolution_chk')
+        self._rd_opt_effects_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_effects_chk')
+        self._rd_opt_elements_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_elements_chk')
+        self._rd_opt_fastapply_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_fastapply_chk')
+        self._rd_opt_delta_chk = self._rd_find_widget(QtW.QCheckBox, 'rd_opt_delta_chk')
 
         # Save / Load
-        self._rd_save_btn = self.findChild(QtW.QPushButton, 'rd_save_btn')
-        self._rd_load_btn = self.findChild(QtW.QPushButton, 'rd_load_btn')
+        self._rd_save_btn = self._rd_find_widget(QtW.QPushButton, 'rd_save_btn')
+        self._rd_load_btn = self._rd_find_widget(QtW.QPushButton, 'rd_load_btn')
 
         # Resets
-        self._rd_resetpass_btn = self.findChild(QtW.QPushButton, 'rd_clear_pass_btn')
-        self._rd_resetcam_btn = self.findChild(QtW.QPushButton, 'rd_clear_cam_btn')
-        self._rd_resetall_btn = self.findChild(QtW.QPushButton, 'rd_clear_project_btn')
+        self._rd_resetpass_btn = self._rd_find_widget(QtW.QPushButton, 'rd_clear_pass_btn')
+        self._rd_resetcam_btn = self._rd_find_widget(QtW.QPushButton, 'rd_clear_cam_btn')
+        self._rd_resetall_btn = self._rd_find_widget(QtW.QPushButton, 'rd_clear_project_btn')
 
         # Info
-        self._rd_config_le = self.findChild(QtW.QLineEdit, 'rd_config_le')
-        self._rd_status_label = self.findChild(QtW.QLabel, 'rd_status_label')
+        self._rd_config_le = self._rd_find_widget(QtW.QLineEdit, 'rd_config_le')
+        self._rd_status_label = self._rd_find_widget(QtW.QLabel, 'rd_status_label')
 
         # Dev
-        self._dev_logger_cb = self.findChild(QtW.QComboBox, 'dev_logger_cb')
+        self._dev_logger_cb = self._rd_find_widget(QtW.QComboBox, 'dev_logger_cb')
 
         # ---------------------------------------------------
         #                Function Connections
@@ -135,6 +238,9 @@ class RadishUI(QtW.QDialog):
         # Passes
         self._rd_pass_cb.currentIndexChanged.connect(self._rd_pass_handler)
 
+        # Options - Only user clicks, not the initial state set from the config
+        self._rd_opt_delta_chk.clicked.connect(self._rd_delta_handler)
+
         # Save / Load
         self._rd_save_btn.clicked.connect(self.rd_save)
         self._rd_load_btn.clicked.connect(self.rd_load)
@@ -147,6 +253,8 @@ class RadishUI(QtW.QDialog):
         # Dev
         self._dev_logger_cb.currentIndexChanged.connect(self._dev_logger_handler)
 
+        self.load_times['ui'] = _timer() - start
+
         # ---------------------------------------------------
         #                  Attribute Setup
         # ---------------------------------------------------
@@ -161,15 +269,36 @@ class RadishUI(QtW.QDialog):
                         'prepass': 'Pre-Pass',
                         'custom': 'Custom...'}
 
-        # Stores current active viewport
-        self._active_cam = self._rt.getActiveCamera()
+        # Stores the handle of the current active camera, or None
+        self._active_cam_handle = self._rd_get_handle(self._rt.getActiveCamera())
+
+        # Stores scene change callbacks, and the change each notification code stands for, set by
+        # _rd_register_scene_callbacks()
+        self._scene_callbacks = []
+        self._scene_changes = {}
+
+        # Scene cameras for the override combobox, which shows them through a model that's updated in place.  Scene
+        # changes mark the registry stale, and the model catches up once they settle, see _rd_update_cams()
+        self._rd_cameras = rsc.RadishCameraRegistry(self._rt)
+        self._rd_cam_model = QStandardItemModel(self)
+        self._rd_cam_cb.setModel(self._rd_cam_model)
+        self._rd_cam_timer = QTimer(self)
+        self._rd_cam_timer.setSingleShot(True)
+        self._rd_cam_timer.setInterval(200)
+        self._rd_cam_timer.timeout.connect(self._rd_update_cams)
+
+        # Polls background config writes for the status label, see _rd_write_config()
+        self._write_status_timer = QTimer(self)
+        self._write_status_timer.setInterval(100)
+        self._write_status_timer.timeout.connect(self._rd_write_status_handler)
 
         # Stores current options, set by _rd_get_settings()
         self._options = {'lights': None,
                          'layers': None,
                          'resolution': None,
                          'effects': None,
-                         'elements': None}
+                         'elements': None,
+                         'fast_apply': None}
 
         # DEV - Set log level
         self._dev_logger_handler()
@@ -177,9 +306,14 @@ class RadishUI(QtW.QDialog):
         # Finds and parses the config file using the specified handler
         # Also set up pass combobox, pulling custom passes from the loaded config
         try:
+            start = _timer()
             self._rd_cfg = rio.RadishIO(runtime=self._rt,
-                                        config_type='XML')
+                                        config_type='XML',
+                                        lazy=True)
+            self.load_times['config'] = _timer() - start
             self._rd_set_passes(self._rd_cfg)
+            self._rd_opt_delta_chk.setChecked(self._rd_cfg.delta_base is not None)
+            self._rd_register_scene_callbacks()
         except:
             _log.exception('Radish failed to initialize!')
             self.close()
@@ -194,12 +328,25 @@ class RadishUI(QtW.QDialog):
     #                  Private Methods
     # ---------------------------------------------------
 
+    # UI
+
+    def _rd_find_widget(self, widget_type, name):
+        """
+        Gets a widget of the loaded UI by name - from the compiled UI class if it was used, otherwise with findChild.
+        :param widget_type: Qt widget class, used by findChild.
+        :param name: String, object name of the widget.
+        :return: The widget
+        """
+        if self._ui is not None:
+            return getattr(self._ui, name)
+        return self.findChild(widget_type, name)
+
     # Cams
 
     def _rd_cam_override_handler(self):
         """
         Used by the UI to check the state of the override checkbox, and toggle the override combobox accordingly.
-        Also re-builds the list of cameras when it's activated.
+        Also brings the list of cameras up to date when it's activated.
         :return:
         """
         _log.debug('_rd_cam_override_handler')
@@ -207,38 +354,115 @@ class RadishUI(QtW.QDialog):
             self._rd_cam_le.setEnabled(False)
             self._rd_cam_cb.setEnabled(True)
 
-            tmp_cams = []
-
-            for c in self._rt.cameras:
-                if len(self._rt.getPropNames(c)) == 0:
-                    continue
-                else:
-                    tmp_cams.append(str(c.name))
-
-            self._rd_cam_cb.clear()
-            self._rd_cam_cb.addItems(tmp_cams)
+            # Without scene callbacks, nothing tells the registry when cameras change
+            if not self._scene_callbacks:
+                self._rd_cameras.invalidate()
+            self._rd_update_cams()
 
         else:
             self._rd_cam_le.setEnabled(True)
             self._rd_cam_cb.setEnabled(False)
 
+    def _rd_update_cams(self):
+        """
+        Updates the override combobox model to match the camera registry, removing, renaming and appending rows in place
+        instead of rebuilding it.  Rows are keyed on camera handle.
+        :return: None
+        """
+        self._rd_cam_timer.stop()
+        cams = self._rd_cameras.get_cameras()
+        names = dict(cams)
+
+        for row in reversed(range(self._rd_cam_model.rowCount())):
+            item = self._rd_cam_model.item(row)
+            handle = item.data(Qt.UserRole)
+            if handle not in names:
+                self._rd_cam_model.removeRow(row)
+            else:
+                if item.text() != names[handle]:
+                    item.setText(names[handle])
+                del names[handle]
+
+        for handle, name in cams:
+            if handle in names:
+                item = QStandardItem(name)
+                item.setData(handle, Qt.UserRole)
+                self._rd_cam_model.appendRow(item)
+
     def _active_camera_handler(self, code):
         """
-        This is used by the ViewportChange callback set in the RadishUI init.  It checks for changes in the
-        active camera view, and updates the GUI and _active_cam param accordingly.
+        This is used by the ViewportChange callback set in the RadishUI init.  It (re)starts the active camera timer,
+        so a burst of viewport changes ends in a single _active_camera_update()
         :param code: Callback Code
         :return: None
         """
-        _log.debug('_active_camera_handler called with event code %s' % str(code))
+        self._active_camera_timer.start()
+
+    def _active_camera_update(self):
+        """
+        Used by the active camera timer.  Checks for changes in the active camera view, and updates the GUI and
+        _active_cam_handle accordingly.  Cameras are compared by handle, and the GUI is only touched on a change.
+        :return: None
+        """
         this_cam = self._rt.getActiveCamera()
-        if self._active_cam != this_cam:
-            _log.info('_active_camera_handler - Updating')
-            self._active_cam = this_cam
-            if self._active_cam is not None:
+        this_handle = self._rd_get_handle(this_cam)
+        if self._active_cam_handle != this_handle:
+            _log.info('_active_camera_update - Updating')
+            self._active_cam_handle = this_handle
+            if this_cam is not None:
                 self._rd_cam_le.setText(this_cam.name)
             else:
                 self._rd_cam_le.setText('None')
 
+    @staticmethod
+    def _rd_get_handle(node):
+        """
+        :param node: A scene node, or None
+        :return: Int, the node's handle, or None
+        """
+        if node is None:
+            return None
+        return node.inode.handle
+
+    # Scene
+
+    def _rd_register_scene_callbacks(self):
+        """
+        Registers callbacks for every scene change that invalidates RadishIO's scene lookups or the camera registry, and
+        lets RadishIO keep its lookups between restores.  If any of them isn't available, RadishIO rebuilds its lookups
+        for every restore.
+        :return: None
+        """
+        _log.debug('_rd_register_scene_callbacks')
+        changes = {}
+        for code_name, change in _SCENE_CHANGE_CODES:
+            code = getattr(MaxPlus.NotificationCodes, code_name, None)
+            if code is None:
+                _log.warning('Notification %s not available - Scene lookups will be rebuilt on every load' % code_name)
+                return
+            changes[code] = change
+
+        self._scene_changes = changes
+        for code in changes:
+            self._scene_callbacks.append(MaxPlus.NotificationManager.Register(code, self._scene_change_handler))
+        self._rd_cfg.keep_scene_lookup = True
+
+    def _scene_change_handler(self, code):
+        """
+        This is used by the scene change callbacks set in _rd_register_scene_callbacks().  Passes the change on to
+        RadishIO, which drops its scene lookups and updates its scene inventory, and marks the camera list stale.  If
+        the override combobox is in use, its model is updated once the changes settle.
+        :param code: Callback Code
+        :return: None
+        """
+        change = self._scene_changes.get(code, 'SCENE')
+        self._rd_cfg.invalidate_scene_lookup(change)
+        if change == 'LAYERS':
+            return
+        self._rd_cameras.invalidate()
+        if self._rd_cam_chk.isChecked():
+            self._rd_cam_timer.start()
+
     # Passes
 
     def _rd_pass_handler(self):
@@ -254,32 +478,94 @@ class RadishUI(QtW.QDialog):
 
     def _rd_set_passes(self, cfg):
         """
-        Populates the pass combobox with default values and any custom passes found in the config.
+        Populates the pass combobox model with default values and any custom passes found in the config, then keeps it
+        up to date through the config's pass index, see _rd_pass_index_handler()
         :param cfg: Initialized RadishIO object
         :return: None
         """
         _log.debug('_rd_set_passes')
-        passes = cfg.get_all_passes()
-        append_list = []
 
-        # Reset the CB
-        self._rd_pass_cb.clear()
+        # Reset the model
+        self._rd_pass_model.clear()
+        for name in (self._passes['beauty'], self._passes['prepass'], self._passes['custom']):
+            self._rd_pass_model.appendRow(QStandardItem(name))
 
-        self._rd_pass_cb.addItems([self._passes['beauty'],
-                                   self._passes['prepass'],
-                                   self._passes['custom']])
+        for name in cfg.watch_pass_names(self._rd_pass_index_handler):
+            self._rd_pass_index_handler('ADD', name)
 
-        for name in passes:
-            if name not in self._passes.itervalues():
-                append_list.append(name)
+        self._rd_select_pass()
 
-        self._rd_pass_cb.insertItems(2, append_list)
+    def _rd_pass_index_handler(self, op, pass_name):
+        """
+        Used by the config's pass index.  Inserts custom passes just above Custom... as they first appear, and removes
+        them once no camera has them.
+        :param op: String, ADD or REMOVE
+        :param pass_name: String, name of pass
+        :return: None
+        """
+        if pass_name in self._passes.itervalues():
+            return
 
+        if op == 'ADD':
+            self._rd_pass_model.insertRow(self._rd_pass_model.rowCount() - 1, QStandardItem(pass_name))
+        else:
+            for item in self._rd_pass_model.findItems(pass_name, Qt.MatchExactly):
+                self._rd_pass_model.removeRow(item.row())
+
+    def _rd_select_pass(self):
+        """
+        Selects the last used pass in the pass combobox, if it's there.
+        :return: None
+        """
         _log.debug('last_pass = %s' % self._tgt_pass)
         pass_index = self._rd_pass_cb.findText(self._tgt_pass)
         if pass_index >= 0:
             self._rd_pass_cb.setCurrentIndex(pass_index)
 
+    # Config
+
+    def _rd_write_config(self):
+        """
+        Hands the config write to RadishIO's worker thread, so the Max UI doesn't wait on it.  Progress is shown in the
+        status label, see _rd_write_status_handler()
+        :return: None
+        """
+        self._rd_cfg.write_async()
+        self._rd_write_status_handler()
+        if self._rd_cfg.write_status() == 'WRITING':
+            self._write_status_timer.start()
+
+    def _rd_delta_handler(self):
+        """
+        Turns delta passes on or off for the config - while on, every other pass of a camera is saved as a delta of its
+        Beauty pass.  The choice is saved with the config straight away.
+        :return: None
+        """
+        _log.debug('_rd_delta_handler')
+        if self._rd_opt_delta_chk.isChecked():
+            self._rd_cfg.delta_base = self._passes['beauty']
+        else:
+            self._rd_cfg.delta_base = None
+        self._rd_write_config()
+
+    def _rd_write_status_handler(self):
+        """
+        Used by the write status timer to show the state of background config writes, stopping once they're done.
+        :return: None
+        """
+        status = self._rd_cfg.write_status()
+        if status == 'WRITING':
+            self._rd_status_label.setText('Saving config...')
+            return
+
+        self._write_status_timer.stop()
+        if status == 'FAILED':
+            self._rd_status_label.setText('Save failed! See log for details')
+        elif status == 'SAVED':
+            self._rd_status_label.setText('Config saved %s' % datetime.datetime.now().strftime('%H:%M:%S'))
+        else:
+            self._rd_status_label.setText('No changes to save')
+
     # Dev
 
     def _dev_logger_handler(self):
@@ -326,6 +612,7 @@ class RadishUI(QtW.QDialog):
         self._options['resolution'] = self._rd_opt_resolution_chk.isChecked()
         self._options['effects'] = self._rd_opt_effects_chk.isChecked()
         self._options['elements'] = self._rd_opt_elements_chk.isChecked()
+        self._options['fast_apply'] = self._rd_opt_fastapply_chk.isChecked()
 
         _log.debug('Cam: %s  ---   Pass: %s  ---  Options: %s' % (self._tgt_cam, self._tgt_pass, self._options))
 
@@ -351,11 +638,11 @@ class RadishUI(QtW.QDialog):
         # Save state to memory, then update pass combobox and write to disk
         try:
             self._rd_cfg.save_state(self._tgt_cam, self._tgt_pass, self._options)
-            self._rd_cfg.write()
+            self._rd_write_config()
         except:
             _log.exception('Unable to record scene state!')
 
-        self._rd_set_passes(self._rd_cfg)
+        self._rd_select_pass()
 
 
     def rd_load(self):
@@ -401,12 +688,12 @@ class RadishUI(QtW.QDialog):
         except ValueError:
             _log.exception('Unable to Reset Pass %s!' % tgt_pass)
 
-        # Update Pass list
-        self._rd_set_passes(self._rd_cfg)
+        # The pass list follows the config's pass index, so only the selection needs restoring
+        self._rd_select_pass()
 
         if save:
             try:
-                self._rd_cfg.write()
+                self._rd_write_config()
             except:
                 _log.exception('Unable to save config after resetting Pass %s!' % tgt_pass)
 
@@ -428,12 +715,12 @@ class RadishUI(QtW.QDialog):
         except ValueError:
             _log.exception('Unable to Reset Cam %s!' % tgt_cam)
 
-        # Update Pass list
-        self._rd_set_passes(self._rd_cfg)
+        # The pass list follows the config's pass index, so only the selection needs restoring
+        self._rd_select_pass()
 
         if save:
             try:
-                self._rd_cfg.write()
+                self._rd_write_config()
             except:
                 _log.exception('Unable to save config after resetting Cam %s!' % tgt_cam)
 
@@ -447,12 +734,12 @@ class RadishUI(QtW.QDialog):
 
         self._rd_cfg.reset_all()
 
-        # Update Pass list
-        self._rd_set_passes(self._rd_cfg)
+        # The pass list follows the config's pass index, so only the selection needs restoring
+        self._rd_select_pass()
 
         if save:
             try:
-                self._rd_cfg.write()
+                self._rd_write_config()
             except:
                 _log.exception('Unable to save config after resetting!')
 
@@ -466,6 +753,9 @@ class RadishUI(QtW.QDialog):
         _log.debug('closeEvent')
         _log.info('Closing RadishUI')
 
+        self._active_camera_timer.stop()
+        self._rd_cam_timer.stop()
+
         # noinspection PyBroadException
         try:
             MaxPlus.NotificationManager.Unregister(self._active_camera_callback)
@@ -473,6 +763,23 @@ class RadishUI(QtW.QDialog):
         except:
             pass
 
+        # noinspection PyBroadException
+        for callback in self._scene_callbacks:
+            try:
+                MaxPlus.NotificationManager.Unregister(callback)
+            except:
+                pass
+        self._scene_callbacks = []
+
+        # Make sure every save has reached disk before we go
+        self._write_status_timer.stop()
+        # noinspection PyBroadException
+        try:
+            self._rd_cfg.close()
+            _log.info('Config writes flushed')
+        except:
+            _log.exception('Unable to flush config writes!')
+
         event.accept()
 
 
@@ -2,6 +2,9 @@
 import pymxs
 import MaxPlus
 
+# Misc
+import re
+
 # PyMXS variable setup
 rt = pymxs.runtime
 
@@ -82,6 +85,24 @@ def get_instances(x):
 # --------------------
 #      XML Tools
 # --------------------
+
+# Matches any character that isn't ASCII
+_NON_ASCII_STR = re.compile('[\x80-\xff]')
+_NON_ASCII_UNICODE = re.compile(u'[^\x00-\x7f]')
+
+# Matches any character that str.isalnum() / unicode.isalnum() rejects, other than '_'
+# Byte strings only have ASCII alphanumerics, while unicode strings follow the unicode database.
+_NON_TAG_STR = re.compile(r'\W')
+_NON_TAG_UNICODE = re.compile(r'\W', re.UNICODE)
+
+# Bounded cache of xml_tag_cleaner results - Configs use the same few thousand names over and over.
+# It's a two generation LRU: names are looked up in the recent generation, then the old one, and are moved to the
+# recent one when used.  Once the recent generation is full it becomes the old one, dropping anything not used since.
+_TAG_CACHE_SIZE = 50000
+_tag_cache = {}
+_tag_cache_old = {}
+
+
 def is_ascii(text):
     """
     Checks if input can be conformed to ASCII format.
@@ -89,10 +110,9 @@ def is_ascii(text):
     :return: Bool
     """
     if isinstance(text, unicode):
-        try:
-            text.encode('ascii')
-        except UnicodeEncodeError:
-            return False
+        return _NON_ASCII_UNICODE.search(text) is None
+    elif isinstance(text, str):
+        return _NON_ASCII_STR.search(text) is None
     else:
         try:
             text.decode('ascii')
@@ -104,9 +124,31 @@ def is_ascii(text):
 def xml_tag_cleaner(el):
     """
     Cleans up an input for use as an XML element tag.  Works aggressively, will never fail to return a clean element.
+    Results are cached, see _TAG_CACHE_SIZE.
     :param el: The input to be cleaned up.
     :return: A valid XML tag string.
     """
+    global _tag_cache, _tag_cache_old
+
+    # Key on type as well, 'a' and u'a' are equal but their tags aren't the same type
+    key = (type(el), el)
+    output = _tag_cache.get(key)
+    if output is None:
+        output = _tag_cache_old.get(key)
+        if output is None:
+            output = _xml_tag_clean(el)
+        if len(_tag_cache) >= _TAG_CACHE_SIZE // 2:
+            _tag_cache_old = _tag_cache
+            _tag_cache = {}
+        _tag_cache[key] = output
+
+    return output
+
+
+def _xml_tag_clean(el):
+    """
+    Does the work for xml_tag_cleaner(), without the cache.
+    """
     output = el
 
     # If the string is blank, replace it with 'BLANK'
@@ -118,14 +160,12 @@ def xml_tag_cleaner(el):
 
     # Replace all non-alphanumeric characters with '_'
     if not output.isalnum():
-        loop_output = ''
-        for char in output:
-            if not char.isalnum() and char != '_':
-                loop_output += '_'
-            else:
-                loop_output += char
-
-        output = loop_output
+        if isinstance(output, unicode):
+            cleaned, replaced = _NON_TAG_UNICODE.subn(u'_', output)
+            # A name with nothing worth keeping has always come out as a byte string
+            output = cleaned if replaced < len(output) else str(cleaned)
+        else:
+            output = _NON_TAG_STR.sub('_', output)
 
     # If the first character is not a-z, or string begins with XML, prepend '_'
     if not output[0].isalpha() or output.upper().startswith('XML'):
@@ -149,30 +189,116 @@ def xml_get_bool(bool_input):
         return False
 
 
+def xml_escape_attrib(text):
+    """
+    Escapes an attribute value the same way ElementTree does, and encodes it as ASCII with character references.
+    :param text: String
+    :return: ASCII String, safe to put between double quotes.
+    """
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '\n' in text:
+        text = text.replace('\n', '&#10;')
+    return text.encode('us-ascii', 'xmlcharrefreplace')
+
+
+def xml_start_tag(tag, attrs, empty=False):
+    """
+    Formats the start tag of an element the same way ElementTree does, with its attributes sorted by name.
+    :param tag: String, a clean tag - see xml_tag_cleaner.
+    :param attrs: Dictionary of attribute names and String values.
+    :param empty: Bool, close the element in the same tag.
+    :return: ASCII String
+    """
+    output = ['<', tag.encode('us-ascii')]
+    for k, v in sorted(attrs.iteritems()):
+        output.append(' %s="%s"' % (k, xml_escape_attrib(v)))
+    output.append(' />' if empty else '>')
+    return ''.join(output)
+
+
 def xml_indent(el, depth=0, careful=False):
     """
     Formats an XML ETree with newlines and indents.
     By default, assumes that nothing is stored in el.text or el.tail.
+    Works through the tree with its own stack rather than recursing, so it isn't limited by the depth of the tree.
     :param el: Root element of XML tree.
-    :param depth: Used for recursive calls, stores depth in tree.
+    :param depth: Depth of el in the tree, if it isn't the root.
     :param careful: Checks for content in el.text and el.tail before overwriting.
     :return: None - Operates on existing tree.
     """
-    # Prep newline and indent for child elements
-    i = "\n" + depth*"\t"
+    # Prep newline and indent for each depth
+    indents = ["\n" + d*"\t" for d in range(depth + 2)]
 
-    # Check if we're being careful or not, switch accordingly
-    # If careful, append indent to contents of el.text and el.tail
-
-    # If careless, replace contents
-    if not careful:
-        if len(el):
-            el.text = i + "\t"  # Newline + Indent sub-elements
+    # Elements with sub-elements still to be formatted, with their depth and, if they're the last child of their
+    # parent, the tail that de-indents the parent's closing tag.  Elements without sub-elements are done on the spot.
+    if len(el):
+        stack = [(el, depth, None)]
+    else:
+        stack = []
+        _xml_indent_leaf(el, indents[depth], careful)
+
+    while stack:
+        el, depth, last_tail = stack.pop()
+        i = indents[depth]
+        if len(indents) < depth + 3:
+            indents.append(i + "\t\t")
+        child_i = indents[depth + 1]
+
+        # Check if we're being careful or not, switch accordingly
+        # If careful, append indent to contents of el.text and el.tail
+        # If careless, replace contents
+        if careful:
+            el.text = _xml_indent_careful(el.text, child_i)
+            el.tail = _xml_indent_careful(el.tail, i)
+        else:
+            el.text = child_i  # Newline + Indent sub-elements
             el.tail = i  # Add newline after closing tag
-            for el in el:  # Use same variable so that the last element in loop will remain accessible
-                xml_indent(el, depth + 1)
-            el.tail = i  # De-indent closing tag
-        else:  # If there aren't sub-elements, just add a newline
-            el.text = ''
-            if not el.tail or not el.tail.strip():
-                el.tail = i
+        if last_tail is not None:
+            el.tail = _xml_indent_careful(el.tail, last_tail) if careful else last_tail
+
+        for child in el:
+            if len(child):
+                stack.append((child, depth + 1, None))
+            elif careful:
+                child.tail = _xml_indent_careful(child.tail, child_i)
+            else:  # If there aren't sub-elements, just add a newline
+                child.text = ''
+                if not child.tail or not child.tail.strip():
+                    child.tail = child_i
+
+        # De-indent closing tag
+        if len(child):
+            stack[-1] = (child, depth + 1, i)
+        else:
+            child.tail = _xml_indent_careful(child.tail, i) if careful else i
+
+
+def _xml_indent_leaf(el, i, careful):
+    """
+    Used by xml_indent() for elements without sub-elements, which just get a newline.
+    """
+    if careful:
+        el.tail = _xml_indent_careful(el.tail, i)
+    else:
+        el.text = ''
+        if not el.tail or not el.tail.strip():
+            el.tail = i
+
+
+def _xml_indent_careful(text, indent):
+    """
+    Used by xml_indent() in careful mode - replaces text if it's only whitespace, otherwise ends it with the indent.
+    :param text: String, or None
+    :param indent: String, newline and indent.
+    :return: String
+    """
+    if not text or not text.strip():
+        return indent
+    return text.rstrip() + indent
@@ -0,0 +1,255 @@
+"""
+Benchmarks for reading and holding configs with radish_io, against the behaviour it replaced.
+Run it directly with the same Python as Max: python tests/bench_radish_io.py [objects]
+The config is built with the stand-in runtime in fake_runtime, and spread over 50 cameras x 20 passes, each with the
+same scene of lights and layers - so about 100 objects per pass for the default of 100k objects.
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from timeit import repeat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_runtime import FakeRuntime
+
+import radish_io as rio
+
+_ALL = {'layers': True, 'lights': True, 'effects': True, 'elements': True}
+_CAMS = 50
+_PASSES = 20
+
+
+# --------------------
+#   Originals
+# --------------------
+# The data objects and the parser used to log a formatted debug record for every object, pass and category, whether
+# or not DEBUG was on.  These stand-ins add those records back on top of the current classes.
+class OldRadishPass(rio.RadishPass):
+    def __init__(self, name):
+        super(OldRadishPass, self).__init__(name)
+        rio._log.debug('RadishPass %s Initialized' % self.name)
+        rio._log.debug('Parsing Pass %s' % self.name)
+        for category in ('Layers', 'Lights', 'Effects', 'Elements'):
+            rio._log.debug('Parsing %s...' % category)
+
+
+class OldRadishLayer(rio.RadishLayer):
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super(OldRadishLayer, self).__init__(*args, **kwargs)
+        rio._log.debug('RadishLayer %s Initialized' % self.name)
+
+
+class OldRadishLight(rio.RadishLight):
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super(OldRadishLight, self).__init__(*args, **kwargs)
+        rio._log.debug('RadishLight %s Initialized' % self.name)
+
+
+class OldRadishEffect(rio.RadishEffect):
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super(OldRadishEffect, self).__init__(*args, **kwargs)
+        rio._log.debug('RadishEffect %s Initialized' % self.name)
+
+
+class OldRadishElement(rio.RadishElement):
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super(OldRadishElement, self).__init__(*args, **kwargs)
+        rio._log.debug('RadishElement %s Initialized' % self.name)
+
+
+_OLD_CLASSES = {'RadishPass': OldRadishPass,
+                'RadishLayer': OldRadishLayer,
+                'RadishLight': OldRadishLight,
+                'RadishEffect': OldRadishEffect,
+                'RadishElement': OldRadishElement}
+
+
+# The data objects before they had __slots__.  Every instance had a __dict__ and a type string, and the XML reader gave
+# each one a misc dict and each light a list of instances, empty or not.
+class DictRadishLayer(object):
+    def __init__(self, name, on=None, misc=None):
+        self.type = 'LAYER'
+        self.name = name
+        self.on = on
+        self.misc = misc
+
+
+class DictRadishLight(object):
+    def __init__(self, name, enabled=None, on=None, instances=[], misc=None):
+        self.type = 'LIGHT'
+        self.name = name
+        self.enabled = enabled
+        self.on = on
+        self.instances = instances
+        self.misc = misc
+
+
+class DictRadishEffect(object):
+    def __init__(self, name, active=None, misc=None):
+        self.type = 'EFFECT'
+        self.name = name
+        self.active = active
+        self.misc = misc
+
+
+class DictRadishElement(object):
+    def __init__(self, name, enabled=None, misc=None):
+        self.type = 'ELEMENT'
+        self.name = name
+        self.enabled = enabled
+        self.misc = misc
+
+
+# --------------------
+#   Benchmark
+# --------------------
+def make_config(cfg_dir, objects):
+    """
+    Writes a XML config with about the given number of objects to cfg_dir.
+    :return: Int, the number of objects written.
+    """
+    per_pass = max(objects // (_CAMS * _PASSES), 4)
+    rt = FakeRuntime()
+    for i in range(per_pass // 4):
+        rt.add_layer('Layer %02d - Interior' % i, on=i % 2 == 0)
+        rt.add_effect('Fog_%02d' % i, active=i % 3 == 0)
+        rt.add_element('VRayRE_%02d' % i, enabled=i % 2 == 1)
+    lights = per_pass - 3 * (per_pass // 4)
+    for i in range(lights):
+        rt.add_light('VRayIES_Fixture_%04d' % i, on=i % 2 == 0, enabled=True)
+
+    cfg = rio.RadishIO(rt, 'XML')
+    for cam in range(_CAMS):
+        for pass_num in range(_PASSES):
+            cfg.save_state('Cam%02d' % cam, 'Pass%02d' % pass_num, _ALL)
+    cfg.write()
+    cfg.close()
+    return per_pass * _CAMS * _PASSES
+
+
+def time_read(runs=5):
+    return min(repeat(lambda: rio.RadishIO(None, 'XML').close(), number=1, repeat=runs))
+
+
+def bench_parse():
+    """
+    Times a full read of the config with the Radish logger at INFO, with and without the old per-object debug records.
+    """
+    originals = dict((name, getattr(rio, name)) for name in _OLD_CLASSES)
+
+    for name, old_class in _OLD_CLASSES.items():
+        setattr(rio, name, old_class)
+    try:
+        old_time = time_read()
+    finally:
+        for name, new_class in originals.items():
+            setattr(rio, name, new_class)
+    new_time = time_read()
+
+    print('Parse, DEBUG off')
+    print('  %-9s %.3fs' % ('original', old_time))
+    print('  %-9s %.3fs  %.2fx' % ('current', new_time, old_time / new_time))
+
+
+def object_size(obj):
+    """
+    :return: Int, bytes held by a data object and the containers only it refers to.  Names and states are shared, so
+    they aren't counted.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    if obj.misc is not None:
+        size += sys.getsizeof(obj.misc)
+    # There's only ever one empty tuple, but every empty list is a new one
+    if isinstance(obj, (rio.RadishLight, DictRadishLight)) and obj.instances != ():
+        size += sys.getsizeof(obj.instances)
+    return size
+
+
+def bench_objects(objects):
+    """
+    Compares the size of each kind of data object, as the XML reader makes them, with the classes before __slots__.
+    """
+    pairs = [('Layer', DictRadishLayer('Layer', on=True, misc={}), rio.RadishLayer('Layer', on=True)),
+             ('Light', DictRadishLight('Light', enabled=True, on=True, instances=[], misc={}),
+              rio.RadishLight('Light', enabled=True, on=True)),
+             ('Effect', DictRadishEffect('Effect', active=True, misc={}), rio.RadishEffect('Effect', active=True)),
+             ('Element', DictRadishElement('Element', enabled='True', misc={}),
+              rio.RadishElement('Element', enabled='True'))]
+
+    print('Object size, bytes')
+    for label, old_obj, new_obj in pairs:
+        old_size = object_size(old_obj)
+        new_size = object_size(new_obj)
+        print('  %-9s %4d -> %4d  %5.1fx  %6.1f MB less for %d objects' %
+              (label, old_size, new_size, float(old_size) / new_size, (old_size - new_size) * objects / 1048576.0,
+               objects))
+
+
+def name_strings(cfg):
+    """
+    :return: Dictionary of every string object held as a name in memory, by id.
+    """
+    strings = {}
+    for cam in cfg.cams.values():
+        for rad_pass in cam.passes.values():
+            for category in ('layers', 'lights', 'effects', 'elements'):
+                for key, obj in getattr(rad_pass, category).items():
+                    for name in (key, obj.name) + tuple(getattr(obj, 'instances', ())):
+                        strings[id(name)] = name
+                    for k, v in (obj.misc or {}).items():
+                        strings[id(k)] = k
+                        strings[id(v)] = v
+    return strings
+
+
+def bench_names():
+    """
+    Compares the memory taken by names after a full read, with and without the symbol table.
+    """
+    intern_name = rio.RadishIO._intern_name
+    rio.RadishIO._intern_name = lambda self, name: name
+    try:
+        old_strings = name_strings(rio.RadishIO(None, 'XML'))
+    finally:
+        rio.RadishIO._intern_name = intern_name
+    new_strings = name_strings(rio.RadishIO(None, 'XML'))
+
+    print('Names after a full read')
+    for label, strings in (('original', old_strings), ('interned', new_strings)):
+        print('  %-9s %7d strings  %8.1f KB' % (label, len(strings),
+                                                 sum(sys.getsizeof(name) for name in strings.values()) / 1024.0))
+
+
+def main(objects=100000):
+    logging.getLogger('Radish').addHandler(logging.NullHandler())
+    rio._log.setLevel(logging.INFO)
+    cfg_dir = tempfile.mkdtemp()
+    get_cfg_path = rio._get_cfg_path
+    rio._get_cfg_path = lambda ext='xml': os.path.join(cfg_dir, 'radishConfig.' + ext)
+    try:
+        objects = make_config(cfg_dir, objects)
+        print('%d objects in %d cams x %d passes' % (objects, _CAMS, _PASSES))
+        bench_parse()
+        bench_objects(objects)
+        bench_names()
+    finally:
+        rio._get_cfg_path = get_cfg_path
+        shutil.rmtree(cfg_dir)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
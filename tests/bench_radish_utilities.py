@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark for the XML helpers in radish_utilities, against the implementations they replaced.
+Run it directly with the same Python as Max: python tests/bench_radish_utilities.py [calls] [lights]
+The names follow a config's distribution - a few thousand lights used over and over, a few hundred layers, and a
+sprinkling of non-ASCII names.  xml_indent is run over a synthetic config tree with the given number of lights in
+every pass, and over a tree too deep to recurse through.  Every helper is checked against the original before it's
+timed.
+"""
+import os
+import random
+import sys
+import types
+import xml.etree.ElementTree as _ETree
+from timeit import default_timer as _timer, repeat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pymxs and MaxPlus are only needed for the scene helpers - stand in empty modules when run outside Max
+try:
+    import pymxs
+    import MaxPlus
+except ImportError:
+    pymxs = sys.modules['pymxs'] = types.ModuleType('pymxs')
+    pymxs.runtime = None
+    MaxPlus = sys.modules['MaxPlus'] = types.ModuleType('MaxPlus')
+    MaxPlus.Core = types.ModuleType('MaxPlus.Core')
+    MaxPlus.Core.EvalMAXScript = None
+
+import radish_utilities as util
+
+
+# --------------------
+#   Originals
+# --------------------
+def old_is_ascii(text):
+    if isinstance(text, unicode):
+        try:
+            text.encode('ascii')
+        except UnicodeEncodeError:
+            return False
+    else:
+        try:
+            text.decode('ascii')
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def old_xml_tag_cleaner(el):
+    output = el
+    if output == '':
+        output = 'BLANK'
+    output = output.strip()
+    if not output.isalnum():
+        loop_output = ''
+        for char in output:
+            if not char.isalnum() and char != '_':
+                loop_output += '_'
+            else:
+                loop_output += char
+        output = loop_output
+    if not output[0].isalpha() or output.upper().startswith('XML'):
+        output = '_' + output
+    return output
+
+
+def old_xml_indent(el, depth=0, careful=False):
+    # The careful branch was never implemented
+    i = "\n" + depth*"\t"
+    if not careful:
+        if len(el):
+            el.text = i + "\t"
+            el.tail = i
+            for el in el:
+                old_xml_indent(el, depth + 1)
+            el.tail = i
+        else:
+            el.text = ''
+            if not el.tail or not el.tail.strip():
+                el.tail = i
+
+
+# --------------------
+#   Benchmark
+# --------------------
+def make_names(calls, seed=1):
+    """
+    :return: List of names to run every helper over, drawn from a fixed pool.
+    """
+    rng = random.Random(seed)
+    pool = ['VRayIES_Fixture_%04d.%03d' % (i, rng.randint(0, 99)) for i in range(5000)]
+    pool += ['Layer %02d - Interior Lights (Night)' % i for i in range(200)]
+    pool += ['xmlPanel_%d' % i for i in range(50)]
+    pool += [u'Spot \xe9t\xe9 %d' % i for i in range(100)]
+    pool += [u'照明_%d' % i for i in range(20)]
+    pool += ['', '1st Light', 'Key "Main"']
+    return [rng.choice(pool) for _ in range(calls)]
+
+
+def make_config_tree(lights, cams=20, passes=10):
+    """
+    :return: Root element of a config shaped like the ones RadishIO writes, with the given number of lights in every
+    pass - every tenth one with a couple of instances.
+    """
+    root = _ETree.Element('RadishConfig')
+    for c in range(cams):
+        cam = _ETree.SubElement(root, 'CAM%02d' % c, {'realName': 'Cam%02d' % c, 'type': 'CAM'})
+        for p in range(passes):
+            rad_pass = _ETree.SubElement(cam, 'PASS%02d' % p, {'realName': 'Pass%02d' % p, 'type': 'PASS'})
+            layers = _ETree.SubElement(rad_pass, 'LAYERS')
+            for l in range(lights // 10):
+                _ETree.SubElement(layers, 'LAYER_%03d' % l, {'realName': 'Layer %03d' % l, 'on': 'True'})
+            cfg_lights = _ETree.SubElement(rad_pass, 'LIGHTS')
+            for l in range(lights):
+                light = _ETree.SubElement(cfg_lights, 'LIGHT_%04d' % l, {'realName': 'Light %04d' % l, 'on': 'True'})
+                if l % 10 == 0:
+                    for n in range(2):
+                        _ETree.SubElement(light, 'LIGHT_%04d_INST%d' % (l, n), {'realName': 'Inst'})
+    return root
+
+
+def make_deep_tree(depth):
+    """
+    :return: Root element of a chain of elements of the given depth, each with a sibling.
+    """
+    root = el = _ETree.Element('Root')
+    for d in range(depth):
+        _ETree.SubElement(el, 'Leaf')
+        el = _ETree.SubElement(el, 'Node')
+    return root
+
+
+def time_indent(func, make_tree, runs=3):
+    """
+    :return: Best time to format a fresh tree.  Building the tree isn't timed.
+    """
+    times = []
+    for _ in range(runs):
+        tree = make_tree()
+        start = _timer()
+        func(tree)
+        times.append(_timer() - start)
+    return min(times)
+
+
+def bench_xml_indent(lights):
+    tree = make_config_tree(lights)
+    old_tree = make_config_tree(lights)
+    util.xml_indent(tree)
+    old_xml_indent(old_tree)
+    if _ETree.tostring(tree) != _ETree.tostring(old_tree):
+        raise AssertionError('xml_indent output differs from the original')
+    elements = sum(1 for _ in tree.iter())
+
+    old_time = time_indent(old_xml_indent, lambda: make_config_tree(lights))
+    new_time = time_indent(util.xml_indent, lambda: make_config_tree(lights))
+    print('xml_indent over %d elements' % elements)
+    print('%-16s %-9s %.3fs' % ('xml_indent', 'original', old_time))
+    print('%-16s %-9s %.3fs  %.1fx' % ('xml_indent', 'iterative', new_time, old_time / new_time))
+
+    depth = sys.getrecursionlimit() * 2
+    try:
+        old_xml_indent(make_deep_tree(depth))
+        old_result = 'ok'
+    except RuntimeError:
+        old_result = 'hit the recursion limit'
+    new_time = time_indent(util.xml_indent, lambda: make_deep_tree(depth), runs=1)
+    print('xml_indent over a tree %d deep - original %s, iterative %.3fs' % (depth, old_result, new_time))
+
+
+def best_of(func, names, runs=3):
+    return min(repeat(lambda: [func(name) for name in names], number=1, repeat=runs))
+
+
+def main(calls=200000, lights=500):
+    names = make_names(calls)
+    pool = sorted(set(names))
+
+    helpers = [('is_ascii', old_is_ascii, [('regex', util.is_ascii)]),
+               ('xml_tag_cleaner', old_xml_tag_cleaner, [('cached', util.xml_tag_cleaner),
+                                                          ('uncached', util._xml_tag_clean)])]
+    print('%d calls over %d distinct names' % (len(names), len(pool)))
+    for helper_name, old_func, new_funcs in helpers:
+        for name in pool:
+            expected = old_func(name)
+            for label, new_func in new_funcs:
+                result = new_func(name)
+                if result != expected or type(result) is not type(expected):
+                    raise AssertionError('%s %s differs for %r: %r != %r' % (helper_name, label, name, result,
+                                                                            expected))
+
+        old_time = best_of(old_func, names)
+        print('%-16s %-9s %.3fs' % (helper_name, 'original', old_time))
+        for label, new_func in new_funcs:
+            new_time = best_of(new_func, names)
+            print('%-16s %-9s %.3fs  %.1fx' % (helper_name, label, new_time, old_time / new_time))
+
+    bench_xml_indent(lights)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,265 @@
+"""
+A stand-in for the pymxs runtime, for testing the parts of Radish that only talk to Max through a runtime.
+It holds a small scene, answers the per-property calls the original save_state made, and evaluates the MAXScript built
+by radish_scene by recognising its snippets and producing the payload they would format in Max.
+"""
+import os
+import re
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pymxs and MaxPlus are only needed to import radish_utilities - stand in empty modules when run outside Max.
+# Everything under test talks to Max through the runtime it's handed, which is a FakeRuntime.
+try:
+    import pymxs
+    import MaxPlus
+except ImportError:
+    pymxs = sys.modules['pymxs'] = types.ModuleType('pymxs')
+    pymxs.runtime = None
+    MaxPlus = sys.modules['MaxPlus'] = types.ModuleType('MaxPlus')
+    MaxPlus.Core = types.ModuleType('MaxPlus.Core')
+    MaxPlus.Core.EvalMAXScript = None
+
+import radish_scene as rsc
+
+
+def _esc(name):
+    """
+    Same substitutions as rd_esc in radish_scene, in the same order.
+    """
+    return name.replace(rsc._ESC, rsc._ESC + 'e').replace(rsc._FS, rsc._ESC + 'f').replace(rsc._RS, rsc._ESC + 'r')
+
+
+def _mxs_bool(value):
+    return 'true' if value else 'false'
+
+
+def _mxs_prop(node, prop):
+    return _mxs_bool(getattr(node, prop)) if hasattr(node, prop) else ''
+
+
+class FakeINode(object):
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class FakeNode(object):
+    """
+    A scene node.  Light properties are only set if they're passed, so isProperty() can tell them apart.
+    """
+    def __init__(self, handle, name, **props):
+        self.inode = FakeINode(handle)
+        self.name = name
+        for prop, value in props.items():
+            setattr(self, prop, value)
+
+    def __repr__(self):
+        return 'FakeNode(%d, %r)' % (self.inode.handle, self.name)
+
+
+class FakeLayer(object):
+    def __init__(self, name, on):
+        self.name = name
+        self.on = on
+
+
+class FakeEffect(object):
+    def __init__(self, name, active):
+        self.name = name
+        self.active = active
+
+
+class FakeElement(object):
+    def __init__(self, name, enabled):
+        self.elementName = name
+        self.enabled = enabled
+
+
+class FakeLayerManager(object):
+    def __init__(self, layers):
+        self.layers = layers
+
+    @property
+    def count(self):
+        return len(self.layers)
+
+    def getLayer(self, i):
+        return self.layers[i]
+
+
+class FakeRenderElementMgr(object):
+    def __init__(self, elements):
+        self.elements = elements
+
+    def NumRenderElements(self):
+        return len(self.elements)
+
+    def GetRenderElement(self, i):
+        return self.elements[i]
+
+
+class FakeMaxOps(object):
+    def __init__(self, runtime):
+        self._rt = runtime
+
+    def getCurRenderElementMgr(self):
+        return FakeRenderElementMgr(self._rt.elements)
+
+    def getNodeByHandle(self, handle):
+        for node in self._rt.lights:
+            if node.inode.handle == handle:
+                return node
+        return None
+
+
+class FakeInstanceMgr(object):
+    def __init__(self, runtime):
+        self._rt = runtime
+
+    def GetInstances(self, node):
+        """
+        Returns the instances of a node, including the node itself.  pymxs fills an mxsreference instead.
+        """
+        group = self._rt.groups.get(node.inode.handle)
+        return list(group) if group else [node]
+
+
+class FakeRuntime(object):
+    """
+    A scene with layers, lights, atmospheric effects, render elements and cameras.
+    Lights are made with add_light(), and instance groups with instance_of.  execute() counts every evaluation.
+    """
+    def __init__(self):
+        self.layerManager = FakeLayerManager([])
+        self.lights = []
+        self.cameras = []
+        self.atmospherics = []
+        self.elements = []
+        self.groups = {}
+        self.maxOps = FakeMaxOps(self)
+        self.InstanceMgr = FakeInstanceMgr(self)
+        self.executed = 0
+        self._next_handle = 1
+
+    # --------------------
+    #   Scene Building
+    # --------------------
+    def add_layer(self, name, on=True):
+        self.layerManager.layers.append(FakeLayer(name, on))
+
+    def add_light(self, name, instance_of=None, **props):
+        """
+        Adds a light to the end of the scene.
+        :param name: String
+        :param instance_of: FakeNode to instance, if any.
+        :param props: on and / or enabled, for lights that have those properties.
+        :return: FakeNode
+        """
+        light = FakeNode(self._next_handle, name, **props)
+        self._next_handle += 1
+        if instance_of is not None:
+            group = self.groups.setdefault(instance_of.inode.handle, [instance_of])
+            group.append(light)
+            self.groups[light.inode.handle] = group
+        self.lights.append(light)
+        return light
+
+    def delete_light(self, light):
+        self.lights.remove(light)
+        group = self.groups.pop(light.inode.handle, None)
+        if group is not None:
+            group.remove(light)
+
+    def add_camera(self, name):
+        camera = FakeNode(self._next_handle, name)
+        self._next_handle += 1
+        self.cameras.append(camera)
+        return camera
+
+    def add_effect(self, name, active=True):
+        self.atmospherics.append(FakeEffect(name, active))
+
+    def add_element(self, name, enabled=True):
+        self.elements.append(FakeElement(name, enabled))
+
+    # --------------------
+    #   Runtime Calls
+    # --------------------
+    @property
+    def objects(self):
+        return self.lights + self.cameras
+
+    @property
+    def numAtmospherics(self):
+        return len(self.atmospherics)
+
+    def getAtmospheric(self, i):
+        return self.atmospherics[i - 1]
+
+    def isActive(self, effect):
+        return effect.active
+
+    def isProperty(self, obj, prop):
+        return hasattr(obj, prop)
+
+    def execute(self, script):
+        """
+        Evaluates the scripts built by radish_scene.
+        """
+        self.executed += 1
+        if script == rsc._LOOKUP_SCRIPT:
+            nodes = self.objects
+            layers = list(self.layerManager.layers)
+            return [''.join(_esc(n.name) + rsc._RS for n in nodes), nodes,
+                    ''.join(_esc(l.name) + rsc._RS for l in layers), layers]
+        if script == rsc._LAYER_LOOKUP_SCRIPT:
+            layers = list(self.layerManager.layers)
+            return [''.join(_esc(l.name) + rsc._RS for l in layers), layers]
+        if script == rsc._CAMERAS_SCRIPT:
+            return ''.join('%d%s%s%s' % (c.inode.handle, rsc._FS, _esc(c.name), rsc._RS) for c in self.cameras)
+        if 'maxOps.getNodeByHandle' in script:
+            return self._capture_nodes(script)
+        return self._capture(script)
+
+    def _capture_nodes(self, script):
+        handles = re.search(r'for h in #\(([\d, ]*)\)', script).group(1)
+        records = []
+        for handle in [int(h) for h in handles.split(',') if h.strip()]:
+            node = self.maxOps.getNodeByHandle(handle)
+            if node is not None:
+                records.append(['N', str(handle), _esc(node.name)] +
+                               [str(i.inode.handle) for i in self.InstanceMgr.GetInstances(node)])
+        return ''.join(rsc._FS.join(record) + rsc._RS for record in records)
+
+    def _capture(self, script):
+        records = []
+        if rsc._CAPTURE_LAYERS in script:
+            for layer in self.layerManager.layers:
+                records.append(['L', _esc(layer.name), _mxs_bool(layer.on)])
+        if rsc._CAPTURE_LIGHT_STATES in script:
+            for light in self.lights:
+                records.append(['S', str(light.inode.handle), _mxs_prop(light, 'on'), _mxs_prop(light, 'enabled')])
+        elif rsc._CAPTURE_LIGHTS.replace('<INSTANCES>', rsc._CAPTURE_INSTANCES) in script:
+            grouped = set()
+            for light in self.lights:
+                record = ['G', str(light.inode.handle), _esc(light.name),
+                          _mxs_prop(light, 'on'), _mxs_prop(light, 'enabled')]
+                if light.inode.handle not in grouped:
+                    for i in self.InstanceMgr.GetInstances(light):
+                        grouped.add(i.inode.handle)
+                        record += [str(i.inode.handle), _esc(i.name)]
+                records.append(record)
+        elif rsc._CAPTURE_LIGHTS.replace('<INSTANCES>', '') in script:
+            for light in self.lights:
+                records.append(['G', str(light.inode.handle), _esc(light.name),
+                                _mxs_prop(light, 'on'), _mxs_prop(light, 'enabled')])
+        if rsc._CAPTURE_EFFECTS in script:
+            for effect in self.atmospherics:
+                records.append(['E', _esc(effect.name), _mxs_bool(effect.active)])
+        if rsc._CAPTURE_ELEMENTS in script:
+            for element in self.elements:
+                records.append(['R', _esc(element.elementName), _mxs_bool(element.enabled)])
+
+        return ''.join(rsc._FS.join(record) + rsc._RS for record in records)
@@ -0,0 +1,302 @@
+"""
+Tests for radish_io, driven by the stand-in runtime in fake_runtime, which also stands in pymxs and MaxPlus outside Max.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_runtime import FakeRuntime
+
+# radish_io is written for the Python 2.7 that Max ships with
+if sys.version_info[0] > 2:
+    raise unittest.SkipTest('radish_io needs Python 2.7')
+
+import radish_io as rio
+
+_ALL = {'layers': True, 'lights': True, 'effects': True, 'elements': True}
+
+
+class TestSceneChanges(unittest.TestCase):
+    def setUp(self):
+        self.rt = FakeRuntime()
+        self.rt.add_layer('Default')
+        self.key = self.rt.add_light('Key', on=True)
+        self.rt.add_light('Key_Inst01', instance_of=self.key, on=False)
+        self.rt.add_light('Fill', on=True, enabled=True)
+        self.cfg = rio.RadishIO(self.rt)
+        self.cfg.keep_scene_lookup = True
+        self.cfg.save_state('Cam01', 'Beauty', _ALL)
+
+    def saved_lights(self):
+        self.cfg.save_state('Cam01', 'Beauty', _ALL)
+        lights = self.cfg.get_pass('Cam01', 'Beauty').lights
+        return dict((name, tuple(light.instances)) for name, light in lights.items())
+
+    def test_nodes(self):
+        self.rt.add_light('Key_Inst02', instance_of=self.key, on=True)
+        self.cfg.invalidate_scene_lookup('NODES')
+        self.assertEqual(self.saved_lights(), {'Key': ('Key_Inst01', 'Key_Inst02'), 'Fill': ()})
+        self.assertEqual(self.cfg.scene_inventory.updates, 1)
+
+        self.rt.delete_light(self.rt.lights[1])
+        self.cfg.invalidate_scene_lookup('NODES')
+        self.assertEqual(self.saved_lights(), {'Key': ('Key_Inst02',), 'Fill': ()})
+        self.assertEqual(self.cfg.scene_inventory.updates, 2)
+
+    def test_renamed(self):
+        self.key.name = 'Key_Main'
+        self.cfg.invalidate_scene_lookup('RENAMED')
+        self.assertEqual(self.saved_lights(), {'Key_Main': ('Key_Inst01',), 'Fill': ()})
+        self.assertEqual(self.cfg.scene_inventory.updates, 1)
+
+    def test_layers(self):
+        self.cfg.invalidate_scene_lookup('LAYERS')
+        self.assertTrue(self.cfg.scene_inventory.is_built())
+        self.saved_lights()
+        self.assertEqual(self.cfg.scene_inventory.hits, 1)
+
+    def test_scene(self):
+        self.cfg.invalidate_scene_lookup()
+        self.assertFalse(self.cfg.scene_inventory.is_built())
+        self.saved_lights()
+        self.assertEqual(self.cfg.scene_inventory.misses, 2)
+
+
+
+class ConfigDirTestCase(unittest.TestCase):
+    """
+    Points radish_io at a temporary directory for its configs, with a small scene to save.
+    """
+    def setUp(self):
+        self.cfg_dir = tempfile.mkdtemp()
+        self._get_cfg_path = rio._get_cfg_path
+        rio._get_cfg_path = lambda ext='xml': os.path.join(self.cfg_dir, 'radishConfig.' + ext)
+        self.rt = FakeRuntime()
+        self.sun = self.rt.add_light('Sun', on=True)
+        self.rt.add_light('Fill', on=False, enabled=True)
+
+    def tearDown(self):
+        rio._get_cfg_path = self._get_cfg_path
+        shutil.rmtree(self.cfg_dir)
+
+
+class TestReread(ConfigDirTestCase):
+    def check_reread(self, config_type, lazy=False):
+        writer = rio.RadishIO(self.rt, config_type)
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        writer.save_state('Cam01', 'Night', _ALL)
+        writer.write()
+
+        reader = rio.RadishIO(None, config_type, lazy=lazy)
+        self.assertEqual(sorted(reader.cams['Cam01'].passes), ['Beauty', 'Night'])
+
+        writer.reset_pass('Cam01', 'Beauty')
+        writer.write()
+        writer.close()
+        reader.read()
+        self.assertEqual(sorted(reader.cams['Cam01'].passes), ['Night'])
+        self.assertEqual(reader.get_all_passes(), ['Night'])
+        reader.close()
+
+    def test_xml(self):
+        self.check_reread('XML')
+
+    def test_xml_lazy(self):
+        self.check_reread('XML', lazy=True)
+
+    def test_journal(self):
+        self.check_reread('JOURNAL')
+
+    def test_sqlite(self):
+        self.check_reread('SQLITE')
+
+
+class TestClose(ConfigDirTestCase):
+    def test_sqlite(self):
+        cfg = rio.RadishIO(self.rt, 'SQLITE')
+        cfg.save_state('Cam01', 'Beauty', _ALL)
+        cfg.write()
+        db = cfg._db
+        cfg.close()
+        self.assertIsNone(cfg._db)
+        self.assertRaises(rio.sqlite3.ProgrammingError, db.execute, 'SELECT 1')
+
+        cfg.read()
+        self.assertIs(cfg.get_pass('Cam01', 'Beauty').lights['Sun'].on, True)
+        cfg.close()
+
+
+class TestLazyCams(ConfigDirTestCase):
+    def test_removed_on_disk(self):
+        writer = rio.RadishIO(self.rt, 'XML')
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        writer.save_state('Cam02', 'Night', _ALL)
+        writer.write()
+
+        reader = rio.RadishIO(None, 'XML', lazy=True)
+        self.assertEqual(sorted(reader.get_all_passes()), ['Beauty', 'Night'])
+
+        writer.reset_cam('Cam02')
+        writer.write()
+        writer.close()
+        self.assertRaises(ValueError, reader.get_pass, 'Cam02', 'Night')
+        self.assertNotIn('Cam02', reader.cams)
+        self.assertEqual(reader.get_all_passes(), ['Beauty'])
+        self.assertIs(reader.get_pass('Cam01', 'Beauty').lights['Sun'].on, True)
+
+        reader.set_pass('Cam02', 'Night')
+        self.assertEqual(sorted(reader.get_all_passes()), ['Beauty', 'Night'])
+        reader.close()
+
+
+class TestStateMatrix(ConfigDirTestCase):
+    def check_read(self, config_type, lazy=False):
+        writer = rio.RadishIO(self.rt, config_type)
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        writer.write()
+
+        reader = rio.RadishIO(None, config_type, lazy=lazy)
+        matrix = reader.enable_state_matrix()
+        self.assertEqual(len(matrix), 1)
+
+        self.sun.on = False
+        writer.save_state('Cam01', 'Night', _ALL)
+        writer.reset_pass('Cam01', 'Beauty')
+        writer.write()
+        writer.close()
+
+        reader.read()
+        self.assertIs(reader.state_matrix, matrix)
+        self.assertEqual(len(matrix), 1)
+        self.assertIn(('Cam01', 'Night'), matrix)
+        self.assertNotIn(('Cam01', 'Beauty'), matrix)
+        sun = reader.get_pass('Cam01', 'Night').lights['Sun']
+        self.assertEqual(matrix.get('Cam01', 'Night', 'lights', 'Sun', 'on'), sun.on)
+        self.assertIs(matrix.get('Cam01', 'Night', 'lights', 'Sun', 'on'), False)
+        self.assertIn(('Cam01', 'Night'), matrix.passes_with('lights', 'Fill', 'enabled'))
+        reader.close()
+
+    def test_xml(self):
+        self.check_read('XML')
+
+    def test_xml_lazy(self):
+        self.check_read('XML', lazy=True)
+
+    def test_journal(self):
+        self.check_read('JOURNAL')
+
+    def test_sqlite(self):
+        self.check_read('SQLITE')
+
+    def dump_passes(self, cfg):
+        """
+        :return: Every pass in memory, resolved, as plain data.  Misc properties are only filled in by the XML reader.
+        """
+        dump = {}
+        for cam_name in cfg.cams:
+            for pass_name in cfg.cams[cam_name].passes:
+                rad_pass = cfg.get_pass(cam_name, pass_name)
+                dump[(cam_name, pass_name)] = dict(
+                    (category, sorted((name, [str(getattr(obj, attr)) for attr in obj.__slots__ if attr != 'misc'])
+                                      for name, obj in getattr(rad_pass, category).items()))
+                    for category in ('layers', 'lights', 'effects', 'elements'))
+        return dump
+
+    def test_stored(self):
+        self.rt.add_layer('Default')
+        self.rt.add_light('Sun_Inst01', instance_of=self.sun, on=True)
+        self.rt.add_effect('Fog', active=False)
+        self.rt.add_element('Z-Depth', enabled=True)
+        cfg = rio.RadishIO(self.rt, 'XML')
+        cfg.delta_base = 'Beauty'
+        cfg.save_state('Cam01', 'Beauty', _ALL)
+        cfg.write()
+
+        # Read back from XML, so lights have misc properties
+        cfg = rio.RadishIO(self.rt, 'XML')
+        matrix = cfg.enable_state_matrix()
+        self.sun.on = False
+        cfg.save_state('Cam01', 'Night', _ALL)
+        cfg.save_state('Cam02', 'Beauty', _ALL)
+        for cam_name, pass_name in [('Cam01', 'Beauty'), ('Cam01', 'Night'), ('Cam02', 'Beauty')]:
+            self.assertIsInstance(cfg.cams[cam_name].passes[pass_name], rio.RadishPackedPass)
+        self.assertEqual(cfg.cams['Cam01'].passes['Night'].base, 'Beauty')
+        self.assertEqual(cfg.get_pass('Cam01', 'Night').lights['Sun'].instances, ('Sun_Inst01',))
+        self.assertEqual(cfg.get_pass('Cam01', 'Beauty').lights['Sun'].misc, {'instanceCount': '1'})
+
+        # Delta passes are resolved against their base, in memory and in the matrix
+        self.assertEqual(matrix.get('Cam01', 'Night', 'lights', 'Fill', 'enabled'), True)
+        self.assertEqual(sorted(matrix.passes_with('lights', 'Sun', 'on')), [('Cam01', 'Beauty')])
+        self.assertEqual(matrix.diff(('Cam01', 'Beauty'), ('Cam01', 'Night'), 'lights'), ['Sun'])
+        self.assertEqual(matrix.names_with('Cam02', 'Beauty', 'lights', 'on', False), ['Sun', 'Fill'])
+
+        # Changing a stored pass swaps a RadishPass back in
+        self.assertIsInstance(cfg.set_pass('Cam01', 'Beauty'), rio.RadishPass)
+
+        # Everything written matches a config that never used the matrix
+        cfg.write()
+        plain = rio.RadishIO(None, 'XML')
+        self.assertEqual(self.dump_passes(cfg), self.dump_passes(plain))
+        cfg.close()
+        plain.close()
+
+
+class TestDeltaBase(ConfigDirTestCase):
+    def check_saved(self, config_type, lazy=False):
+        writer = rio.RadishIO(self.rt, config_type)
+        self.assertIsNone(writer.delta_base)
+        writer.delta_base = 'Beauty'
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        self.sun.on = False
+        writer.save_state('Cam01', 'Night', _ALL)
+        self.assertEqual(writer.cams['Cam01'].passes['Night'].base, 'Beauty')
+        writer.write()
+
+        reader = rio.RadishIO(None, config_type, lazy=lazy)
+        self.assertEqual(reader.delta_base, 'Beauty')
+        self.assertIs(reader.get_pass('Cam01', 'Night').lights['Sun'].on, False)
+
+        writer.delta_base = None
+        writer.write()
+        writer.close()
+        reader.read()
+        self.assertIsNone(reader.delta_base)
+        reader.close()
+
+    def test_xml(self):
+        self.check_saved('XML')
+
+    def test_xml_lazy(self):
+        self.check_saved('XML', lazy=True)
+
+    def test_journal(self):
+        self.check_saved('JOURNAL')
+
+    def test_journal_compacted(self):
+        writer = rio.RadishIO(self.rt, 'JOURNAL')
+        writer.delta_base = 'Beauty'
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        writer.compact_journal()
+        self.assertEqual(rio.RadishIO(None, 'JOURNAL').delta_base, 'Beauty')
+
+    def test_sqlite(self):
+        self.check_saved('SQLITE')
+
+    def test_convert(self):
+        writer = rio.RadishIO(self.rt, 'XML')
+        writer.delta_base = 'Beauty'
+        writer.save_state('Cam01', 'Beauty', _ALL)
+        writer.write()
+        rio.convert_config('XML', 'SQLITE')
+        reader = rio.RadishIO(None, 'SQLITE')
+        self.assertEqual(reader.delta_base, 'Beauty')
+        reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
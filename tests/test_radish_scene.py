@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for radish_scene, driven by the stand-in runtime in fake_runtime.
+The capture engine is checked against the per-property calls that save_state used to make for every object.
+"""
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import radish_scene as rsc
+from fake_runtime import FakeRuntime
+
+_ALL = {'layers': True, 'lights': True, 'effects': True, 'elements': True}
+
+# Names that have caused trouble - quotes, the payload separators and escape, and non-ASCII
+_AWKWARD_NAMES = ['Key "Main"',
+                  "Rim's",
+                  'Field' + chr(31) + 'Sep',
+                  'Record' + chr(30) + 'Sep',
+                  'Esc' + chr(27) + 'e' + chr(27) + 'f',
+                  chr(30) + chr(31) + chr(27),
+                  u'Lumi\xe8re',
+                  u'光源']
+
+
+def _build_scene():
+    rt = FakeRuntime()
+    for i, name in enumerate(['Default', 'BG "Set"', u'Couche \xe9t\xe9', 'Sep' + chr(30) + chr(31)]):
+        rt.add_layer(name, on=i % 2 == 0)
+
+    # Singles with and without each property, interleaved with instance groups
+    key = rt.add_light('Key', on=True, enabled=False)
+    rt.add_light('Fill', on=False)
+    rt.add_light('Target', enabled=True)
+    rt.add_light('Key_Inst01', instance_of=key, on=True, enabled=True)
+    rt.add_light('NoProps')
+    rt.add_light('Key_Inst02', instance_of=key, on=False, enabled=False)
+    previous = None
+    for i, name in enumerate(_AWKWARD_NAMES):
+        light = rt.add_light(name, instance_of=previous if i % 3 else None, on=i % 2 == 0)
+        previous = light
+
+    for name in ['Fire', 'Fog ' + chr(31), u'Brume \xe9']:
+        rt.add_effect(name, active=len(name) % 2 == 0)
+    for name in ['Diffuse', 'Spec "HQ"', 'AO' + chr(30), u'R\xe9flexion']:
+        rt.add_element(name, enabled=len(name) % 2 == 1)
+    for name in ['Cam01', 'Cam "Hero"', 'Cam' + chr(31) + '02', u'Cam\xe9ra']:
+        rt.add_camera(name)
+    return rt
+
+
+def _per_property_capture(rt, options):
+    """
+    Reads the scene the way save_state used to, one runtime call per property, into the layout of parse_payload().
+    """
+    capture = {'layers': [], 'lights': [], 'light_states': [], 'nodes': [], 'groups': {}, 'effects': [],
+               'elements': []}
+    if options['layers']:
+        for i in range(rt.layerManager.count):
+            layer = rt.layerManager.getLayer(i)
+            capture['layers'].append((layer.name, layer.on))
+    if options['lights']:
+        for light in rt.lights:
+            light_on = light.on if rt.isProperty(light, 'on') else None
+            light_enabled = light.enabled if rt.isProperty(light, 'enabled') else None
+            light_instances = [i.name for i in rt.InstanceMgr.GetInstances(light)]
+            capture['groups'][light.inode.handle] = [i.inode.handle for i in rt.InstanceMgr.GetInstances(light)]
+            capture['lights'].append((light.inode.handle, light.name, light_on, light_enabled, light_instances))
+    if options['effects']:
+        for i in range(1, rt.numAtmospherics + 1):
+            effect = rt.getAtmospheric(i)
+            capture['effects'].append((effect.name, rt.isActive(effect)))
+    if options['elements']:
+        re_mgr = rt.maxOps.getCurRenderElementMgr()
+        for i in range(re_mgr.NumRenderElements()):
+            element = re_mgr.GetRenderElement(i)
+            capture['elements'].append((element.elementName, element.enabled))
+    return capture
+
+
+class TestSceneCapture(unittest.TestCase):
+    def setUp(self):
+        self.rt = _build_scene()
+        self.capture = rsc.RadishSceneCapture(self.rt)
+
+    def test_matches_per_property(self):
+        self.assertEqual(self.capture.capture(_ALL), _per_property_capture(self.rt, _ALL))
+        self.assertEqual(self.rt.executed, 1)
+
+    def test_matches_per_property_by_category(self):
+        for category in _ALL:
+            options = dict((key, key == category) for key in _ALL)
+            self.assertEqual(self.capture.capture(options), _per_property_capture(self.rt, options), category)
+
+    def test_without_instances(self):
+        expected = _per_property_capture(self.rt, _ALL)
+        expected['lights'] = [light[:4] + ([],) for light in expected['lights']]
+        expected['groups'] = {}
+        self.assertEqual(self.capture.capture(_ALL, instances=False), expected)
+
+    def test_light_states(self):
+        expected = [(handle, on, enabled) for handle, name, on, enabled, instances
+                    in _per_property_capture(self.rt, _ALL)['lights']]
+        capture = self.capture.capture(_ALL, light_states=True)
+        self.assertEqual(capture['light_states'], expected)
+        self.assertEqual(capture['lights'], [])
+
+    def test_instance_groups_share_names(self):
+        lights = dict((light[1], light[4]) for light in self.capture.capture(_ALL)['lights'])
+        self.assertEqual(lights['Key'], ['Key', 'Key_Inst01', 'Key_Inst02'])
+        self.assertIs(lights['Key'], lights['Key_Inst02'])
+        self.assertEqual(lights['Fill'], ['Fill'])
+
+    def test_awkward_names_round_trip(self):
+        names = [light[1] for light in self.capture.capture(_ALL)['lights']]
+        for name in _AWKWARD_NAMES:
+            self.assertIn(name, names)
+
+    def test_unescape(self):
+        self.assertEqual(rsc._unescape('Plain'), 'Plain')
+        escaped = chr(27) + 'e' + chr(27) + 'f' + chr(27) + 'r'
+        self.assertEqual(rsc._unescape(escaped), chr(27) + chr(31) + chr(30))
+        self.assertEqual(rsc._unescape(u'\xe9' + chr(27) + 'f'), u'\xe9' + chr(31))
+
+    def test_unknown_record(self):
+        self.assertRaises(ValueError, self.capture.parse_payload, 'X' + chr(31) + 'Name' + chr(30))
+
+    def test_scripts_escape_every_name(self):
+        scripts = [self.capture.build_script(_ALL), self.capture.build_script(_ALL, instances=False),
+                   rsc._LOOKUP_SCRIPT, rsc._LAYER_LOOKUP_SCRIPT, rsc._CAMERAS_SCRIPT]
+        for script in scripts:
+            for line in script.splitlines():
+                if 'format' not in line:
+                    continue
+                for escaped in re.findall(r'(\(rd_esc )?\w+\.(?:name|elementName)\b', line):
+                    self.assertTrue(escaped, line)
+
+
+class TestSceneInventory(unittest.TestCase):
+    def setUp(self):
+        self.rt = _build_scene()
+        self.inventory = rsc.RadishSceneInventory(rsc.RadishSceneCapture(self.rt))
+        self.inventory.capture(_ALL)
+
+    def assertCurrent(self, executed):
+        before = self.rt.executed
+        lights = self.inventory.capture(_ALL)['lights']
+        self.assertEqual(self.rt.executed - before, executed)
+        self.assertEqual(lights, _per_property_capture(self.rt, _ALL)['lights'])
+
+    def test_unchanged(self):
+        self.rt.lights[0].on = not self.rt.lights[0].on
+        self.assertCurrent(1)
+        self.assertEqual((self.inventory.hits, self.inventory.updates, self.inventory.misses), (1, 0, 1))
+
+    def test_added(self):
+        key = self.rt.lights[0]
+        self.rt.add_light('Key_Inst03', instance_of=key, on=True)
+        self.rt.add_light('Extra', enabled=False)
+        self.inventory.changed('NODES')
+        # States, then the two new lights
+        self.assertCurrent(2)
+        self.assertEqual((self.inventory.hits, self.inventory.updates, self.inventory.misses), (0, 1, 1))
+
+    def test_deleted(self):
+        self.rt.delete_light(self.rt.lights[3])
+        self.rt.delete_light(self.rt.lights[1])
+        self.inventory.changed('NODES')
+        self.assertCurrent(1)
+        self.assertEqual(self.inventory.updates, 1)
+
+    def test_renamed(self):
+        self.rt.lights[0].name = 'Key_Renamed'
+        self.rt.lights[-1].name = 'Last' + chr(30)
+        self.inventory.changed('RENAMED')
+        self.assertCurrent(1)
+        self.assertEqual(self.inventory.updates, 1)
+
+    def test_several_changes(self):
+        key = self.rt.lights[0]
+        self.rt.delete_light(self.rt.lights[3])
+        self.rt.add_light('Key_Inst03', instance_of=key)
+        key.name = 'Key_Renamed'
+        self.inventory.changed('NODES')
+        self.inventory.changed('RENAMED')
+        self.assertCurrent(2)
+        self.rt.delete_light(key)
+        self.inventory.changed('NODES')
+        self.assertCurrent(1)
+        self.assertEqual((self.inventory.hits, self.inventory.updates, self.inventory.misses), (0, 2, 1))
+
+    def test_not_notified(self):
+        self.rt.add_light('Sneaky', on=True)
+        # States, then a full capture
+        self.assertCurrent(2)
+        self.assertEqual((self.inventory.hits, self.inventory.updates, self.inventory.misses), (0, 0, 2))
+        self.assertCurrent(1)
+
+    def test_invalidate(self):
+        self.inventory.invalidate()
+        self.assertFalse(self.inventory.is_built())
+        self.assertCurrent(1)
+        self.assertEqual(self.inventory.misses, 2)
+        self.assertRaises(ValueError, self.inventory.changed, 'LAYERS')
+
+
+class TestSceneLookup(unittest.TestCase):
+    def setUp(self):
+        self.rt = _build_scene()
+        self.lookup = rsc.RadishSceneLookup(self.rt)
+
+    def test_nodes(self):
+        for light in self.rt.lights:
+            self.assertIs(self.lookup.get_node(light.name), light)
+        self.assertIs(self.lookup.get_node('KEY'), self.rt.lights[0])
+        self.assertIsNone(self.lookup.get_node('Missing'))
+        self.assertEqual(self.rt.executed, 1)
+
+    def test_layers(self):
+        for layer in self.rt.layerManager.layers:
+            self.assertIs(self.lookup.get_layer(layer.name), layer)
+
+    def test_refresh_layers(self):
+        self.lookup.get_layer('Default')
+        self.rt.layerManager.layers[0].name = 'Renamed'
+        self.lookup.refresh_layers()
+        self.assertIs(self.lookup.get_layer('Renamed'), self.rt.layerManager.layers[0])
+        self.assertIsNone(self.lookup.get_layer('Default'))
+
+
+class TestCameraRegistry(unittest.TestCase):
+    def test_cameras(self):
+        rt = _build_scene()
+        registry = rsc.RadishCameraRegistry(rt)
+        self.assertEqual(registry.get_cameras(), [(c.inode.handle, c.name) for c in rt.cameras])
+        registry.get_cameras()
+        self.assertEqual(rt.executed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()